@@ -1,24 +1,45 @@
 #!/bin/sh
+# Usage: entrypoint.sh [release|serve|dev|<command>]
+#   release  one-shot step: migrations, superuser and initial data
+#   serve    production server (gunicorn, see gunicorn.conf.py)
+#   dev      Django development server
+#   worker   background job workers (run_workers)
+set -e
 
 # Wait for database to be ready
 echo "Waiting for PostgreSQL to be ready..."
-while ! nc -z db 5432; do
+while ! nc -z "${DB_HOST:-db}" "${DB_PORT:-5432}"; do
     sleep 0.1
 done
 echo "PostgreSQL is ready!"
 
-# Apply database migrations
-echo "Applying database migrations..."
-python manage.py migrate
+case "${1:-serve}" in
+    release)
+        # Apply database migrations
+        echo "Applying database migrations..."
+        python manage.py migrate --noinput
 
-# Create superuser
-echo "Creating superuser..."
-python manage.py createsuperuser --noinput --username admin --email admin@example.com || true
+        # Create superuser
+        echo "Creating superuser..."
+        python manage.py createsuperuser --noinput --username admin --email admin@example.com || true
 
-# Load initial data if needed
-echo "Loading initial data..."
-python manage.py loaddata initial_data.json || true
-
-# Start server
-echo "Starting server..."
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+        # Load initial data if needed
+        echo "Loading initial data..."
+        python manage.py loaddata initial_data.json || true
+        ;;
+    serve)
+        echo "Starting gunicorn (${SERVER_MODE:-wsgi})..."
+        exec gunicorn --config gunicorn.conf.py
+        ;;
+    dev)
+        echo "Starting development server..."
+        exec python manage.py runserver 0.0.0.0:8000
+        ;;
+    worker)
+        echo "Starting job workers..."
+        exec python manage.py run_workers
+        ;;
+    *)
+        exec "$@"
+        ;;
+esac
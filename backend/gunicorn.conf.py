@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration for the production server (`entrypoint.sh serve`).
+
+SERVER_MODE selects the interface: 'wsgi' runs threaded sync workers on
+singularity.wsgi, 'asgi' runs uvicorn workers on singularity.asgi. The app is
+preloaded in the master so workers fork with Django, the URLconf and the
+GraphQL schema already imported, and workers are recycled after
+MAX_REQUESTS (+ jitter) requests with a graceful timeout.
+"""
+
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+CPU_COUNT = multiprocessing.cpu_count()
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'singularity.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # One event loop per core already handles many concurrent requests
+    workers = int(os.environ.get('WEB_CONCURRENCY', CPU_COUNT))
+else:
+    wsgi_app = 'singularity.wsgi:application'
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', CPU_COUNT * 2 + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+preload_app = True
+
+# Graceful recycling: bounds memory growth; jitter keeps workers from
+# restarting all at once.
+max_requests = int(os.environ.get('MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 500))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Every worker has its own password hashing pool (users/hashing.py); split the
+# cores between workers instead of giving each one all of them.
+os.environ.setdefault('PASSWORD_HASHING_WORKERS', str(max(1, CPU_COUNT // workers)))
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before the workers
+    # fork: import the URLconf (views and GraphQL schema) so the workers
+    # inherit it, and drop any database connection opened while loading.
+    from django.db import connections
+    from django.urls import get_resolver
+    from singularity.pooled_postgresql.base import close_pools
+
+    get_resolver().url_patterns
+    # Build the checkAvailability Bloom filter once here; the workers inherit
+    # it and only pull registrations made after the fork.
+    from users.availability import get_availability_index
+    get_availability_index().rebuild()
+    connections.close_all()
+    close_pools()
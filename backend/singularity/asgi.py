@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'singularity.settings')
+# Under ASGI /graphql/ is served by the async view (singularity.views.AsyncGraphQLView)
+os.environ.setdefault('GRAPHQL_ASYNC', 'True')
 
 application = get_asgi_application()
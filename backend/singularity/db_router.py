@@ -0,0 +1,139 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def _config(name, default):
+    return getattr(settings, 'REPLICA_ROUTING', {}).get(name, default)
+
+
+class _RoutingState:
+    """Estado del enrutamiento de una solicitud (mutable: lo comparten los hilos de sync_to_async)."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+# Fuera de una solicitud (comandos, workers, migraciones) no hay estado y
+# todo va a la base principal
+_state = ContextVar('replica_routing_state', default=None)
+
+
+@contextmanager
+def read_from_replica(replica=None):
+    """
+    Envía a la réplica (por omisión `REPLICA_ROUTING['ALIAS']`) las lecturas
+    del bloque, salvo las que ocurran después de una escritura del mismo
+    bloque o de `pin_to_primary`.
+    """
+    if replica is None:
+        replica = _config('ALIAS', None)
+    token = _state.set(_RoutingState(replica))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def pin_to_primary():
+    """Envía a la base principal el resto de las lecturas de la solicitud en curso."""
+    state = _state.get()
+    if state is not None:
+        state.replica = None
+
+
+class ReplicaRouter:
+    """
+    Router de lecturas hacia la réplica (`REPLICA_ROUTING['ALIAS']`).
+
+    Las escrituras siempre van a `default`. Las lecturas van a la réplica solo
+    dentro de `read_from_replica` (ver `ReplicaRoutingMiddleware`) y mientras
+    no haya una escritura previa en la misma solicitud ni una llamada a
+    `pin_to_primary` (las mutaciones la hacen antes de ejecutarse), de modo
+    que quien escribe lee lo que escribió aunque la réplica vaya atrasada.
+    `select_for_update` cuenta como escritura.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica es una copia de la principal: sus instancias se pueden relacionar
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # La réplica recibe el esquema por replicación
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lee de la réplica durante la solicitud, con lectura de lo escrito.
+
+    Cuando una solicitud escribe, la respuesta lleva la cookie
+    `REPLICA_ROUTING['COOKIE_NAME']` con el instante hasta el que las
+    solicitudes siguientes del mismo cliente deben leer de la principal
+    (`STICKY_SECONDS`, el retraso tolerado de la réplica). Sin réplica
+    configurada no hace nada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        replica = _config('ALIAS', None)
+        if replica is None:
+            return self.get_response(request)
+        with read_from_replica(replica) as state:
+            self.check_sticky(request)
+            response = self.get_response(request)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        replica = _config('ALIAS', None)
+        if replica is None:
+            return await self.get_response(request)
+        with read_from_replica(replica) as state:
+            self.check_sticky(request)
+            response = await self.get_response(request)
+        return self.finish(response, state)
+
+    @staticmethod
+    def check_sticky(request):
+        try:
+            primary_until = float(request.COOKIES.get(_config('COOKIE_NAME', 'db_primary_until'), 0))
+        except ValueError:
+            primary_until = 0
+        # Una cookie alterada solo puede forzar lecturas de la principal
+        if time.time() < primary_until:
+            pin_to_primary()
+
+    @staticmethod
+    def finish(response, state):
+        if state.wrote:
+            window = _config('STICKY_SECONDS', 5)
+            response.set_cookie(
+                _config('COOKIE_NAME', 'db_primary_until'), f'{time.time() + window:.3f}',
+                max_age=window, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,320 @@
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+_current = ContextVar('graphql_profile', default=None)
+
+# Límites de los histogramas: segundos para los tiempos, número de consultas
+# para `graphql_sql_queries`
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'graphql_request_duration_seconds': ('Duración total de la operación GraphQL', TIME_BUCKETS),
+    'graphql_parse_validate_seconds': ('Parseo, validación y cálculo de costo', TIME_BUCKETS),
+    'graphql_execute_seconds': ('Ejecución de los resolvers', TIME_BUCKETS),
+    'graphql_sql_queries': ('Consultas SQL por operación', COUNT_BUCKETS),
+    'graphql_sql_duration_seconds': ('Tiempo en SQL por operación', TIME_BUCKETS),
+    'graphql_password_hash_seconds': ('Tiempo de hash de contraseñas por operación', TIME_BUCKETS),
+}
+
+# Métricas del pool de hash de contraseñas (users/hashing.py), sin etiquetas
+HASHING_METRICS = {
+    'password_hashing_queue_wait_seconds': ('Espera en la cola del pool de hash de contraseñas', TIME_BUCKETS),
+    'password_hashing_duration_seconds': ('Tiempo de hash en el pool de contraseñas', TIME_BUCKETS),
+}
+
+
+def _config(name, default):
+    return getattr(settings, 'GRAPHQL_INSTRUMENTATION', {}).get(name, default)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Histogramas por nombre de operación, en el formato de texto de Prometheus.
+
+    También expone los histogramas del pool de hash de contraseñas y sus
+    rechazos (ver users/hashing.py). Los valores son del proceso: con varios
+    workers cada uno expone los suyos y Prometheus los agrega. Los nombres de
+    operación los elige el cliente, así que solo se guardan MAX_OPERATIONS
+    distintos; el resto va a `other`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in METRICS}
+            self._errors = {}
+            self._hashing = {name: Histogram(buckets) for name, (_, buckets) in HASHING_METRICS.items()}
+            self._hashing_rejected = 0
+
+    def _label(self, operation):
+        if operation in self._histograms['graphql_request_duration_seconds']:
+            return operation
+        if len(self._histograms['graphql_request_duration_seconds']) >= _config('MAX_OPERATIONS', 200):
+            return 'other'
+        return operation
+
+    def observe(self, operation, values, error=False):
+        with self._lock:
+            operation = self._label(operation)
+            for name, value in values.items():
+                histograms = self._histograms[name]
+                if operation not in histograms:
+                    histograms[operation] = Histogram(METRICS[name][1])
+                histograms[operation].observe(value)
+            if error:
+                self._errors[operation] = self._errors.get(operation, 0) + 1
+
+    def observe_hashing(self, queue_wait, hash_time):
+        with self._lock:
+            self._hashing['password_hashing_queue_wait_seconds'].observe(queue_wait)
+            self._hashing['password_hashing_duration_seconds'].observe(hash_time)
+
+    def reject_hashing(self):
+        with self._lock:
+            self._hashing_rejected += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (description, _) in METRICS.items():
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for operation, histogram in sorted(self._histograms[name].items()):
+                    lines += _histogram_lines(name, histogram, f'operation="{_escape(operation)}"')
+            lines += ['# HELP graphql_errors_total Operaciones con errores', '# TYPE graphql_errors_total counter']
+            for operation, count in sorted(self._errors.items()):
+                lines.append(f'graphql_errors_total{{operation="{_escape(operation)}"}} {count}')
+            for name, (description, _) in HASHING_METRICS.items():
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                lines += _histogram_lines(name, self._hashing[name])
+            lines += [
+                '# HELP password_hashing_rejected_total Hashes rechazados por la cola llena',
+                '# TYPE password_hashing_rejected_total counter',
+                f'password_hashing_rejected_total {self._hashing_rejected}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name, histogram, labels=''):
+    prefix = f'{labels},' if labels else ''
+    suffix = f'{{{labels}}}' if labels else ''
+    lines = [
+        f'{name}_bucket{{{prefix}le="{bound}"}} {count}'
+        for bound, count in zip(histogram.buckets, histogram.counts)
+    ]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{suffix} {histogram.sum}')
+    lines.append(f'{name}_count{suffix} {histogram.count}')
+    return lines
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics_registry = MetricsRegistry()
+
+
+class Profile:
+    """
+    Tiempos de una operación GraphQL: parseo y validación, ejecución, SQL
+    (con `connection.execute_wrapper`), hash de contraseñas y, si
+    `resolvers` es verdadero, cada resolver (ver ResolverTimingMiddleware).
+
+    `activate` la asocia al contexto actual, de donde la leen el middleware
+    y `observe_hash`; `install_sql` debe llamarse en el hilo que ejecuta las
+    consultas, igual que SQLDebug.
+    """
+
+    def __init__(self, resolvers=False):
+        self.resolvers = resolvers
+        self.operation = None
+        self.error = False
+        self.started = time.perf_counter()
+        self.finished = None
+        self.phases = {'parse_validate': 0.0, 'execute': 0.0}
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.hash_count = 0
+        self.hash_time = 0.0
+        self.fields = {}
+        self._lock = threading.Lock()
+        self._sql = None
+
+    def activate(self):
+        self._token = _current.set(self)
+
+    def deactivate(self):
+        _current.reset(self._token)
+
+    def install_sql(self):
+        self._sql = connections.all()
+        for connection in self._sql:
+            connection.execute_wrappers.append(self._time_sql)
+
+    def uninstall_sql(self):
+        # Se quita su propio wrapper y no el último: las operaciones de un
+        # lote que se ejecutan a la vez no terminan en el orden en que empiezan
+        if self._sql is not None:
+            for connection in self._sql:
+                connection.execute_wrappers.remove(self._time_sql)
+            self._sql = None
+
+    def __enter__(self):
+        self.activate()
+        self.install_sql()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.uninstall_sql()
+        self.deactivate()
+
+    def _time_sql(self, execute, sql, params, many, context):
+        # Con operaciones concurrentes en la misma conexión, cada una cuenta
+        # solo las consultas que se ejecutan en su contexto
+        if _current.get() is not self:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.sql_count += 1
+                self.sql_time += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - started
+
+    def observe_hash(self, elapsed):
+        with self._lock:
+            self.hash_count += 1
+            self.hash_time += elapsed
+
+    def observe_field(self, field, elapsed):
+        with self._lock:
+            count, total, slowest = self.fields.get(field, (0, 0.0, 0.0))
+            self.fields[field] = (count + 1, total + elapsed, max(slowest, elapsed))
+
+    def finish(self):
+        """Cierra la medición y la agrega a las métricas del proceso."""
+        if self.finished is not None:
+            return
+        self.finished = time.perf_counter()
+        values = {
+            'graphql_request_duration_seconds': self.finished - self.started,
+            'graphql_parse_validate_seconds': self.phases['parse_validate'],
+            'graphql_execute_seconds': self.phases['execute'],
+            'graphql_sql_queries': self.sql_count,
+            'graphql_sql_duration_seconds': self.sql_time,
+        }
+        if self.hash_count:
+            values['graphql_password_hash_seconds'] = self.hash_time
+        metrics_registry.observe(self.operation or 'anonymous', values, error=self.error)
+
+    def report(self):
+        """Resumen para `extensions.timing` de la respuesta."""
+        total = (self.finished or time.perf_counter()) - self.started
+        report = {
+            'total': round(total, 6),
+            'parseValidate': round(self.phases['parse_validate'], 6),
+            'execute': round(self.phases['execute'], 6),
+            'sql': {'count': self.sql_count, 'time': round(self.sql_time, 6)},
+            'passwordHash': {'count': self.hash_count, 'time': round(self.hash_time, 6)},
+        }
+        if self.resolvers:
+            report['resolvers'] = [
+                {'field': field, 'count': count, 'time': round(total, 6), 'max': round(slowest, 6)}
+                for field, (count, total, slowest) in sorted(
+                    self.fields.items(), key=lambda item: item[1][1], reverse=True
+                )
+            ]
+        return report
+
+
+def instrumentation_enabled():
+    return _config('ENABLED', True)
+
+
+def wants_timing(request):
+    """
+    Indica si la solicitud pide el detalle de tiempos con el encabezado de
+    depuración. En DEBUG basta con enviarlo; fuera de DEBUG su valor debe
+    coincidir con `DEBUG_TOKEN`.
+    """
+    value = request.headers.get(_config('DEBUG_HEADER', 'X-GraphQL-Debug'))
+    if not value:
+        return False
+    token = _config('DEBUG_TOKEN', '')
+    return constant_time_compare(value, token) if token else settings.DEBUG
+
+
+def metrics_authorized(request):
+    """Si `METRICS_TOKEN` está definido, /metrics lo exige como `Bearer <token>`."""
+    token = _config('METRICS_TOKEN', '')
+    return not token or constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def observe_hash(elapsed):
+    """Suma el tiempo de un hash de contraseña a la operación en curso."""
+    profile = _current.get()
+    if profile is not None:
+        profile.observe_hash(elapsed)
+
+
+class ResolverTimingMiddleware:
+    """
+    Middleware de graphene que mide cada resolver de la operación en curso.
+
+    Solo se agrega cuando la solicitud pide el detalle (encabezado de
+    depuración), porque envuelve todos los campos, incluidos los escalares.
+    Para un resolver asíncrono se mide hasta que termina el awaitable.
+    """
+
+    def resolve(self, next, root, info, **args):
+        profile = _current.get()
+        if profile is None:
+            return next(root, info, **args)
+        field = f'{info.parent_type.name}.{info.field_name}'
+        started = time.perf_counter()
+        result = next(root, info, **args)
+        if inspect.isawaitable(result):
+            return self._await(result, profile, field, started)
+        profile.observe_field(field, time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    async def _await(result, profile, field, started):
+        try:
+            return await result
+        finally:
+            profile.observe_field(field, time.perf_counter() - started)
@@ -0,0 +1,45 @@
+import inspect
+from asgiref.sync import sync_to_async
+from django.db.models import Model, QuerySet
+from graphql import GraphQLList, GraphQLObjectType, get_named_type, get_nullable_type
+
+
+def _call_sync(next, root, info, **args):
+    result = next(root, info, **args)
+    # Los querysets son perezosos: se evalúan aquí, dentro del hilo
+    if isinstance(result, QuerySet):
+        result = list(result)
+    return result
+
+
+class SyncResolverMiddleware:
+    """
+    Middleware de graphene para el esquema asíncrono.
+
+    Ejecuta en un hilo (sync_to_async) los resolvers síncronos que pueden
+    tocar la base de datos: los campos raíz, como tokenAuth o createCountry, y
+    las relaciones de instancias de modelos. Los resolvers `async def`, los
+    que usan DataLoaders (`users.loaders.batched`) y los campos escalares se
+    resuelven directamente en el event loop.
+    """
+
+    def resolve(self, next, root, info, **args):
+        field = info.parent_type.fields[info.field_name]
+        resolve = inspect.unwrap(field.resolve or (lambda: None))
+        if inspect.iscoroutinefunction(resolve) or getattr(resolve, 'runs_in_event_loop', False):
+            return next(root, info, **args)
+        if root is None or (isinstance(root, Model) and self._is_relation(field)):
+            return self._resolve_in_thread(next, root, info, **args)
+        return next(root, info, **args)
+
+    @staticmethod
+    def _is_relation(field):
+        field_type = get_nullable_type(field.type)
+        return isinstance(field_type, GraphQLList) or isinstance(get_named_type(field_type), GraphQLObjectType)
+
+    @staticmethod
+    async def _resolve_in_thread(next, root, info, **args):
+        result = await sync_to_async(_call_sync)(next, root, info, **args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
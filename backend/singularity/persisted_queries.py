@@ -0,0 +1,159 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import caches
+from graphql import (
+    FieldNode, GraphQLError, NameNode, OperationDefinitionNode, SelectionSetNode, Visitor, parse, validate,
+    visit,
+)
+from users.cache import LRUCache
+
+# Prefijo de las llaves de consultas persistidas automáticamente (APQ)
+APQ_KEY_PREFIX = 'apq:'
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class _AddTypename(Visitor):
+    # Igual que addTypenameToDocument de Apollo Client
+    def enter_selection_set(self, node, key, parent, *_args):
+        if isinstance(parent, OperationDefinitionNode):
+            return None
+        if any(isinstance(selection, FieldNode) and selection.name.value.startswith('__')
+               for selection in node.selections):
+            return None
+        if isinstance(parent, FieldNode) and any(d.name.value == 'export' for d in parent.directives or ()):
+            return None
+        typename = FieldNode(name=NameNode(value='__typename'), arguments=(), directives=())
+        return SelectionSetNode(selections=(*node.selections, typename))
+
+
+def add_typename(document):
+    """
+    Agrega `__typename` a cada selección, salvo la raíz de la operación, como
+    lo hace la caché de Apollo Client antes de enviar un documento.
+    """
+    return visit(document, _AddTypename())
+
+
+def _config(name, default=None):
+    return getattr(settings, 'GRAPHQL_PERSISTED_QUERIES', {}).get(name, default)
+
+
+class PersistedQueryNotFound(GraphQLError):
+    def __init__(self):
+        super().__init__('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+
+
+class PersistedQueryNotAllowed(GraphQLError):
+    def __init__(self):
+        super().__init__(
+            'Solo se permiten consultas persistidas',
+            extensions={'code': 'PERSISTED_QUERY_NOT_ALLOWED'}
+        )
+
+
+class PersistedQueryHashMismatch(GraphQLError):
+    def __init__(self):
+        super().__init__(
+            'El hash no corresponde a la consulta enviada',
+            extensions={'code': 'PERSISTED_QUERY_HASH_MISMATCH'}
+        )
+
+
+class PersistedQueryRegistry:
+    """
+    Resuelve el texto de una consulta a partir de su hash sha256.
+
+    Combina un registro estático generado en el despliegue (un JSON
+    `{hash: consulta}`, ver el comando `build_persisted_queries`) con el
+    protocolo APQ: el cliente envía solo el hash y, si el servidor no lo
+    conoce, lo reenvía junto con el texto para registrarlo en la caché
+    compartida. Con `ONLY_PERSISTED` solo se aceptan consultas del registro
+    estático.
+    """
+
+    def __init__(self):
+        self._static = None
+
+    @property
+    def static(self):
+        if self._static is None:
+            path = _config('REGISTRY_FILE')
+            if path:
+                with open(path, encoding='utf-8') as registry:
+                    self._static = json.load(registry)
+            else:
+                self._static = {}
+        return self._static
+
+    def reload(self):
+        self._static = None
+
+    @property
+    def shared(self):
+        return caches[_config('CACHE_ALIAS', 'default')]
+
+    def resolve(self, query, extensions):
+        persisted = (extensions or {}).get('persistedQuery') or {}
+        digest = persisted.get('sha256Hash')
+        only_persisted = _config('ONLY_PERSISTED', False)
+
+        if digest is None:
+            if query and only_persisted and query_hash(query) not in self.static:
+                raise PersistedQueryNotAllowed()
+            return query
+
+        if query:
+            if query_hash(query) != digest:
+                raise PersistedQueryHashMismatch()
+            if digest in self.static:
+                return query
+            if only_persisted:
+                raise PersistedQueryNotAllowed()
+            self.shared.set(APQ_KEY_PREFIX + digest, query, timeout=_config('APQ_TIMEOUT', None))
+            return query
+
+        query = self.static.get(digest)
+        if query is None and not only_persisted:
+            query = self.shared.get(APQ_KEY_PREFIX + digest)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+
+
+class DocumentCache:
+    """
+    LRU de documentos ya parseados y validados, indexado por el hash de la consulta.
+
+    Cada entrada guarda `(documento, errores)`: si el parseo falla el
+    documento es None, y los errores de validación también se conservan para
+    no repetir el trabajo con consultas inválidas.
+    """
+
+    def __init__(self, maxsize=None):
+        self._cache = LRUCache(maxsize or _config('DOCUMENT_CACHE_SIZE', 512))
+
+    def get(self, schema, query, validation_rules=None, max_errors=None):
+        key = (id(schema), tuple(validation_rules or ()), query_hash(query))
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            entry = (None, [e])
+        else:
+            entry = (document, validate(schema, document, validation_rules, max_errors))
+        self._cache.set(key, entry)
+        return entry
+
+    def clear(self):
+        self._cache.clear()
+
+
+registry = PersistedQueryRegistry()
+document_cache = DocumentCache()
@@ -0,0 +1,106 @@
+import json
+import threading
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from psycopg_pool import ConnectionPool
+
+# Pools del proceso, uno por combinación de parámetros de conexión
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def reset_session(connection):
+    # psycopg_pool ya deshizo la transacción abierta; DISCARD ALL limpia el
+    # estado de la sesión (variables, tablas temporales, sentencias
+    # preparadas) para que la siguiente solicitud no lo herede. No se puede
+    # ejecutar dentro de una transacción; Django vuelve a fijar autocommit y
+    # la zona horaria al tomar la conexión.
+    connection.autocommit = True
+    connection.execute('DISCARD ALL')
+
+
+def close_pools():
+    """Cierra los pools del proceso; las conexiones en uso se cierran al devolverlas."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # PostgreSQL no elimina una base de datos con sesiones abiertas
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Backend de PostgreSQL (psycopg 3) que toma las conexiones de un
+    `psycopg_pool.ConnectionPool` del proceso.
+
+    Se configura en `OPTIONS['pool']` con argumentos de ConnectionPool
+    (`min_size`, `max_size`, `timeout`, `max_idle`, ...). Cerrar la conexión
+    al final de la solicitud la devuelve al pool, así que el saludo TCP/TLS
+    y la autenticación solo ocurren cuando el pool crece. Con
+    CONN_HEALTH_CHECKS el pool prueba cada conexión antes de entregarla, y
+    al devolverla se limpia la sesión con `reset_session`.
+
+    Django 5.1 trae este pool integrado (`OPTIONS['pool']` del backend
+    postgresql); este backend se puede retirar al actualizar.
+    """
+
+    creation_class = DatabaseCreation
+
+    @property
+    def pool_options(self):
+        return self.settings_dict['OPTIONS'].get('pool') or {}
+
+    @property
+    def pooled(self):
+        return self.alias != NO_DB_ALIAS
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_pool(self, conn_params):
+        key = json.dumps(conn_params, sort_keys=True, default=str)
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    options = {'min_size': 1, 'max_size': 10, 'timeout': 30, **self.pool_options}
+                    health_checks = self.settings_dict['CONN_HEALTH_CHECKS']
+                    pool = _pools[key] = ConnectionPool(
+                        kwargs=conn_params,
+                        check=ConnectionPool.check_connection if health_checks else None,
+                        reset=reset_session,
+                        name=self.alias,
+                        open=True,
+                        **options,
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        if not self.pooled:
+            return super().get_new_connection(conn_params)
+
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = base.IsolationLevel(
+            isolation_level if isolation_level is not None else base.IsolationLevel.READ_COMMITTED
+        )
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None or not self.pooled:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
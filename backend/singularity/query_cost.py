@@ -0,0 +1,192 @@
+import logging
+from django.conf import settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, GraphQLList,
+    InlineFragmentNode, get_named_type, get_nullable_type, is_leaf_type,
+)
+from graphql.execution.values import get_argument_values, get_variable_values
+from .persisted_queries import query_hash, registry
+
+logger = logging.getLogger(__name__)
+
+# Argumentos que fijan cuántos elementos devuelve un campo de lista
+SIZE_ARGUMENTS = ('first', 'last', 'limit')
+
+# Argumentos de lista con los elementos que procesa un campo (mutaciones por lote)
+BATCH_ARGUMENTS = ('inputs',)
+
+
+def _config(name, default=None):
+    return getattr(settings, 'GRAPHQL_QUERY_COST', {}).get(name, default)
+
+
+def _budget(query, name):
+    # Los presupuestos propios se indexan por el hash del documento y solo
+    # valen para el registro estático: el nombre de la operación lo elige el
+    # cliente, y cualquiera podría usar el de una operación con más margen
+    digest = query_hash(query) if query else None
+    overrides = _config('OPERATIONS', {}).get(digest) if digest in registry.static else None
+    return (overrides or {}).get(name, _config(name))
+
+
+class QueryTooDeep(GraphQLError):
+    def __init__(self, cost, max_depth):
+        super().__init__(
+            f'La consulta excede la profundidad máxima permitida ({cost.depth} > {max_depth})',
+            extensions={'code': 'QUERY_TOO_DEEP', 'depth': cost.depth, 'maxDepth': max_depth}
+        )
+
+
+class QueryTooExpensive(GraphQLError):
+    def __init__(self, cost, max_cost):
+        super().__init__(
+            f'La consulta excede el costo máximo permitido ({cost.cost} > {max_cost})',
+            extensions={'code': 'QUERY_TOO_EXPENSIVE', 'cost': cost.cost, 'maxCost': max_cost}
+        )
+
+
+class QueryCost:
+    """Costo y profundidad estimados de una operación, antes de ejecutarla."""
+
+    def __init__(self, operation_name, operation_type, cost, depth):
+        self.operation_name = operation_name
+        self.operation_type = operation_type
+        self.cost = cost
+        self.depth = depth
+
+    def as_dict(self):
+        return {
+            'operation': self.operation_name,
+            'type': self.operation_type,
+            'cost': self.cost,
+            'depth': self.depth,
+        }
+
+
+class CostAnalyzer:
+    """
+    Calcula el costo de una operación recorriendo su selección.
+
+    Cada campo pesa `FIELD_COSTS['Tipo.campo']` (por defecto 1 si devuelve
+    un objeto y 0 si es escalar), una vez por elemento de `inputs` en las
+    mutaciones por lote, más el costo de su selección multiplicado por el
+    número de elementos que puede devolver: el valor de first, last o
+    limit si lo tiene, o DEFAULT_LIST_SIZE para las listas sin límite. Las
+    listas cuyo padre ya fijó el tamaño (los `edges` de una conexión) no se
+    multiplican de nuevo. Los campos de introspección no cuentan.
+    """
+
+    def __init__(self, schema, document, variables):
+        self.schema = schema
+        self.variables = variables
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.field_costs = _config('FIELD_COSTS', {})
+        self.default_list_size = _config('DEFAULT_LIST_SIZE', 10)
+
+    def analyze(self, operation):
+        root_type = self.schema.get_root_type(operation.operation)
+        cost, depth = self._selection_cost(root_type, operation.selection_set, sized=False)
+        name = operation.name.value if operation.name else None
+        return QueryCost(name, operation.operation.value, cost, depth)
+
+    def _field_nodes(self, parent_type, selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield parent_type, selection
+                continue
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+                type_condition, selection_set_ = fragment.type_condition, fragment.selection_set
+            elif isinstance(selection, InlineFragmentNode):
+                type_condition, selection_set_ = selection.type_condition, selection.selection_set
+            else:
+                continue
+            fragment_type = self.schema.get_type(type_condition.name.value) if type_condition else parent_type
+            yield from self._field_nodes(fragment_type, selection_set_)
+
+    def _selection_cost(self, parent_type, selection_set, sized):
+        cost = depth = 0
+        for field_type, node in self._field_nodes(parent_type, selection_set):
+            field_cost, field_depth = self._field_cost(field_type, node, sized)
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def _field_cost(self, parent_type, node, parent_sized):
+        name = node.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if name.startswith('__') or field is None:
+            return 0, 0
+
+        named_type = get_named_type(field.type)
+        arguments = self._arguments(field, node)
+        weight = self.field_costs.get(f'{parent_type.name}.{name}', 0 if is_leaf_type(named_type) else 1)
+        weight *= self._batch_size(arguments)
+        if node.selection_set is None:
+            return weight, 1
+
+        size = self._size(arguments)
+        if size is not None:
+            multiplier = size
+        elif isinstance(get_nullable_type(field.type), GraphQLList) and not parent_sized:
+            multiplier = self.default_list_size
+        else:
+            multiplier = 1
+        child_cost, child_depth = self._selection_cost(named_type, node.selection_set, sized=size is not None)
+        return weight + multiplier * child_cost, 1 + child_depth
+
+    def _arguments(self, field, node):
+        try:
+            return get_argument_values(field, node, self.variables)
+        except GraphQLError:
+            return {}
+
+    @staticmethod
+    def _size(arguments):
+        for name in SIZE_ARGUMENTS:
+            value = arguments.get(name)
+            if isinstance(value, int):
+                return max(value, 0)
+        return None
+
+    @staticmethod
+    def _batch_size(arguments):
+        for name in BATCH_ARGUMENTS:
+            value = arguments.get(name)
+            if isinstance(value, list):
+                return max(len(value), 1)
+        return 1
+
+
+def analyze_operation(schema, document, operation, variables):
+    """QueryCost de `operation`, o None si las variables no son válidas (la ejecución lo reporta)."""
+    coerced = get_variable_values(schema, operation.variable_definitions or (), variables or {})
+    if isinstance(coerced, list):
+        return None
+    return CostAnalyzer(schema, document, coerced).analyze(operation)
+
+
+def check_budget(cost, query=None):
+    """Devuelve el error estructurado si `cost` excede los límites de la consulta `query`."""
+    max_depth = _budget(query, 'MAX_DEPTH')
+    if max_depth is not None and cost.depth > max_depth:
+        return QueryTooDeep(cost, max_depth)
+    max_cost = _budget(query, 'MAX_COST')
+    if max_cost is not None and cost.cost > max_cost:
+        return QueryTooExpensive(cost, max_cost)
+    return None
+
+
+def record(cost, rejected):
+    # Un registro por operación para ajustar los límites con tráfico real
+    logger.info(
+        'graphql operation=%s type=%s cost=%s depth=%s rejected=%s',
+        cost.operation_name or '-', cost.operation_type, cost.cost, cost.depth, rejected,
+        extra={'graphql_cost': {**cost.as_dict(), 'rejected': rejected}},
+    )
@@ -1,6 +1,8 @@
 import graphene
 from users.schema import Query as users_query
 from users.schema import Mutation as users_mutation
+from users.schema import AsyncQuery as users_async_query
+from users.schema import AsyncMutation as users_async_mutation
 
 class Query(users_query, graphene.ObjectType):
     pass
@@ -8,4 +10,14 @@ class Query(users_query, graphene.ObjectType):
 class Mutation(users_mutation, graphene.ObjectType):
     pass
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = graphene.Schema(query=Query, mutation=Mutation)
+
+class AsyncQuery(users_async_query, graphene.ObjectType):
+    class Meta:
+        name = 'Query'
+
+class AsyncMutation(users_async_mutation, graphene.ObjectType):
+    class Meta:
+        name = 'Mutation'
+
+async_schema = graphene.Schema(query=AsyncQuery, mutation=AsyncMutation)
\ No newline at end of file
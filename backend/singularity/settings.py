@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'singularity.db_router.ReplicaRoutingMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -65,20 +66,133 @@ TEMPLATES = [
 WSGI_APPLICATION = 'singularity.wsgi.application'
 
 # Database configuration
+# Connection reuse. CONN_MAX_AGE keeps a connection open across requests for
+# that many seconds (0 closes it after every request) and CONN_HEALTH_CHECKS
+# verifies a reused connection before the request runs.
+# DB_POOL switches to singularity.pooled_postgresql, which takes connections
+# from a per-process psycopg_pool.ConnectionPool of
+# DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections; requests wait up to
+# DB_POOL_TIMEOUT seconds for a free one. OPTIONS['pool'] is passed to
+# ConnectionPool as is, so other arguments (max_idle, max_lifetime, ...) can be
+# added there. Closing a pooled connection returns it to the pool (after
+# DISCARD ALL), so CONN_MAX_AGE is 0 in that mode; CONN_HEALTH_CHECKS then runs
+# ConnectionPool.check_connection on each checkout instead.
+DB_POOL = env.bool('DB_POOL', default=False)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'singularity.pooled_postgresql' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': env('DB_NAME', default='singularity_db'),
         'USER': env('DB_USER', default='singularity_user'),
         'PASSWORD': env('DB_PASSWORD', default=''),
         'HOST': env('DB_HOST', default='localhost'),
         'PORT': env('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else env.int('CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': env.bool('CONN_HEALTH_CHECKS', default=True),
+        'OPTIONS': {
+            'pool': {
+                'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+                'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+                'timeout': env.float('DB_POOL_TIMEOUT', default=30),
+            },
+        } if DB_POOL else {},
         'TEST': {
             'NAME': 'singularity_db_test',
         },
     }
 }
 
+# Read replica. Setting DB_REPLICA_HOST adds a 'replica' alias with the same
+# credentials (override with DB_REPLICA_NAME/USER/PASSWORD/PORT). Inside a
+# request, reads go to the replica and writes to default; mutations, and any
+# read after a write in the same request, use default. After a write the
+# client gets a cookie that keeps its reads on default for
+# REPLICA_STICKY_SECONDS (set it above the replication lag).
+DB_REPLICA_HOST = env('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': env('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': env('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': env('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': env('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        # Tests use the primary's test database through this alias
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['singularity.db_router.ReplicaRouter']
+
+REPLICA_ROUTING = {
+    'ALIAS': 'replica' if DB_REPLICA_HOST else None,
+    'STICKY_SECONDS': env.int('REPLICA_STICKY_SECONDS', default=5),
+    'COOKIE_NAME': 'db_primary_until',
+}
+
+# Cache configuration
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', default='singularity'),
+    }
+}
+
+# Reference data (countries, document types) cache.
+# The data version is a Postgres sequence (users/cache.py), so an
+# invalidation in one worker reaches the others within VERSION_CHECK_INTERVAL
+# seconds; local entries expire after LOCAL_TIMEOUT seconds in any case.
+# ALIAS optionally adds a shared tier from CACHES. Point it at a cache every
+# worker shares (Redis, memcached), never at a per-process LocMemCache.
+REFERENCE_DATA_CACHE = {
+    'ALIAS': env('REFERENCE_DATA_CACHE_ALIAS', default='') or None,
+    'LOCAL_MAXSIZE': env.int('REFERENCE_DATA_CACHE_LOCAL_MAXSIZE', default=128),
+    'LOCAL_TIMEOUT': env.int('REFERENCE_DATA_CACHE_LOCAL_TIMEOUT', default=300),
+    'VERSION_CHECK_INTERVAL': env.float('REFERENCE_DATA_CACHE_VERSION_CHECK_INTERVAL', default=1),
+    'TIMEOUT': env.int('REFERENCE_DATA_CACHE_TIMEOUT', default=3600),
+}
+
+# Per-process cache of authenticated users (users/cache.py). Saving a user
+# invalidates it in the same process; other workers see the change within
+# TIMEOUT seconds (0 disables the cache).
+USER_CACHE = {
+    'TIMEOUT': env.int('USER_CACHE_TIMEOUT', default=30),
+    'MAXSIZE': env.int('USER_CACHE_MAXSIZE', default=1024),
+}
+
+# Password hashing pool (users/hashing.py). Registration and login hash in
+# BACKEND ('thread' or 'process') workers; once WORKERS + MAX_QUEUE jobs are
+# in flight new requests fail fast with a "try again" error.
+PASSWORD_HASHING = {
+    'BACKEND': env('PASSWORD_HASHING_BACKEND', default='thread'),
+    'WORKERS': env.int('PASSWORD_HASHING_WORKERS', default=os.cpu_count() or 1),
+    'MAX_QUEUE': env.int('PASSWORD_HASHING_MAX_QUEUE', default=64),
+}
+
+# Password hashers (users/hashers.py). PASSWORD_HASHER picks the algorithm
+# used for new hashes: 'pbkdf2_sha256', 'bcrypt_sha256' or 'argon2'. The other
+# algorithms stay enabled so existing hashes keep verifying and are upgraded
+# on the next successful login, as are hashes with outdated work factors.
+# Unset work factors fall back to Django's defaults.
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2_sha256': 'users.hashers.PBKDF2PasswordHasher',
+    'bcrypt_sha256': 'users.hashers.BCryptSHA256PasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHER = env('PASSWORD_HASHER', default='pbkdf2_sha256')
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASHER_WORK_FACTORS = {
+    'PBKDF2_ITERATIONS': env.int('PBKDF2_ITERATIONS', default=None),
+    'BCRYPT_ROUNDS': env.int('BCRYPT_ROUNDS', default=None),
+    'ARGON2_TIME_COST': env.int('ARGON2_TIME_COST', default=None),
+    'ARGON2_MEMORY_COST': env.int('ARGON2_MEMORY_COST', default=None),
+    'ARGON2_PARALLELISM': env.int('ARGON2_PARALLELISM', default=None),
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,6 +225,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom user model
 AUTH_USER_MODEL = 'users.AppUser'
 
+# Serve /graphql/ with the async view. asgi.py turns this on by default.
+GRAPHQL_ASYNC = env.bool('GRAPHQL_ASYNC', default=False)
+
 # GraphQL settings
 GRAPHENE = {
     'SCHEMA': 'singularity.schema.schema',
@@ -119,6 +236,144 @@ GRAPHENE = {
     ],
 }
 
+GRAPHQL_JWT = {
+    # Adds user_id to the token so requests can authenticate without a query
+    'JWT_PAYLOAD_HANDLER': 'users.auth.jwt_payload',
+    # Rejects revoked tokens (users/revocation.py)
+    'JWT_DECODE_HANDLER': 'users.auth.jwt_decode',
+}
+
+# Token revocation (logout, revokeUserTokens, disabled users). Each process
+# keeps a Bloom filter of revoked tokens and a map of revoked users'
+# generations so valid tokens are checked without I/O, and pulls new
+# revocations from BACKEND at most every SYNC_INTERVAL seconds. Run
+# `manage.py purge_token_revocations` periodically to drop expired entries.
+# OPTIONS are passed to the backend. The default database backend takes none.
+# For tests, or a single host without a database, use
+# users.revocation.SQLiteRevocationBackend with OPTIONS {'PATH': ...}, the
+# SQLite file that every process on the host shares.
+TOKEN_REVOCATION = {
+    'BACKEND': env('TOKEN_REVOCATION_BACKEND', default='users.revocation.DatabaseRevocationBackend'),
+    'OPTIONS': {},
+    'SYNC_INTERVAL': env.float('TOKEN_REVOCATION_SYNC_INTERVAL', default=5),
+    'CAPACITY': env.int('TOKEN_REVOCATION_CAPACITY', default=100000),
+    'ERROR_RATE': 0.001,
+}
+
+# Live availability checks for the registration form (checkAvailability).
+# Each process keeps a Bloom filter of registered emails, usernames and
+# documents: values not in it are free without a query. New registrations
+# from other processes are pulled every SYNC_INTERVAL seconds and the filter
+# is rebuilt every REBUILD_INTERVAL seconds (forgetting deleted values).
+AVAILABILITY_INDEX = {
+    'CAPACITY': env.int('AVAILABILITY_INDEX_CAPACITY', default=100000),
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': env.float('AVAILABILITY_INDEX_SYNC_INTERVAL', default=30),
+    'REBUILD_INTERVAL': env.float('AVAILABILITY_INDEX_REBUILD_INTERVAL', default=3600),
+}
+
+# Background jobs stored in Job_TB (users/jobs.py) and run by
+# `manage.py run_workers`. Failed jobs are retried up to MAX_ATTEMPTS times
+# after BACKOFF_BASE * 2^(attempt - 1) seconds (capped at BACKOFF_MAX, with
+# jitter); jobs left running for LOCK_TIMEOUT seconds are requeued.
+JOB_QUEUE = {
+    'CONCURRENCY': env.int('JOB_WORKERS', default=4),
+    'BATCH_SIZE': env.int('JOB_BATCH_SIZE', default=10),
+    'POLL_INTERVAL': env.float('JOB_POLL_INTERVAL', default=1),
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 10,
+    'BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 300,
+}
+
+# Email. Verification emails are sent by the job queue, never during the
+# request. The console backend prints them; configure SMTP in production.
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = env('EMAIL_HOST', default='localhost')
+EMAIL_PORT = env.int('EMAIL_PORT', default=25)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=False)
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='no-reply@singularity.local')
+
+# Link sent in the verification email ({token} is replaced) and how long the
+# token stays valid, in seconds
+EMAIL_VERIFICATION = {
+    'URL': env('EMAIL_VERIFICATION_URL', default='http://localhost:3000/verify-email?token={token}'),
+    'MAX_AGE': env.int('EMAIL_VERIFICATION_MAX_AGE', default=3 * 24 * 3600),
+}
+
+# Per-operation timing (singularity/instrumentation.py). Histograms by
+# operation name are served at /metrics in Prometheus text format; requests
+# sending DEBUG_HEADER also get extensions.timing with per-resolver detail.
+# Outside DEBUG the header value must equal DEBUG_TOKEN, and METRICS_TOKEN,
+# when set, is required as a Bearer token on /metrics.
+GRAPHQL_INSTRUMENTATION = {
+    'ENABLED': env.bool('GRAPHQL_INSTRUMENTATION', default=True),
+    'DEBUG_HEADER': 'X-GraphQL-Debug',
+    'DEBUG_TOKEN': env('GRAPHQL_DEBUG_TOKEN', default=''),
+    'METRICS_TOKEN': env('METRICS_TOKEN', default=''),
+    'MAX_OPERATIONS': 200,
+}
+
+# Add the SQL run by each operation to the response under extensions.sql
+GRAPHQL_DEBUG_SQL = env.bool('GRAPHQL_DEBUG_SQL', default=DEBUG)
+
+# /graphql/batch/ accepts a JSON array of up to MAX_OPERATIONS operations.
+# Each one is still checked against GRAPHQL_QUERY_COST on its own.
+GRAPHQL_BATCH = {
+    'MAX_OPERATIONS': env.int('GRAPHQL_BATCH_MAX_OPERATIONS', default=10),
+}
+
+# Cache-Control max-age (seconds) for cacheable GET queries on /graphql/
+GRAPHQL_HTTP_CACHE_MAX_AGE = env.int('GRAPHQL_HTTP_CACHE_MAX_AGE', default=300)
+
+# Persisted queries and parsed-document cache for /graphql/.
+# REGISTRY_FILE is a JSON {sha256: query} built at deploy time with
+# `manage.py build_persisted_queries`; ONLY_PERSISTED rejects anything else.
+GRAPHQL_PERSISTED_QUERIES = {
+    'REGISTRY_FILE': env('GRAPHQL_PERSISTED_QUERIES_FILE', default=None),
+    'ONLY_PERSISTED': env.bool('GRAPHQL_ONLY_PERSISTED_QUERIES', default=False),
+    'CACHE_ALIAS': 'default',
+    'APQ_TIMEOUT': env.int('GRAPHQL_APQ_TIMEOUT', default=None),
+    'DOCUMENT_CACHE_SIZE': env.int('GRAPHQL_DOCUMENT_CACHE_SIZE', default=512),
+}
+
+# Static cost and depth budgets checked before executing each operation
+# (see singularity/query_cost.py). Fields weigh 1 if they return an object and
+# 0 if scalar, unless listed in FIELD_COSTS; nested selections are multiplied
+# by first/last/limit, or by DEFAULT_LIST_SIZE for unbounded lists. Batch
+# mutations weigh their FIELD_COSTS entry once per element of `inputs`.
+# OPERATIONS overrides MAX_DEPTH/MAX_COST per persisted-query hash; it only
+# applies to documents in the static registry (GRAPHQL_PERSISTED_QUERIES).
+GRAPHQL_QUERY_COST = {
+    'MAX_DEPTH': env.int('GRAPHQL_MAX_DEPTH', default=10),
+    'MAX_COST': env.int('GRAPHQL_MAX_COST', default=2000),
+    'DEFAULT_LIST_SIZE': env.int('GRAPHQL_DEFAULT_LIST_SIZE', default=10),
+    'FIELD_COSTS': {
+        'Query.searchUsers': 5,
+        'Mutation.tokenAuth': 10,
+        'Mutation.registerUser': 10,
+        'Mutation.bulkRegisterUsers': 10,
+    },
+    'OPERATIONS': {},
+}
+
+# Every operation's computed cost is logged to singularity.query_cost
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'singularity.query_cost': {
+            'handlers': ['console'],
+            'level': env('GRAPHQL_QUERY_COST_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 # CORS settings
 # For development, you might keep CORS_ALLOW_ALL_ORIGINS = env.bool('CORS_ALLOW_ALL_ORIGINS', True)
 # For more control, especially when moving towards production:
@@ -149,8 +404,10 @@ CORS_ALLOWED_HEADERS = [
 ]
 
 # Authentication backends
+# users.auth.JSONWebTokenBackend authenticates from the token claims and
+# loads the user lazily (see users/auth.py)
 AUTHENTICATION_BACKENDS = [
-    'graphql_jwt.backends.JSONWebTokenBackend',
+    'users.auth.JSONWebTokenBackend',
     'django.contrib.auth.backends.ModelBackend',
 ]
 
@@ -0,0 +1,33 @@
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class SQLDebug:
+    """
+    Captura las consultas SQL de todas las conexiones durante una operación.
+
+    Lo usan las vistas GraphQL cuando `GRAPHQL_DEBUG_SQL` está activo para
+    devolver el reporte en `extensions.sql` de la respuesta.
+    """
+
+    def __enter__(self):
+        self._contexts = [CaptureQueriesContext(connection) for connection in connections.all()]
+        for context in self._contexts:
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for context in self._contexts:
+            context.__exit__(*exc_info)
+
+    def report(self):
+        queries = [
+            {'alias': context.connection.alias, 'sql': query['sql'], 'time': float(query['time'])}
+            for context in self._contexts
+            for query in context.captured_queries
+        ]
+        return {
+            'count': len(queries),
+            'time': round(sum(query['time'] for query in queries), 6),
+            'queries': queries,
+        }
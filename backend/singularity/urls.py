@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+from users.views import export_users
+from .views import AsyncGraphQLView, CachingGraphQLView, metrics
+
+GraphQLViewClass = AsyncGraphQLView if settings.GRAPHQL_ASYNC else CachingGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('graphql/', csrf_exempt(GraphQLViewClass.as_view(graphiql=True))),
+    path('graphql/batch/', csrf_exempt(GraphQLViewClass.as_view(batch=True))),
+    path('metrics', metrics),
+    path('users/export', export_users),
 ]
\ No newline at end of file
@@ -0,0 +1,612 @@
+import asyncio
+import copy
+import hashlib
+import inspect
+import json
+from contextlib import ExitStack, nullcontext
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response, patch_cache_control
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError, instantiate_middleware
+from graphql import (
+    ExecutionResult, FieldNode, GraphQLError, OperationType,
+    execute, get_operation_ast, validate_schema,
+)
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.utils import get_http_authorization
+from users.cache import reference_cache
+from users.loaders import Loaders
+from .instrumentation import (
+    Profile, ResolverTimingMiddleware, instrumentation_enabled, metrics_authorized, metrics_registry,
+    wants_timing,
+)
+from .db_router import pin_to_primary
+from .middleware import SyncResolverMiddleware
+from .persisted_queries import document_cache, registry
+from .query_cost import analyze_operation, check_budget, record
+from .schema import async_schema
+from .sql_debug import SQLDebug
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """
+    GraphQLView con consultas persistidas y caché de documentos.
+
+    El texto de la consulta puede llegar completo o solo como hash en
+    `extensions.persistedQuery` (ver `singularity.persisted_queries`). El
+    parseo y la validación se guardan en un LRU acotado, así que los
+    documentos repetidos del frontend solo se procesan una vez por proceso.
+
+    Con `batch=True` recibe por POST una lista de hasta
+    `GRAPHQL_BATCH['MAX_OPERATIONS']` operaciones y responde una lista con el
+    resultado de cada una (`data`/`errors`, `id` y `status`). Comparten la
+    solicitud, y con ella el usuario autenticado y los DataLoaders; el error
+    de una operación no afecta a las demás.
+    """
+
+    def parse_body(self, request):
+        if self.batch and request.method.lower() != 'post':
+            raise HttpError(HttpResponseNotAllowed(['POST'], 'Batch requests must be sent with POST.'))
+        data = super().parse_body(request)
+        if self.batch:
+            if not isinstance(data, list) or not all(isinstance(entry, dict) for entry in data):
+                raise HttpError(HttpResponseBadRequest('Batch requests should receive a list of operations.'))
+            max_operations = settings.GRAPHQL_BATCH['MAX_OPERATIONS']
+            if len(data) > max_operations:
+                raise HttpError(HttpResponseBadRequest(
+                    f'Batch requests can contain at most {max_operations} operations.'
+                ))
+        return data
+
+    def batch_error(self, request, data, error):
+        """Resultado de una operación del lote que falló antes de ejecutarse."""
+        response = {
+            'errors': [self.format_error(error)],
+            'id': data.get('id'),
+            'status': error.response.status_code,
+        }
+        return self.json_encode(request, response), error.response.status_code
+
+    def get_extensions(self, request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        return extensions
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        request._persisted_query_error = None
+        try:
+            query = registry.resolve(query, self.get_extensions(request, data))
+        except GraphQLError as e:
+            request._persisted_query_error = e
+            query = None
+        return query, variables, operation_name, id
+
+    def get_response(self, request, data, show_graphiql=False):
+        if show_graphiql:
+            return super().get_response(request, data, show_graphiql)
+        if self.batch:
+            try:
+                return self._get_response(request, data)
+            except HttpError as e:
+                return self.batch_error(request, data, e)
+        return self._get_response(request, data)
+
+    def _get_response(self, request, data):
+        with ExitStack() as stack:
+            if settings.GRAPHQL_DEBUG_SQL:
+                request._sql_debug = stack.enter_context(SQLDebug())
+            profile = self.start_profile(request)
+            if profile is not None:
+                stack.enter_context(profile)
+                stack.callback(profile.finish)
+            return super().get_response(request, data)
+
+    def start_profile(self, request):
+        """
+        Inicia la medición de la operación (ver singularity/instrumentation.py).
+        El detalle por resolver y `extensions.timing` solo se activan con el
+        encabezado de depuración.
+        """
+        request._profile = Profile(resolvers=wants_timing(request)) if instrumentation_enabled() else None
+        return request._profile
+
+    def phase(self, request, name):
+        profile = getattr(request, '_profile', None)
+        return profile.phase(name) if profile is not None else nullcontext()
+
+    def set_operation(self, request, operation_ast, operation_name):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            name = operation_ast.name if operation_ast is not None else None
+            profile.operation = operation_name or (name.value if name else None)
+
+    def atomic_mutation(self, operation_ast):
+        """Si la operación es una mutación que debe correr en una transacción (ATOMIC_MUTATIONS)."""
+        return (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.MUTATION
+            and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+            )
+        )
+
+    def start_mutation(self, request):
+        # Las mutaciones leen y escriben en la principal (ver db_router) y,
+        # en un lote, no reutilizan lo que cargaron las operaciones anteriores
+        pin_to_primary()
+        if self.batch:
+            request._loaders = Loaders()
+
+    def get_middleware(self, request):
+        profile = getattr(request, '_profile', None)
+        if profile is not None and profile.resolvers:
+            return [ResolverTimingMiddleware(), *self.middleware]
+        return self.middleware
+
+    def json_encode(self, request, d, pretty=False):
+        extensions = {}
+        sql_debug = getattr(request, '_sql_debug', None)
+        if sql_debug is not None:
+            extensions['sql'] = sql_debug.report()
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.error = profile.error or bool(d.get('errors'))
+            if profile.resolvers:
+                extensions['timing'] = profile.report()
+        if extensions:
+            d = {**d, 'extensions': {**d.get('extensions', {}), **extensions}}
+        return super().json_encode(request, d, pretty)
+
+    def get_document(self, query):
+        return document_cache.get(
+            self.schema.graphql_schema,
+            query,
+            self.validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+
+    def check_query_cost(self, request, query, document, operation_ast, variables):
+        """
+        Calcula el costo estático de la operación (ver singularity/query_cost.py)
+        y devuelve el error estructurado si excede su presupuesto.
+        """
+        if operation_ast is None:
+            return None
+        request._query_cost = cost = analyze_operation(
+            self.schema.graphql_schema, document, operation_ast, variables
+        )
+        if cost is None:
+            return None
+        error = check_budget(cost, query)
+        record(cost, rejected=error is not None)
+        return error
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        # Misma lógica que GraphQLView.execute_graphql_request, pero el
+        # parseo y la validación salen de la caché de documentos.
+        persisted_query_error = getattr(request, '_persisted_query_error', None)
+        if persisted_query_error is not None:
+            return ExecutionResult(errors=[persisted_query_error])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        with self.phase(request, 'parse_validate'):
+            document, errors = self.get_document(query)
+        if document is None:
+            return ExecutionResult(errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        self.set_operation(request, operation_ast, operation_name)
+        if operation_ast is not None and operation_ast.operation == OperationType.MUTATION:
+            self.start_mutation(request)
+
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ['POST'],
+                    'Can only perform a {} operation from a POST request.'.format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        with self.phase(request, 'parse_validate'):
+            cost_error = self.check_query_cost(request, query, document, operation_ast, variables)
+        if cost_error is not None:
+            return ExecutionResult(data=None, errors=[cost_error])
+
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if self.atomic_mutation(operation_ast):
+                with transaction.atomic(), self.phase(request, 'execute'):
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            with self.phase(request, 'execute'):
+                return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class CachingGraphQLView(PersistedQueryGraphQLView):
+    """
+    GraphQLView que permite cachear en HTTP las consultas de solo lectura.
+
+    Una consulta es cacheable si llega por GET, es una operación `query` y
+    todos sus campos raíz pertenecen a `cacheable_fields`. Para esas
+    respuestas se calcula un ETag fuerte a partir de la versión de los datos y
+    del documento, se responde 304 ante un `If-None-Match` coincidente y se
+    emite `Cache-Control: public`. Todo lo demás (mutaciones, `me`, POST) se
+    marca como `no-store`.
+    """
+
+    cacheable_fields = frozenset({
+        'allCountries',
+        'allDocumentTypes',
+        'countryById',
+        'documentTypeById',
+        '__typename',
+    })
+
+    def get_data_version(self, request):
+        # La misma versión con que se arma la respuesta; se relee de la base a
+        # lo sumo cada VERSION_CHECK_INTERVAL segundos, así que tras invalidar
+        # en otro worker el ETag viejo se acepta durante ese intervalo
+        return reference_cache.version()
+
+    def get_etag(self, request):
+        if request.method != 'GET':
+            return None
+        try:
+            data = self.parse_body(request)
+            query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        except HttpError:
+            return None
+        if not query or (self.graphiql and self.can_display_graphiql(request, data)):
+            return None
+
+        document, errors = self.get_document(query)
+        if document is None or errors:
+            return None
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation != OperationType.QUERY:
+            return None
+        for selection in operation.selection_set.selections:
+            if not isinstance(selection, FieldNode) or selection.name.value not in self.cacheable_fields:
+                return None
+
+        digest = hashlib.sha256(json.dumps(
+            [self.get_data_version(request), query, variables, operation_name],
+            sort_keys=True,
+        ).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def dispatch(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is None:
+            return self.finalize_response(request, super().dispatch(request, *args, **kwargs), etag)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            # La respuesta es pública: se omite ensure_csrf_cookie del
+            # dispatch base para no emitir Set-Cookie ni Vary: Cookie.
+            response = GraphQLView.dispatch.__wrapped__(self, request, *args, **kwargs)
+        return self.finalize_response(request, response, etag)
+
+    def finalize_response(self, request, response, etag):
+        cacheable = etag is not None and (
+            response.status_code == 304
+            or (response.status_code == 200 and not getattr(request, '_graphql_errors', False))
+        )
+        if not cacheable:
+            if not response.has_header('Cache-Control'):
+                patch_cache_control(response, private=True, no_store=True)
+            return response
+
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.GRAPHQL_HTTP_CACHE_MAX_AGE)
+        return response
+
+    def execute_graphql_request(self, request, *args, **kwargs):
+        result = super().execute_graphql_request(request, *args, **kwargs)
+        request._graphql_errors = bool(result and result.errors)
+        return result
+
+
+class AsyncAtomic:
+    """
+    transaction.atomic para código asíncrono. Se entra y se sale en el hilo
+    de sync_to_async, el mismo (y con la misma conexión) donde corren las
+    consultas del ORM asíncrono de la solicitud.
+    """
+
+    def __init__(self):
+        self.atomic = transaction.atomic()
+
+    async def __aenter__(self):
+        await sync_to_async(self.atomic.__enter__)()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return await sync_to_async(self.atomic.__exit__)(exc_type, exc_value, traceback)
+
+
+class AsyncGraphQLView(CachingGraphQLView):
+    """
+    Vista GraphQL asíncrona para el punto de entrada ASGI.
+
+    Ejecuta `async_schema`, cuyos resolvers usan el ORM asíncrono de Django,
+    de modo que un worker atiende muchas solicitudes concurrentes mientras
+    espera a PostgreSQL. Los resolvers que siguen siendo síncronos se
+    ejecutan en un hilo mediante `SyncResolverMiddleware`.
+    """
+
+    view_is_async = True
+
+    def __init__(self, schema=None, middleware=None, **kwargs):
+        if middleware is None:
+            middleware = graphene_settings.MIDDLEWARE
+        middleware = [SyncResolverMiddleware(), *instantiate_middleware(middleware)]
+        super().__init__(schema=schema or async_schema, middleware=middleware, **kwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        # El ETag incluye la versión de los datos, que se lee de la base
+        etag = await sync_to_async(self.get_etag)(request) if request.method == 'GET' else None
+        response = get_conditional_response(request, etag=etag) if etag else None
+        if response is None:
+            response = await self.dispatch_async(request, *args, **kwargs)
+        return self.finalize_response(request, response, etag)
+
+    async def dispatch_async(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ('get', 'post'):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ['GET', 'POST'], 'GraphQL only supports GET and POST requests.'
+                    )
+                )
+
+            data = self.parse_body(request)
+            show_graphiql = self.graphiql and self.can_display_graphiql(request, data)
+            if show_graphiql:
+                # GraphiQL es una página estática: se reutiliza el dispatch síncrono
+                return await sync_to_async(super(CachingGraphQLView, self).dispatch)(
+                    request, *args, **kwargs
+                )
+
+            await self.authenticate(request)
+            if self.batch:
+                result, status_code = await self.get_batch_response_async(request, data)
+            else:
+                result, status_code = await self.get_response_async(request, data)
+            return HttpResponse(status=status_code, content=result, content_type='application/json')
+        except HttpError as e:
+            response = e.response
+            response['Content-Type'] = 'application/json'
+            response.content = self.json_encode(request, {'errors': [self.format_error(e)]})
+            return response
+
+    async def authenticate(self, request):
+        """
+        Resuelve el usuario antes de ejecutar la consulta.
+
+        El middleware de graphql_jwt autentica de forma síncrona, lo que no
+        está permitido dentro del event loop; aquí se hace una sola vez en un
+        hilo y se marca la solicitud para que el middleware no lo repita.
+        """
+        request.user = await request.auser() if hasattr(request, 'auser') else AnonymousUser()
+        if request.user.is_anonymous and get_http_authorization(request) is not None:
+            try:
+                user = await sync_to_async(authenticate)(request=request)
+            except JSONWebTokenError:
+                user = None
+            if user is not None:
+                request.user = user
+        request._jwt_token_auth = True
+
+    def operation_type(self, request, data):
+        """Tipo de la operación de `data` (query, mutation) o None si no es válida."""
+        try:
+            query, _, operation_name, _ = self.get_graphql_params(copy.copy(request), data)
+        except HttpError:
+            return None
+        document, _ = self.get_document(query) if query else (None, None)
+        operation = get_operation_ast(document, operation_name) if document is not None else None
+        return operation.operation if operation is not None else None
+
+    def batch_groups(self, request, data):
+        """
+        Divide el lote en grupos que se ejecutan uno tras otro: las consultas
+        consecutivas van juntas y cada mutación va sola, para que las
+        operaciones vean lo que escribieron las anteriores. Con
+        GRAPHQL_DEBUG_SQL cada operación va sola, porque la captura de SQL es
+        por conexión.
+        """
+        groups = []
+        for entry in data:
+            mutation = self.operation_type(request, entry) == OperationType.MUTATION
+            if mutation or settings.GRAPHQL_DEBUG_SQL or not groups or groups[-1][0]:
+                groups.append((mutation, []))
+            groups[-1][1].append(entry)
+        return groups
+
+    async def get_batch_response_async(self, request, data):
+        """
+        Ejecuta las operaciones del lote. Las de un mismo grupo (ver
+        `batch_groups`) corren a la vez en el event loop, así que sus
+        DataLoaders agrupan las llaves de todas; cada una usa una copia de la
+        solicitud para su medición y sus errores.
+        """
+        request._loaders = Loaders()
+        responses = []
+        for mutation, entries in self.batch_groups(request, data):
+            responses += await asyncio.gather(*(
+                self.get_operation_response_async(copy.copy(request), entry) for entry in entries
+            ))
+            if mutation:
+                request._loaders = Loaders()
+        result = '[{}]'.format(','.join(response[0] for response in responses))
+        return result, max(response[1] for response in responses)
+
+    async def get_operation_response_async(self, request, data):
+        try:
+            return await self.get_response_async(request, data)
+        except HttpError as e:
+            return self.batch_error(request, data, e)
+
+    async def get_response_async(self, request, data):
+        # SQLDebug y el conteo de SQL se instalan en el hilo que ejecuta el ORM
+        if settings.GRAPHQL_DEBUG_SQL:
+            request._sql_debug = SQLDebug()
+            await sync_to_async(request._sql_debug.__enter__)()
+        profile = self.start_profile(request)
+        if profile is not None:
+            profile.activate()
+            await sync_to_async(profile.install_sql)()
+        try:
+            return await self._get_response_async(request, data)
+        finally:
+            if profile is not None:
+                await sync_to_async(profile.uninstall_sql)()
+                profile.deactivate()
+                profile.finish()
+            if settings.GRAPHQL_DEBUG_SQL:
+                await sync_to_async(request._sql_debug.__exit__)(None, None, None)
+
+    async def _get_response_async(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = await self.execute_graphql_request_async(
+            request, data, query, variables, operation_name
+        )
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.errors and any(
+            not getattr(e, 'path', None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+
+        return self.json_encode(request, response), status_code
+
+    async def execute_graphql_request_async(self, request, data, query, variables, operation_name):
+        persisted_query_error = getattr(request, '_persisted_query_error', None)
+        if persisted_query_error is not None:
+            return ExecutionResult(errors=[persisted_query_error])
+        if not query:
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        with self.phase(request, 'parse_validate'):
+            document, errors = self.get_document(query)
+        if document is None:
+            return ExecutionResult(errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+        self.set_operation(request, operation_ast, operation_name)
+        if operation_ast is not None and operation_ast.operation == OperationType.MUTATION:
+            self.start_mutation(request)
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ['POST'],
+                    'Can only perform a {} operation from a POST request.'.format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        with self.phase(request, 'parse_validate'):
+            cost_error = self.check_query_cost(request, query, document, operation_ast, variables)
+        if cost_error is not None:
+            request._graphql_errors = True
+            return ExecutionResult(data=None, errors=[cost_error])
+
+        atomic = self.atomic_mutation(operation_ast)
+        async with AsyncAtomic() if atomic else nullcontext():
+            try:
+                with self.phase(request, 'execute'):
+                    result = execute(
+                        schema,
+                        document,
+                        root_value=self.get_root_value(request),
+                        context_value=self.get_context(request),
+                        variable_values=variables,
+                        operation_name=operation_name,
+                        middleware=self.get_middleware(request),
+                    )
+                    if inspect.isawaitable(result):
+                        result = await result
+            except Exception as e:
+                result = ExecutionResult(errors=[e])
+            if atomic and getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                await sync_to_async(transaction.set_rollback)(True)
+        request._graphql_errors = bool(result.errors)
+        return result
+
+
+def metrics(request):
+    """Métricas de las operaciones GraphQL en el formato de texto de Prometheus."""
+    if not metrics_authorized(request):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
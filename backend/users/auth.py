@@ -0,0 +1,123 @@
+from uuid import uuid4
+from django.utils.translation import gettext as _
+from graphql_jwt.backends import JSONWebTokenBackend as BaseJSONWebTokenBackend
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.utils import get_credentials, get_payload, get_user_by_payload
+from graphql_jwt.utils import jwt_decode as base_jwt_decode
+from graphql_jwt.utils import jwt_payload as base_jwt_payload
+from .cache import user_cache
+from .revocation import get_revocation_store
+
+
+def jwt_payload(user, context=None):
+    """
+    Payload de graphql_jwt con el id del usuario (ver TokenUser), un `jti`
+    para revocar el token y la generación de tokens del usuario (ver
+    users/revocation.py).
+    """
+    payload = base_jwt_payload(user, context)
+    payload['user_id'] = user.pk
+    payload['jti'] = uuid4().hex
+    payload['gen'] = get_revocation_store().issue_generation(user.pk)
+    return payload
+
+
+def jwt_decode(token, context=None):
+    """jwt_decode de graphql_jwt que además rechaza los tokens revocados."""
+    payload = base_jwt_decode(token, context)
+    if get_revocation_store().is_revoked(payload):
+        raise JSONWebTokenError(_('Token has been revoked'))
+    return payload
+
+
+def _check_active(user):
+    if user is None or not user.is_active:
+        raise JSONWebTokenError(_('User is disabled'))
+    return user
+
+
+class TokenUser:
+    """
+    Usuario autenticado a partir de los claims verificados de un JWT.
+
+    `pk`, `id` y `email` salen del token, así que autorizar o filtrar por el
+    usuario no consulta la base de datos. El primer acceso a cualquier otro
+    atributo carga el usuario completo desde `user_cache`; si ya no existe o
+    está inactivo se rechaza igual que en graphql_jwt. Desde código asíncrono
+    debe usarse `aget_user`.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, pk, email, user=None):
+        self.pk = self.id = pk
+        self.email = email
+        self._user = user
+
+    def get_user(self):
+        if self._user is None:
+            self._user = _check_active(user_cache.get(self.pk))
+        return self._user
+
+    async def aget_user(self):
+        if self._user is None:
+            self._user = _check_active(await user_cache.aget(self.pk))
+        return self._user
+
+    def __getattr__(self, name):
+        # Solo se llama para atributos que el principal no tiene
+        if name == '_user' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get_user(), name)
+
+    def __eq__(self, other):
+        return getattr(other, 'is_authenticated', False) and getattr(other, 'pk', None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.email
+
+
+def get_user(user):
+    """Instancia de AppUser de `user`, que puede ser un TokenUser."""
+    return user.get_user() if isinstance(user, TokenUser) else user
+
+
+async def aget_user(user):
+    return await user.aget_user() if isinstance(user, TokenUser) else user
+
+
+class JSONWebTokenBackend(BaseJSONWebTokenBackend):
+    """
+    JSONWebTokenBackend que no consulta AppUser en cada solicitud.
+
+    Con un token que incluye `user_id` (ver `jwt_payload`) devuelve un
+    TokenUser; si el usuario está en `user_cache` se verifica de una vez que
+    siga activo. Los tokens emitidos antes de este cambio siguen el camino de
+    graphql_jwt, que busca el usuario por email.
+    """
+
+    def authenticate(self, request=None, **kwargs):
+        if request is None or getattr(request, '_jwt_token_auth', False):
+            return None
+
+        token = get_credentials(request, **kwargs)
+        if token is None:
+            return None
+
+        payload = get_payload(token, request)
+        user_id = payload.get('user_id')
+        if user_id is None:
+            return get_user_by_payload(payload)
+
+        user = user_cache.peek(user_id)
+        if user is not None:
+            _check_active(user)
+        return TokenUser(user_id, jwt_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER(payload), user)
+
+    def get_user(self, user_id):
+        return user_cache.get(user_id)
@@ -0,0 +1,187 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from .bloom import BloomFilter
+from .models import UserDocument, email_identity
+
+# Filas que se vuelven a leer en cada sincronización: un registro puede
+# confirmarse después de otro con un id mayor
+SYNC_OVERLAP = 100
+SCAN_CHUNK_SIZE = 5000
+
+
+def email_key(email):
+    return f'e:{email_identity(email)}'
+
+
+def username_key(username):
+    return f'u:{username}'
+
+
+def document_key(document_type, document):
+    return f'd:{document_type}:{document}'
+
+
+def _user_keys(rows):
+    for pk, email, username in rows:
+        yield pk, (email_key(email), username_key(username))
+
+
+def _document_keys(rows):
+    for pk, document_type, document in rows:
+        yield pk, (document_key(document_type, document),)
+
+
+class AvailabilityIndex:
+    """
+    Responde "¿este email, usuario o documento ya está registrado?" sin E/S
+    en el caso común.
+
+    Cada proceso mantiene un filtro de Bloom con las llaves registradas. Un
+    valor que no está en el filtro está libre, y eso se responde en memoria;
+    solo los posibles registrados (reales o falsos positivos, ~ERROR_RATE) se
+    confirman con una consulta por índice único. El filtro se construye
+    recorriendo las tablas con un cursor del servidor, se pone al día con los
+    registros nuevos a lo sumo una vez cada SYNC_INTERVAL segundos y se
+    reconstruye cada REBUILD_INTERVAL segundos (o al llenarse) para olvidar
+    los valores que ya no existen. Mientras un hilo sincroniza, los demás
+    siguen respondiendo con el filtro anterior.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, sync_interval=30, rebuild_interval=3600):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter = None
+        self._cursors = (0, 0)
+        self._synced_at = self._built_at = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scan(user_after, document_after):
+        users = (
+            get_user_model().objects.filter(pk__gt=user_after).order_by('pk')
+            .values_list('pk', 'email', 'username').iterator(chunk_size=SCAN_CHUNK_SIZE)
+        )
+        documents = (
+            UserDocument.objects.filter(pk__gt=document_after).order_by('pk')
+            .values_list('pk', 'type_document_id', 'document').iterator(chunk_size=SCAN_CHUNK_SIZE)
+        )
+        return _user_keys(users), _document_keys(documents)
+
+    def _load(self, bloom, user_after, document_after):
+        cursors = [user_after, document_after]
+        for position, rows in enumerate(self._scan(user_after, document_after)):
+            for pk, keys in rows:
+                bloom.update(keys)
+                cursors[position] = max(cursors[position], pk)
+        return tuple(cursors)
+
+    def rebuild(self):
+        """Construye el filtro desde cero (al arrancar y cada REBUILD_INTERVAL)."""
+        with self._lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        expected = 2 * get_user_model().objects.count() + UserDocument.objects.count()
+        bloom = BloomFilter(max(self.capacity, 2 * expected), self.error_rate)
+        cursors = self._load(bloom, 0, 0)
+        self._filter, self._cursors = bloom, cursors
+        self._synced_at = self._built_at = time.monotonic()
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._filter is not None and now - self._synced_at < self.sync_interval:
+            return
+        # Sin filtro hay que esperar a que se construya; con filtro, si otro
+        # hilo ya está sincronizando se responde con el actual
+        if not self._lock.acquire(blocking=self._filter is None):
+            return
+        try:
+            if self._filter is not None and now - self._synced_at < self.sync_interval:
+                return
+            if (
+                self._filter is None or self._filter.saturated
+                or now - self._built_at >= self.rebuild_interval
+            ):
+                self._rebuild()
+            else:
+                user_after, document_after = self._cursors
+                self._cursors = self._load(
+                    self._filter, max(0, user_after - SYNC_OVERLAP), max(0, document_after - SYNC_OVERLAP)
+                )
+                self._synced_at = now
+        finally:
+            self._lock.release()
+
+    def add(self, keys):
+        # Si el filtro aún no existe, la construcción incluirá estas llaves
+        bloom = self._filter
+        if bloom is not None:
+            bloom.update(keys)
+
+    def add_registration(self, email, username, document_type, document):
+        self.add([email_key(email), username_key(username), document_key(document_type, document)])
+
+    def _might_exist(self, key):
+        self._sync()
+        return key in self._filter
+
+    def email_available(self, email):
+        if not self._might_exist(email_key(email)):
+            return True
+        return not get_user_model().objects.filter(email__lower=email_identity(email)).exists()
+
+    def username_available(self, username):
+        if not self._might_exist(username_key(username)):
+            return True
+        return not get_user_model().objects.filter(username=username).exists()
+
+    def document_available(self, document_type, document):
+        if not self._might_exist(document_key(document_type, document)):
+            return True
+        return not UserDocument.objects.filter(type_document_id=document_type, document=document).exists()
+
+
+def record_registrations(rows):
+    """
+    Agrega al filtro de este proceso los registros `rows` (tuplas email,
+    usuario, tipo de documento, documento) cuando se confirme la transacción
+    en curso. Los demás procesos los verán en su próxima sincronización.
+    """
+    rows = list(rows)
+
+    def add():
+        index = get_availability_index()
+        for row in rows:
+            index.add_registration(*row)
+
+    transaction.on_commit(add)
+
+
+_index = None
+
+
+def get_availability_index():
+    global _index
+    if _index is None:
+        config = getattr(settings, 'AVAILABILITY_INDEX', {})
+        _index = AvailabilityIndex(
+            capacity=config.get('CAPACITY', 100000),
+            error_rate=config.get('ERROR_RATE', 0.001),
+            sync_interval=config.get('SYNC_INTERVAL', 30),
+            rebuild_interval=config.get('REBUILD_INTERVAL', 3600),
+        )
+    return _index
+
+
+@receiver(setting_changed)
+def reset_availability_index(setting, **kwargs):
+    global _index
+    if setting == 'AVAILABILITY_INDEX':
+        _index = None
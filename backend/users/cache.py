@@ -0,0 +1,279 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from .models import AppUser, Country, TypeDocument
+
+# Secuencia con la versión de los datos de referencia (migración 0009)
+VERSION_SEQUENCE = 'reference_data_version_seq'
+
+
+def _sequence(sql):
+    # Siempre en la principal: una réplica atrasada devolvería una versión vieja
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.fetchone()[0]
+
+
+class LRUCache:
+    """Diccionario acotado y seguro entre hilos que descarta la entrada menos usada."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ReferenceDataCache:
+    """
+    Caché de dos niveles para datos de referencia (países y tipos de documento).
+
+    El primer nivel es un LRU en memoria del proceso cuyas entradas duran a lo
+    sumo LOCAL_TIMEOUT segundos; el segundo, opcional, es un alias del
+    framework de caché de Django compartido entre workers (Redis, memcached).
+    Todas las llaves incluyen el número de versión, que es el último valor de
+    una secuencia de Postgres: invalidar pide el siguiente, y cada proceso
+    vuelve a leerlo a lo sumo cada VERSION_CHECK_INTERVAL segundos, de modo
+    que las entradas viejas de cualquier proceso dejan de consultarse. Como
+    nextval no se deshace con un rollback, una versión nunca se repite.
+    """
+
+    def __init__(self):
+        self._local = LRUCache(self._config('LOCAL_MAXSIZE', 128))
+        self._version = 0
+        self._checked_at = float('-inf')
+
+    @staticmethod
+    def _config(name, default=None):
+        return getattr(settings, 'REFERENCE_DATA_CACHE', {}).get(name, default)
+
+    @property
+    def shared(self):
+        alias = self._config('ALIAS')
+        return caches[alias] if alias else None
+
+    def _version_is_stale(self):
+        return time.monotonic() - self._checked_at >= self._config('VERSION_CHECK_INTERVAL', 1)
+
+    def _set_version(self, version):
+        self._version, self._checked_at = version, time.monotonic()
+        return version
+
+    def _read_version(self):
+        return self._set_version(_sequence(f'SELECT last_value FROM {VERSION_SEQUENCE}'))
+
+    def version(self, refresh=False):
+        """Versión de los datos; con `refresh` se lee de la base sin esperar el intervalo."""
+        if refresh or self._version_is_stale():
+            return self._read_version()
+        return self._version
+
+    async def aversion(self, refresh=False):
+        if refresh or self._version_is_stale():
+            return await sync_to_async(self._read_version)()
+        return self._version
+
+    def _get_local(self, key):
+        entry = self._local.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _set_local(self, key, value):
+        # El TTL acota cuánto dura un dato viejo si se pierde una invalidación
+        self._local.set(key, (time.monotonic() + self._config('LOCAL_TIMEOUT', 300), value))
+
+    def get(self, name, loader):
+        key = f'reference-data:{self.version()}:{name}'
+
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            value = self.shared.get(key)
+        if value is None:
+            value = loader()
+            if self.shared is not None:
+                self.shared.set(key, value, timeout=self._config('TIMEOUT', 3600))
+        self._set_local(key, value)
+        return value
+
+    async def aget(self, name, loader):
+        """
+        Versión asíncrona de `get`; `loader` es una corrutina.
+
+        La caché compartida se consulta con la API síncrona: los métodos
+        asíncronos de Django solo la envuelven en sync_to_async, y un salto de
+        hilo cuesta más que la consulta misma.
+        """
+        key = f'reference-data:{await self.aversion()}:{name}'
+
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            value = self.shared.get(key)
+        if value is None:
+            value = await loader()
+            if self.shared is not None:
+                self.shared.set(key, value, timeout=self._config('TIMEOUT', 3600))
+        self._set_local(key, value)
+        return value
+
+    def invalidate(self):
+        self._set_version(_sequence(f"SELECT nextval('{VERSION_SEQUENCE}')"))
+
+    def invalidate_on_commit(self):
+        # Se invalida de inmediato para la transacción actual y de nuevo al
+        # confirmar, por si otro worker recargó los datos viejos mientras tanto.
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+    def clear(self):
+        self._local.clear()
+        self.invalidate()
+
+
+reference_cache = ReferenceDataCache()
+
+
+class UserCache:
+    """
+    Caché por proceso de usuarios autenticados, con un TTL corto.
+
+    Evita cargar AppUser en cada solicitud con JWT (ver users/auth.py).
+    Guardar o borrar un usuario lo invalida en este proceso (ver
+    users/signals.py); en los demás workers una entrada vieja dura a lo sumo
+    TIMEOUT segundos. Cada lectura devuelve una copia, para que una
+    solicitud no modifique la instancia que ven las demás.
+    """
+
+    def __init__(self):
+        self._local = LRUCache(self._config('MAXSIZE', 1024))
+
+    @staticmethod
+    def _config(name, default=None):
+        return getattr(settings, 'USER_CACHE', {}).get(name, default)
+
+    def peek(self, pk):
+        """Usuario en caché o None, sin consultar la base de datos."""
+        entry = self._local.get(pk)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return copy.copy(entry[1])
+
+    def _store(self, user):
+        timeout = self._config('TIMEOUT', 30)
+        if user is not None and timeout > 0:
+            self._local.set(user.pk, (time.monotonic() + timeout, copy.copy(user)))
+        return user
+
+    def get(self, pk):
+        user = self.peek(pk)
+        if user is None:
+            user = self._store(AppUser.objects.filter(pk=pk).first())
+        return user
+
+    async def aget(self, pk):
+        user = self.peek(pk)
+        if user is None:
+            user = self._store(await AppUser.objects.filter(pk=pk).afirst())
+        return user
+
+    def invalidate(self, pk):
+        self._local.delete(pk)
+
+    def invalidate_on_commit(self, pk):
+        # Como ReferenceDataCache: de nuevo al confirmar, por si otra
+        # solicitud de este proceso recargó la fila vieja mientras tanto
+        self.invalidate(pk)
+        transaction.on_commit(lambda: self.invalidate(pk))
+
+    def clear(self):
+        self._local.clear()
+
+
+user_cache = UserCache()
+
+
+# La caché de referencia se llena desde la principal: lo leído de una réplica
+# atrasada después de invalidarla quedaría guardado hasta TIMEOUT
+def _reference(model):
+    return model.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+
+
+def get_countries():
+    return reference_cache.get('countries', lambda: list(_reference(Country)))
+
+
+def get_document_types():
+    return reference_cache.get('document_types', lambda: list(_reference(TypeDocument)))
+
+
+def get_country(pk):
+    countries = reference_cache.get('countries_by_id', lambda: {c.pk: c for c in get_countries()})
+    return countries.get(int(pk))
+
+
+def get_document_type(pk):
+    document_types = reference_cache.get(
+        'document_types_by_id', lambda: {d.pk: d for d in get_document_types()}
+    )
+    return document_types.get(int(pk))
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def aget_countries():
+    return await reference_cache.aget('countries', lambda: _alist(_reference(Country)))
+
+
+async def aget_document_types():
+    return await reference_cache.aget('document_types', lambda: _alist(_reference(TypeDocument)))
+
+
+async def aget_country(pk):
+    async def load():
+        return {c.pk: c for c in await aget_countries()}
+    countries = await reference_cache.aget('countries_by_id', load)
+    return countries.get(int(pk))
+
+
+async def aget_document_type(pk):
+    async def load():
+        return {d.pk: d for d in await aget_document_types()}
+    document_types = await reference_cache.aget('document_types_by_id', load)
+    return document_types.get(int(pk))
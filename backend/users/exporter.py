@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import zlib
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import JSONObject
+from .models import ContactInfo, UserDocument
+
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+# Columnas del export y su ruta en el ORM. Incluye las columnas de
+# import_users (sin la contraseña), así que un export se puede volver a
+# importar tal cual.
+COLUMNS = (
+    ('id', 'id'),
+    ('email', 'email'),
+    ('username', 'username'),
+    ('last_name', 'last_name'),
+    ('name', 'name'),
+    ('is_militar', 'is_militar'),
+    ('document_type', 'userdocument__type_document__name_type_document'),
+    ('document_number', 'userdocument__document'),
+    ('document_expedition_place', 'userdocument__place_expedition'),
+    ('document_expedition_date', 'userdocument__date_expedition'),
+    ('country', 'contactinfo__country__country_code'),
+    ('address', 'contactinfo__address'),
+    ('city', 'contactinfo__city'),
+    ('phone', 'contactinfo__phone'),
+    ('cel_phone', 'contactinfo__cel_phone'),
+    ('emergency_name', 'contactinfo__emergency_name'),
+    ('emergency_phone', 'contactinfo__emergency_phone'),
+    ('is_active', 'is_active'),
+    ('email_verified', 'email_verified'),
+    ('time_create', 'time_create'),
+)
+
+# Filas por lectura del cursor del servidor y bytes por bloque de salida
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+# Relaciones de las que sale una sola fila por usuario (la de menor id): la
+# anotación que las trae y el prefijo de sus columnas en COLUMNS
+RELATED = (
+    ('document', 'userdocument__', UserDocument),
+    ('contact', 'contactinfo__', ContactInfo),
+)
+RELATED_PREFIXES = tuple(prefix for _, prefix, _ in RELATED)
+
+
+def _first_related(prefix, model):
+    fields = {name: path[len(prefix):] for name, path in COLUMNS if path.startswith(prefix)}
+    return Subquery(
+        model.objects.filter(user=OuterRef('pk')).order_by('id').values(data=JSONObject(**fields))[:1]
+    )
+
+
+def export_queryset():
+    """
+    Un usuario por fila, con su primer documento y su primera información de
+    contacto en una sola consulta. Cada relación sale de una subconsulta que
+    devuelve un objeto JSON, así que varios documentos o contactos no
+    multiplican las filas; sin documento o sin contacto, esas columnas
+    quedan vacías.
+    """
+    return (
+        get_user_model().objects
+        .annotate(**{name: _first_related(prefix, model) for name, prefix, model in RELATED})
+        .order_by('id')
+        .values_list(
+            *(path for _, path in COLUMNS if not path.startswith(RELATED_PREFIXES)),
+            *(name for name, _, _ in RELATED),
+        )
+    )
+
+
+def export_rows(chunk_size=CHUNK_SIZE):
+    """Filas de `export_queryset` con los valores en el orden de COLUMNS."""
+    for row in export_queryset().iterator(chunk_size=chunk_size):
+        values = iter(row[:-len(RELATED)])
+        related = {}
+        for data in row[-len(RELATED):]:
+            related.update(data or {})
+        yield tuple(
+            related.get(name) if path.startswith(RELATED_PREFIXES) else next(values)
+            for name, path in COLUMNS
+        )
+
+
+def gzip_chunks(chunks, level=6):
+    """Comprime con gzip un flujo de bloques de bytes sin acumularlo."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class UserExport:
+    """
+    Export completo de usuarios en CSV o NDJSON, opcionalmente con gzip.
+
+    Al iterarlo produce bloques de bytes a medida que lee las filas con
+    `iterator(chunk_size)`, que en PostgreSQL usa un cursor del servidor: en
+    memoria solo hay un lote de filas y un bloque de salida, sin importar el
+    tamaño de la tabla. `rows` cuenta las filas escritas hasta el momento.
+    """
+
+    def __init__(self, format='csv', compress=True, chunk_size=CHUNK_SIZE):
+        if format not in FORMATS:
+            raise ValueError(f'Formato de export desconocido: {format}')
+        self.format = format
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.rows = 0
+
+    @property
+    def filename(self):
+        return f'usuarios.{self.format}' + ('.gz' if self.compress else '')
+
+    @property
+    def content_type(self):
+        return 'application/gzip' if self.compress else CONTENT_TYPES[self.format]
+
+    def __iter__(self):
+        chunks = (text.encode('utf-8') for text in self._text())
+        return gzip_chunks(chunks) if self.compress else chunks
+
+    def _text(self):
+        buffer = io.StringIO()
+        write = self._writer(buffer)
+        for row in export_rows(self.chunk_size):
+            write(row)
+            self.rows += 1
+            if buffer.tell() >= BUFFER_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def _writer(self, buffer):
+        names = [name for name, _ in COLUMNS]
+        if self.format == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            return writer.writerow
+
+        def write(row):
+            buffer.write(json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False))
+            buffer.write('\n')
+        return write
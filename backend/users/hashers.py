@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def work_factor(name, default):
+    """Lee un factor de trabajo de `settings.PASSWORD_HASHER_WORK_FACTORS`."""
+    value = getattr(settings, 'PASSWORD_HASHER_WORK_FACTORS', {}).get(name)
+    return default if value is None else value
+
+
+# Los hashers conservan el nombre de algoritmo de Django, así que verifican
+# los hashes existentes. Los factores se leen en cada uso: si se suben, la
+# verificación informa `must_update` y el login vuelve a calcular el hash
+# (ver AppUser.check_password).
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return work_factor('PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return work_factor('BCRYPT_ROUNDS', hashers.BCryptSHA256PasswordHasher.rounds)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return work_factor('ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return work_factor('ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return work_factor('ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism)
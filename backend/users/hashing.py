@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from singularity.instrumentation import metrics_registry, observe_hash
+
+
+class PasswordHashingBusy(Exception):
+    """La cola del servicio de hash está llena; el cliente debe reintentar."""
+
+    def __init__(self):
+        super().__init__('El servicio está ocupado, intente de nuevo en unos segundos')
+
+
+def _timed(func, *args):
+    # Se ejecuta dentro del pool (hilo o proceso): time.monotonic es común a
+    # todos los procesos, así que los tiempos se pueden comparar.
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+def _unwrap(timed):
+    # Resultado de _timed; el tiempo de hash se suma a la operación GraphQL
+    # en curso (ver singularity/instrumentation.py)
+    result, started, finished = timed
+    observe_hash(finished - started)
+    return result
+
+
+class HashingMetrics:
+    """
+    Acumula el tiempo de espera en cola y el tiempo de hash del servicio.
+
+    Cada observación también se registra en `metrics_registry`, que la
+    expone en /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.rejected = 0
+            self.queue_wait_total = 0.0
+            self.queue_wait_max = 0.0
+            self.hash_time_total = 0.0
+            self.hash_time_max = 0.0
+
+    def observe(self, queue_wait, hash_time):
+        with self._lock:
+            self.count += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.hash_time_total += hash_time
+            self.hash_time_max = max(self.hash_time_max, hash_time)
+        metrics_registry.observe_hashing(queue_wait, hash_time)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+        metrics_registry.reject_hashing()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'rejected': self.rejected,
+                'queue_wait_avg': self.queue_wait_total / self.count if self.count else 0.0,
+                'queue_wait_max': self.queue_wait_max,
+                'hash_time_avg': self.hash_time_total / self.count if self.count else 0.0,
+                'hash_time_max': self.hash_time_max,
+            }
+
+
+class PasswordHashingService:
+    """
+    Pool acotado dedicado al hash y la verificación de contraseñas.
+
+    Las iteraciones del hasher son la parte más costosa de un registro o un
+    login; concentrarlas en `workers` hilos (o procesos) evita que una ráfaga
+    de logins acapare todos los hilos del servidor. Si ya hay `workers +
+    max_queue` trabajos en curso, la solicitud se rechaza de inmediato con
+    `PasswordHashingBusy` en lugar de esperar indefinidamente.
+    """
+
+    def __init__(self, backend='thread', workers=1, max_queue=0):
+        executor_class = ProcessPoolExecutor if backend == 'process' else ThreadPoolExecutor
+        options = {} if backend == 'process' else {'thread_name_prefix': 'password-hashing'}
+        self.executor = executor_class(max_workers=workers, **options)
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self.metrics = HashingMetrics()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.metrics.reject()
+                raise PasswordHashingBusy()
+            self._in_flight += 1
+
+        submitted = time.monotonic()
+        future = self.executor.submit(_timed, func, *args)
+        future.add_done_callback(lambda f: self._done(f, submitted))
+        return future
+
+    def _done(self, future, submitted):
+        with self._lock:
+            self._in_flight -= 1
+        if not future.cancelled() and future.exception() is None:
+            _, started, finished = future.result()
+            self.metrics.observe(started - submitted, finished - started)
+
+    def make_password(self, password):
+        if password is None:
+            return hashers.make_password(None)
+        return _unwrap(self.submit(hashers.make_password, password).result())
+
+    def make_passwords(self, passwords):
+        """
+        Calcula los hashes de un lote en paralelo, en el mismo orden.
+
+        Mantiene como máximo `workers` trabajos propios en curso para dejar
+        espacio en la cola a los logins; si aun así está llena, espera a que
+        termine uno de sus trabajos en lugar de fallar.
+        """
+        hashes, pending = [], deque()
+        for password in passwords:
+            while True:
+                if len(pending) >= self.workers:
+                    hashes.append(_unwrap(pending.popleft().result()))
+                try:
+                    pending.append(self.submit(hashers.make_password, password))
+                    break
+                except PasswordHashingBusy:
+                    if pending:
+                        hashes.append(_unwrap(pending.popleft().result()))
+                    else:
+                        time.sleep(0.01)
+        hashes.extend(_unwrap(future.result()) for future in pending)
+        return hashes
+
+    def verify_password(self, password, encoded):
+        """Devuelve (es_correcta, debe_actualizarse), como django.contrib.auth.hashers."""
+        return _unwrap(self.submit(hashers.verify_password, password, encoded).result())
+
+    async def amake_password(self, password):
+        if password is None:
+            return hashers.make_password(None)
+        return _unwrap(await asyncio.wrap_future(self.submit(hashers.make_password, password)))
+
+    async def averify_password(self, password, encoded):
+        return _unwrap(await asyncio.wrap_future(self.submit(hashers.verify_password, password, encoded)))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """Servicio de hash del proceso, configurado con `settings.PASSWORD_HASHING`."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                config = settings.PASSWORD_HASHING
+                _service = PasswordHashingService(
+                    backend=config.get('BACKEND', 'thread'),
+                    workers=config.get('WORKERS', 1),
+                    max_queue=config.get('MAX_QUEUE', 0),
+                )
+    return _service
+
+
+def make_password(password):
+    return get_service().make_password(password)
+
+
+def make_passwords(passwords):
+    return get_service().make_passwords(passwords)
+
+
+def verify_password(password, encoded):
+    return get_service().verify_password(password, encoded)
+
+
+async def amake_password(password):
+    """Calcula el hash de una contraseña sin bloquear el event loop."""
+    return await get_service().amake_password(password)
+
+
+async def averify_password(password, encoded):
+    return await get_service().averify_password(password, encoded)
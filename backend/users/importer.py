@@ -0,0 +1,365 @@
+import csv
+import gzip
+import json
+import secrets
+import sys
+import time
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, UNUSABLE_PASSWORD_SUFFIX_LENGTH
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .availability import record_registrations
+from .models import ContactInfo, Country, ImportCheckpoint, TypeDocument, UserDocument
+from .registration import (
+    COUNTRY_MISSING, DOCUMENT_TYPE_MISSING, integrity_error_message, validate_registrations,
+)
+from .verification import enqueue_verifications
+
+# Columnas de entrada: los mismos nombres de UserRegistrationInput, en snake_case
+FIELDS = (
+    'email', 'username', 'password', 'last_name', 'name', 'is_militar',
+    'document_type', 'document_number', 'document_expedition_place', 'document_expedition_date',
+    'country', 'address', 'city', 'phone', 'cel_phone', 'emergency_name', 'emergency_phone',
+)
+# La contraseña es opcional: sin ella el usuario queda con una contraseña
+# inutilizable y debe definirla con el flujo de recuperación
+OPTIONAL_FIELDS = ('password',)
+
+TRUE_VALUES = {'1', 'true', 't', 'si', 'sí', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', ''}
+
+# Escapes del formato de texto de COPY
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def open_source(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def source_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_rows(stream, format):
+    """
+    Recorre la entrada sin cargarla completa. Produce tuplas
+    (número de fila, fila, error de lectura o None).
+    """
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row, None
+        return
+    number = 0
+    for text in stream:
+        if not text.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(text)
+            if not isinstance(row, dict):
+                raise ValueError('se esperaba un objeto JSON')
+        except ValueError as e:
+            yield number, {'raw': text.rstrip('\n')}, f'JSON inválido: {e}'
+        else:
+            yield number, row, None
+
+
+class RejectWriter:
+    """Escribe las filas rechazadas, con su número de fila y el error, en el formato de la entrada."""
+
+    def __init__(self, path, format, append=False):
+        self.format = format
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._writer = None
+        if format == 'csv':
+            self._writer = csv.DictWriter(self.file, ('line', 'error', *FIELDS), extrasaction='ignore')
+            if not append or self.file.tell() == 0:
+                self._writer.writeheader()
+
+    def write(self, line, row, error):
+        if self._writer is not None:
+            self._writer.writerow({**row, 'line': line, 'error': error})
+        else:
+            self.file.write(json.dumps({'line': line, 'error': error, **row}, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ReferenceData:
+    """Países y tipos de documento por id, código o nombre, cargados una sola vez."""
+
+    def __init__(self):
+        self.countries = {}
+        for pk, code, name in Country.objects.values_list('id', 'country_code', 'country_name'):
+            self.countries.update({str(pk): pk, code.lower(): pk, name.lower(): pk})
+        self.document_types = {}
+        for pk, name in TypeDocument.objects.values_list('id', 'name_type_document'):
+            self.document_types.update({str(pk): pk, name.lower(): pk})
+
+    def country(self, value):
+        return self.countries.get(str(value).strip().lower())
+
+    def document_type(self, value):
+        return self.document_types.get(str(value).strip().lower())
+
+
+def unusable_password():
+    # Mismo formato que make_password(None), sin get_random_string, que
+    # elige los 40 caracteres uno a uno
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(UNUSABLE_PASSWORD_SUFFIX_LENGTH // 2)
+
+
+def _copy_text(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_objects(cursor, model, objects, include_pk=False):
+    """Inserta instancias sin guardar con COPY ... FROM STDIN (formato de texto)."""
+    # `connection` es un proxy por hilo y Field.pre_save lo consulta en cada
+    # llamada; solo las fechas automáticas (auto_now_add) necesitan pre_save
+    db = cursor.db
+    fields = [
+        (field, getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False))
+        for field in model._meta.concrete_fields if include_pk or not field.primary_key
+    ]
+    quote = db.ops.quote_name
+    columns = ', '.join(quote(field.column) for field, _ in fields)
+    # El cursor de Django solo traduce los errores de execute y fetch*; sin
+    # esto una violación de unicidad llega como psycopg.errors.UniqueViolation
+    sql = f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN'
+    with db.wrap_database_errors, cursor.copy(sql) as copy:
+        for obj in objects:
+            copy.write('\t'.join(
+                _copy_text(field.get_db_prep_save(
+                    field.pre_save(obj, True) if automatic else getattr(obj, field.attname), db
+                ))
+                for field, automatic in fields
+            ) + '\n')
+
+
+class UserImporter:
+    """
+    Carga masiva de usuarios con su documento y su información de contacto.
+
+    La entrada se procesa en bloques de `chunk_size` filas. Cada bloque se
+    valida con las reglas de RegisterUser (`validate_registrations` más las
+    validaciones de los campos del modelo), hashea las contraseñas en
+    paralelo en `hasher` y se carga con COPY en las tres tablas dentro de una
+    transacción que también avanza el ImportCheckpoint de `source`. Así, al
+    repetir el comando después de una caída, se saltan exactamente las filas
+    de los bloques ya confirmados.
+
+    Como en RegisterUser, cada usuario importado queda con su correo de
+    verificación encolado y se agrega al filtro de checkAvailability.
+    """
+
+    def __init__(self, source, hasher, chunk_size=5000, progress=None):
+        self.source = source
+        self.hasher = hasher
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.references = ReferenceData()
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source)
+
+    def restart(self):
+        ImportCheckpoint.objects.filter(pk=self.checkpoint.pk).update(rows_read=0, imported=0, rejected=0)
+        self.checkpoint.refresh_from_db()
+
+    def run(self, rows, rejects):
+        """
+        Importa las filas de `read_rows` que siguen al punto de control y
+        escribe las rechazadas en `rejects` (RejectWriter). Devuelve
+        (leídas, importadas, rechazadas, segundos).
+        """
+        skip = self.checkpoint.rows_read
+        started = time.perf_counter()
+        totals = [0, 0, 0]
+        chunk = []
+        for row in rows:
+            if skip:
+                skip -= 1
+                continue
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._load(chunk, rejects, totals, started)
+                chunk = []
+        if chunk:
+            self._load(chunk, rejects, totals, started)
+        read, imported, rejected = totals
+        if imported:
+            with connection.cursor() as cursor:
+                for model in (get_user_model(), UserDocument, ContactInfo):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        return read, imported, rejected, time.perf_counter() - started
+
+    def _load(self, chunk, rejects, totals, started):
+        imported, failed = self.load_chunk(chunk)
+        for line, row, error in failed:
+            rejects.write(line, row, error)
+        totals[0] += len(chunk)
+        totals[1] += imported
+        totals[2] += len(failed)
+        if self.progress is not None:
+            self.progress(*totals, time.perf_counter() - started)
+
+    def normalize(self, row):
+        """Convierte una fila de la entrada en los datos de RegisterUser."""
+        data = {}
+        for name in FIELDS:
+            value = row.get(name)
+            value = value.strip() if isinstance(value, str) else value
+            if value in (None, '') and name not in OPTIONAL_FIELDS:
+                raise ValidationError(f'El campo {name} es obligatorio')
+            data[name] = value
+        if isinstance(data['is_militar'], str):
+            flag = data['is_militar'].lower()
+            if flag not in TRUE_VALUES | FALSE_VALUES:
+                raise ValidationError(f'Valor inválido para is_militar: {data["is_militar"]}')
+            data['is_militar'] = flag in TRUE_VALUES
+        data['country'] = self.references.country(data['country'])
+        if data['country'] is None:
+            raise ValidationError(COUNTRY_MISSING)
+        data['document_type'] = self.references.document_type(data['document_type'])
+        if data['document_type'] is None:
+            raise ValidationError(DOCUMENT_TYPE_MISSING)
+        return data
+
+    @staticmethod
+    def build(data, email):
+        """Instancias sin guardar de la fila, validadas con las reglas de los campos del modelo."""
+        user = get_user_model()(
+            email=email,
+            username=data['username'],
+            last_name=data['last_name'],
+            name=data['name'],
+            is_militar=bool(data['is_militar']),
+        )
+        document = UserDocument(
+            user=user,
+            type_document_id=data['document_type'],
+            document=data['document_number'],
+            place_expedition=data['document_expedition_place'],
+            date_expedition=data['document_expedition_date'],
+        )
+        contact = ContactInfo(
+            user=user,
+            country_id=data['country'],
+            address=data['address'],
+            city=data['city'],
+            phone=data['phone'],
+            cel_phone=data['cel_phone'],
+            emergency_name=data['emergency_name'],
+            emergency_phone=data['emergency_phone'],
+        )
+        # Las llaves foráneas ya se verificaron por conjuntos; clean_fields
+        # haría una consulta por fila para cada una
+        user.clean_fields(exclude=['password'])
+        document.clean_fields(exclude=['user', 'type_document'])
+        contact.clean_fields(exclude=['user', 'country'])
+        return user, document, contact
+
+    def load_chunk(self, chunk):
+        """
+        Valida y carga un bloque de tuplas de `read_rows`. Devuelve el número
+        de filas importadas y las rechazadas como (fila, datos, error).
+        """
+        rejected, records = self._prepare(chunk)
+        with transaction.atomic(), connection.cursor() as cursor:
+            records, conflicts = self._insert(cursor, records)
+            rejected += conflicts
+            if records:
+                enqueue_verifications([user for *_, (user, _, _) in records])
+                record_registrations(
+                    (user.email, user.username, document.type_document_id, document.document)
+                    for *_, (user, document, _) in records
+                )
+            ImportCheckpoint.objects.filter(pk=self.checkpoint.pk).update(
+                rows_read=F('rows_read') + len(chunk),
+                imported=F('imported') + len(records),
+                rejected=F('rejected') + len(rejected),
+                time_update=timezone.now(),
+            )
+        return len(records), sorted(rejected, key=lambda reject: reject[0])
+
+    def _prepare(self, chunk):
+        rejected, candidates = [], []
+        for line, row, error in chunk:
+            if error is None:
+                try:
+                    candidates.append((line, row, self.normalize(row)))
+                    continue
+                except ValidationError as e:
+                    error = ' '.join(e.messages)
+            rejected.append((line, row, error))
+
+        errors, valid = validate_registrations([data for _, _, data in candidates])
+        for index, message in errors.items():
+            rejected.append((*candidates[index][:2], message))
+
+        records = []
+        for index, data, email in valid:
+            line, row, _ = candidates[index]
+            try:
+                records.append((line, row, data, self.build(data, email)))
+            except ValidationError as e:
+                rejected.append((line, row, ' '.join(e.messages)))
+
+        # Sin contraseña no hay nada que hashear: contraseña inutilizable
+        with_password = [user for _, _, data, (user, _, _) in records if data.get('password')]
+        hashes = self.hasher.make_passwords(
+            data['password'] for _, _, data, _ in records if data.get('password')
+        )
+        for user, password_hash in zip(with_password, hashes):
+            user.password = password_hash
+        for _, _, data, (user, _, _) in records:
+            if not data.get('password'):
+                user.password = unusable_password()
+        return rejected, records
+
+    def _insert(self, cursor, records):
+        """
+        Carga `records` en un savepoint. Si un registro concurrente ganó la
+        carrera (IntegrityError), parte el lote en dos y reintenta cada mitad
+        hasta aislar las filas en conflicto. Devuelve los registros cargados
+        y los rechazados como (fila, datos, error).
+        """
+        if not records:
+            return [], []
+        try:
+            with transaction.atomic():
+                self._copy(cursor, records)
+            return records, []
+        except IntegrityError as e:
+            if len(records) == 1:
+                line, row, _, _ = records[0]
+                return [], [(line, row, integrity_error_message(e))]
+        middle = len(records) // 2
+        first, first_conflicts = self._insert(cursor, records[:middle])
+        second, second_conflicts = self._insert(cursor, records[middle:])
+        return first + second, first_conflicts + second_conflicts
+
+    def _copy(self, cursor, records):
+        User = get_user_model()
+        # Se reservan los ids de la secuencia para enlazar documentos y contactos
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [connection.ops.quote_name(User._meta.db_table), User._meta.pk.column, len(records)]
+        )
+        for (*_, (user, document, contact)), (pk,) in zip(records, cursor.fetchall()):
+            user.pk = pk
+            document.user = contact.user = user
+        copy_objects(cursor, User, [user for *_, (user, _, _) in records], include_pk=True)
+        copy_objects(cursor, UserDocument, [document for *_, (_, document, _) in records])
+        copy_objects(cursor, ContactInfo, [contact for *_, (_, _, contact) in records])
@@ -0,0 +1,188 @@
+import logging
+import random
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Tareas registradas con @task, por nombre
+TASKS = {}
+
+
+def _config(name, default):
+    return getattr(settings, 'JOB_QUEUE', {}).get(name, default)
+
+
+def task(name):
+    """Registra una función como tarea de la cola. El payload se pasa como argumentos por nombre."""
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+def _job(name, payload, queue, delay, max_attempts):
+    if name not in TASKS:
+        raise ValueError(f'Tarea desconocida: {name}')
+    return Job(
+        queue=queue,
+        task=name,
+        payload=payload or {},
+        max_attempts=max_attempts or _config('MAX_ATTEMPTS', 5),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(name, payload=None, queue='default', delay=0, max_attempts=None):
+    """
+    Encola una tarea. Es un INSERT normal: dentro de transaction.atomic el
+    trabajo solo queda visible para los trabajadores si la transacción se
+    confirma.
+    """
+    job = _job(name, payload, queue, delay, max_attempts)
+    job.save()
+    return job
+
+
+def enqueue_many(name, payloads, queue='default', delay=0, max_attempts=None):
+    """Encola la misma tarea con varios payloads en un solo INSERT."""
+    return Job.objects.bulk_create([_job(name, payload, queue, delay, max_attempts) for payload in payloads])
+
+
+def backoff(attempts):
+    """Espera antes del siguiente intento: exponencial, con tope y con jitter."""
+    delay = min(_config('BACKOFF_MAX', 3600), _config('BACKOFF_BASE', 10) * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def claim(worker, queues, batch_size):
+    """
+    Reclama hasta `batch_size` trabajos pendientes y vencidos de `queues`.
+
+    SKIP LOCKED hace que los trabajadores concurrentes se repartan las filas
+    sin esperarse entre sí; el lote queda marcado como `running` al confirmar.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, queue__in=queues, run_at__lte=now)
+            .order_by('run_at', 'id')[:batch_size]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING, locked_at=now, locked_by=worker, attempts=F('attempts') + 1
+            )
+    for job in jobs:
+        job.status, job.locked_at, job.locked_by = Job.RUNNING, now, worker
+        job.attempts += 1
+    return jobs
+
+
+def _owned(job):
+    # Si el trabajo se dio por abandonado y otro trabajador lo reclamó, este ya no lo actualiza
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_at=job.locked_at)
+
+
+def run_job(job):
+    """Ejecuta un trabajo reclamado y registra el resultado. Devuelve True si terminó bien."""
+    try:
+        function = TASKS.get(job.task)
+        if function is None:
+            raise LookupError(f'Tarea desconocida: {job.task}')
+        function(**job.payload)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        if job.attempts >= job.max_attempts:
+            logger.error('El trabajo %s falló definitivamente: %s', job, error)
+            _owned(job).update(status=Job.FAILED, last_error=error, time_finish=timezone.now())
+        else:
+            logger.warning('El trabajo %s falló (intento %s): %s', job, job.attempts, error)
+            _owned(job).update(
+                status=Job.PENDING, last_error=error, locked_at=None, locked_by='',
+                run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            )
+        return False
+    _owned(job).update(status=Job.DONE, time_finish=timezone.now())
+    return True
+
+
+def release(jobs):
+    """Devuelve a la cola trabajos reclamados que no se alcanzaron a ejecutar."""
+    for job in jobs:
+        _owned(job).update(status=Job.PENDING, locked_at=None, locked_by='', attempts=F('attempts') - 1)
+
+
+def requeue_stale(queues):
+    """
+    Devuelve a la cola los trabajos `running` cuyo trabajador desapareció
+    (más de LOCK_TIMEOUT segundos sin terminar). Cuentan como un intento:
+    como en run_job, los que ya agotaron `max_attempts` quedan `failed` en
+    lugar de volver a la cola. Devuelve cuántos trabajos recuperó.
+    """
+    now = timezone.now()
+    locked_before = now - timedelta(seconds=_config('LOCK_TIMEOUT', 300))
+    stale = Job.objects.filter(status=Job.RUNNING, queue__in=queues, locked_at__lt=locked_before)
+    error = 'Trabajador sin respuesta'
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED, last_error=error, time_finish=now
+        )
+        requeued = stale.update(status=Job.PENDING, locked_at=None, locked_by='', last_error=error)
+    if failed:
+        logger.error('%s trabajos abandonados agotaron sus intentos', failed)
+    return failed + requeued
+
+
+class Worker:
+    """
+    Trabajador de la cola: reclama lotes, los ejecuta y espera
+    `POLL_INTERVAL` segundos cuando no hay trabajo. Con `stop` (un
+    threading.Event) se detiene después del trabajo en curso y devuelve a la
+    cola el resto del lote.
+    """
+
+    def __init__(self, name, queues=('default',), batch_size=None, poll_interval=None, stop=None):
+        self.name = name
+        self.queues = list(queues)
+        self.batch_size = batch_size or _config('BATCH_SIZE', 10)
+        self.poll_interval = _config('POLL_INTERVAL', 1) if poll_interval is None else poll_interval
+        self.stop = stop or threading.Event()
+        self.processed = self.failed = 0
+
+    def run_once(self):
+        """Procesa un lote. Devuelve cuántos trabajos reclamó."""
+        jobs = claim(self.name, self.queues, self.batch_size)
+        for position, job in enumerate(jobs):
+            if self.stop.is_set():
+                release(jobs[position:])
+                break
+            if not run_job(job):
+                self.failed += 1
+            self.processed += 1
+        return len(jobs)
+
+    def run(self, drain=False):
+        """
+        Procesa hasta que se active `stop` o, con `drain`, hasta que la cola
+        quede vacía. Un error de la base (reinicio, failover, conexión
+        cerrada) no detiene al trabajador: se registra, se descartan las
+        conexiones inservibles y se reintenta después de `poll_interval`.
+        """
+        while not self.stop.is_set():
+            try:
+                if not self.run_once():
+                    if drain:
+                        break
+                    # Sin trabajo pendiente: recupera los de trabajadores caídos antes de esperar
+                    if not requeue_stale(self.queues):
+                        self.stop.wait(self.poll_interval)
+            except Exception:
+                logger.exception('Error en el trabajador %s; se reintenta en %s s', self.name, self.poll_interval)
+                close_old_connections()
+                self.stop.wait(self.poll_interval)
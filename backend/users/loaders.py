@@ -0,0 +1,227 @@
+import asyncio
+from django.contrib.auth import get_user_model
+from .cache import aget_country, aget_document_type, get_country, get_document_type
+from .models import ContactInfo, UserDocument
+from .optimizer import query_plan
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def load_related(root, name, loader, info):
+    """
+    Resuelve la llave foránea `name` de `root`.
+
+    Si la consulta que cargó `root` ya trajo la relación (select_related del
+    optimizador) se usa esa instancia; si no, se pide al DataLoader.
+    """
+    field = root._meta.get_field(name)
+    if field.is_cached(root):
+        return getattr(root, name)
+    return loader.load(getattr(root, field.attname), info)
+
+
+def load_reverse(root, accessor_name, loader, info):
+    """Como `load_related`, para relaciones inversas cargadas con prefetch_related."""
+    if accessor_name in getattr(root, '_prefetched_objects_cache', {}):
+        return list(getattr(root, accessor_name).all())
+    return loader.load(root.pk, info)
+
+
+def batched(resolver):
+    """
+    Marca un resolver que obtiene sus datos de un DataLoader.
+
+    En el esquema asíncrono SyncResolverMiddleware lo deja en el event loop
+    (en lugar de enviarlo a un hilo) para que sus llaves se agrupen.
+    """
+    resolver.runs_in_event_loop = True
+    return resolver
+
+
+class DataLoader:
+    """
+    Agrupa las llaves pedidas durante una solicitud y las carga en lote.
+
+    Con el esquema asíncrono, `load` devuelve una corrutina: las llaves que se
+    piden en la misma vuelta del event loop se cargan juntas con una sola
+    llamada a `abatch_load`. Con el esquema síncrono no hay vueltas que
+    esperar, así que se cargan juntas la llave pedida y las anunciadas antes
+    con `prepare` (por ejemplo, los ids de una lista de usuarios). En ambos
+    casos cada llave se carga una sola vez por solicitud.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._pending = set()
+        self._futures = {}
+        self._queue = []
+        # El event loop solo guarda referencias débiles a sus tareas: sin
+        # esta, el recolector podría descartar un despacho en curso
+        self._tasks = set()
+
+    def batch_load(self, keys):
+        """Devuelve un diccionario {llave: valor} para `keys`."""
+        raise NotImplementedError
+
+    async def abatch_load(self, keys):
+        raise NotImplementedError
+
+    def prime(self, key, value):
+        self._cache.setdefault(key, value)
+
+    def prepare(self, keys):
+        self._pending.update(key for key in keys if key not in self._cache)
+
+    def observe(self, info):
+        """Registra la selección GraphQL de quien pide la llave."""
+
+    def load(self, key, info=None):
+        if info is not None:
+            self.observe(info)
+        loop = _running_loop()
+        if loop is not None:
+            return self.aload(key, loop)
+        if key not in self._cache:
+            keys = self._pending | {key}
+            self._pending = set()
+            self._store(keys, self.batch_load(list(keys)))
+        return self._cache[key]
+
+    async def aload(self, key, loop=None):
+        if key in self._cache:
+            return self._cache[key]
+        future = self._futures.get(key)
+        if future is None:
+            loop = loop or asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # Se despacha después de que los demás resolvers de esta
+                # vuelta hayan pedido sus llaves.
+                loop.call_soon(self._start_dispatch, loop)
+        return await future
+
+    def _start_dispatch(self, loop):
+        task = loop.create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        keys = set(self._queue) | self._pending
+        self._queue, self._pending = [], set()
+        # Los futures siguen registrados hasta que termine la carga: quien pida
+        # una de estas llaves mientras tanto (p. ej. otra operación de un
+        # lote) espera esta misma carga en lugar de iniciar otra
+        futures = {key: self._futures[key] for key in keys if key in self._futures}
+        try:
+            values = await self.abatch_load(list(keys))
+        except Exception as e:
+            for key, future in futures.items():
+                del self._futures[key]
+                future.set_exception(e)
+            return
+        self._store(keys, values)
+        for key, future in futures.items():
+            del self._futures[key]
+            future.set_result(self._cache[key])
+
+    def _store(self, keys, values):
+        for key in keys:
+            self._cache.setdefault(key, values.get(key, self.default()))
+
+    def default(self):
+        return None
+
+
+class QuerySetLoader(DataLoader):
+    """DataLoader que resuelve las llaves con una consulta `field__in`."""
+
+    def __init__(self, queryset, field='pk', many=False):
+        super().__init__()
+        self.queryset = queryset
+        self.field = field
+        self.many = many
+        self._plan = None
+
+    def default(self):
+        return [] if self.many else None
+
+    def _group(self, objects):
+        if not self.many:
+            return {getattr(obj, self.field): obj for obj in objects}
+        grouped = {}
+        for obj in objects:
+            grouped.setdefault(getattr(obj, self.field), []).append(obj)
+        return grouped
+
+    def observe(self, info):
+        # Las selecciones de una misma tanda se combinan (ver users/optimizer.py)
+        plan = query_plan(info)
+        if plan is None or plan.model is not self.queryset.model:
+            return
+        self._plan = plan if self._plan is None else self._plan.merge(plan)
+
+    def _queryset(self, keys):
+        queryset = self.queryset.filter(**{f'{self.field}__in': keys})
+        plan, self._plan = self._plan, None
+        return plan.apply(queryset) if plan is not None else queryset
+
+    def batch_load(self, keys):
+        return self._group(self._queryset(keys))
+
+    async def abatch_load(self, keys):
+        return self._group([obj async for obj in self._queryset(keys)])
+
+
+class ReferenceLoader(DataLoader):
+    """DataLoader de datos de referencia: las llaves se leen de la caché (users/cache.py)."""
+
+    def __init__(self, getter, agetter):
+        super().__init__()
+        self.getter = getter
+        self.agetter = agetter
+
+    def batch_load(self, keys):
+        return {key: self.getter(key) for key in keys}
+
+    async def abatch_load(self, keys):
+        return {key: await self.agetter(key) for key in keys}
+
+
+class Loaders:
+    """DataLoaders de una solicitud (ver `get_loaders`)."""
+
+    def __init__(self):
+        self.user = QuerySetLoader(get_user_model().objects.all())
+        self.type_document = ReferenceLoader(get_document_type, aget_document_type)
+        self.country = ReferenceLoader(get_country, aget_country)
+        self.documents_by_user = QuerySetLoader(
+            UserDocument.objects.order_by('pk'), field='user_id', many=True
+        )
+        self.contacts_by_user = QuerySetLoader(
+            ContactInfo.objects.order_by('pk'), field='user_id', many=True
+        )
+
+    def prepare_users(self, users):
+        """Anuncia una lista de usuarios para cargar sus relaciones en lote."""
+        users = [user for user in users if user is not None]
+        for user in users:
+            self.user.prime(user.pk, user)
+        self.documents_by_user.prepare(user.pk for user in users)
+        self.contacts_by_user.prepare(user.pk for user in users)
+
+
+def get_loaders(info):
+    """Devuelve los DataLoaders de la solicitud, creándolos en el primer uso."""
+    context = info.context
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, '_loaders', None)
+    if loaders is None:
+        loaders = context._loaders = Loaders()
+    return loaders
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+from django.test import Client
+from singularity.pooled_postgresql.base import close_pools
+from users.cache import reference_cache
+
+ALL_COUNTRIES = '{ allCountries { id countryCode countryName } }'
+
+# Variaciones sobre DATABASES['default'] que se comparan
+MODES = {
+    'sin persistencia': {'CONN_MAX_AGE': 0},
+    'persistente': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'ENGINE': 'singularity.pooled_postgresql', 'CONN_MAX_AGE': 0},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide solicitudes por segundo de allCountries con y sin conexiones '
+        'persistentes o pool. La caché de datos de referencia se vacía en cada '
+        'solicitud para que todas consulten la base de datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Solicitudes por modo')
+        parser.add_argument('--concurrency', type=int, default=8, help='Hilos simultáneos')
+        parser.add_argument('--pool-max-size', type=int, default=None)
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+
+    def handle(self, *args, **options):
+        base = connections['default'].settings_dict
+        self.stdout.write(f"{'modo':<18} {'solicitudes/s':>14} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for mode in options['modes']:
+            settings_dict = {**base, **MODES[mode]}
+            if mode == 'pool':
+                max_size = options['pool_max_size'] or options['concurrency']
+                settings_dict['OPTIONS'] = {
+                    **base['OPTIONS'],
+                    'pool': {'min_size': max_size, 'max_size': max_size, 'timeout': 30},
+                }
+            else:
+                settings_dict['ENGINE'] = 'django.db.backends.postgresql'
+                settings_dict['OPTIONS'] = {
+                    key: value for key, value in base['OPTIONS'].items() if key != 'pool'
+                }
+            rate, p50, p99 = self._run(settings_dict, options['requests'], options['concurrency'])
+            self.stdout.write(f'{mode:<18} {rate:>14.1f} {p50:>10.2f} {p99:>10.2f}')
+        close_pools()
+
+    def _run(self, settings_dict, total, concurrency):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        per_thread = total // concurrency
+        ready = threading.Barrier(concurrency + 1)
+
+        def worker():
+            # Cada hilo tiene su propia conexión "default" con la variante a medir
+            backend = load_backend(settings_dict['ENGINE'])
+            connections['default'] = backend.DatabaseWrapper({**settings_dict}, 'default')
+            client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+            body = json.dumps({'query': ALL_COUNTRIES})
+            ready.wait()
+            try:
+                for _ in range(per_thread):
+                    reference_cache.clear()
+                    start = time.perf_counter()
+                    response = client.post('/graphql/', body, content_type='application/json')
+                    elapsed = time.perf_counter() - start
+                    if response.status_code != 200:
+                        raise RuntimeError(response.content)
+                    with lock:
+                        latencies.append(elapsed)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections['default'].close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+
+        latencies.sort()
+        return (
+            len(latencies) / wall,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        )
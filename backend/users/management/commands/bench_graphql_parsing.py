@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from graphql import parse, validate
+from singularity.persisted_queries import DocumentCache
+from singularity.schema import schema
+
+# Documentos que el frontend envía con más frecuencia
+DOCUMENTS = {
+    'allCountries': '''
+        query {
+            allCountries { id countryCode countryName }
+            allDocumentTypes { id nameTypeDocument }
+        }
+    ''',
+    'registerUser': '''
+        mutation RegisterUser($input: UserRegistrationInput!) {
+            registerUser(input: $input) { success message user { id email } }
+        }
+    ''',
+    'tokenAuth': '''
+        mutation TokenAuth($email: String!, $password: String!) {
+            tokenAuth(email: $email, password: $password) { token payload refreshExpiresIn }
+        }
+    ''',
+    'me': '''
+        query { me { id email username name lastName isMilitar emailVerified } }
+    ''',
+}
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de parsear y validar los documentos GraphQL, con y sin la caché de documentos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        graphql_schema = schema.graphql_schema
+        cache = DocumentCache()
+
+        self.stdout.write(f"{'documento':<14} {'sin caché (µs)':>15} {'con caché (µs)':>15} {'aceleración':>12}")
+        for name, query in DOCUMENTS.items():
+            start = time.perf_counter()
+            for _ in range(iterations):
+                validate(graphql_schema, parse(query))
+            uncached = (time.perf_counter() - start) / iterations * 1e6
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                cache.get(graphql_schema, query)
+            cached = (time.perf_counter() - start) / iterations * 1e6
+
+            self.stdout.write(f'{name:<14} {uncached:>15.1f} {cached:>15.1f} {uncached / cached:>11.0f}x')
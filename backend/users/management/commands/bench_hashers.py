@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+def _hash_for(hasher_index, duration):
+    """Calcula hashes durante `duration` segundos y devuelve (hashes, segundos)."""
+    hasher = get_hashers()[hasher_index]
+    salt = hasher.salt()
+    count = 0
+    start = time.perf_counter()
+    while True:
+        hasher.encode('benchpass123', salt)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return count, elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cuántos hashes por segundo y por núcleo calcula cada hasher de '
+        'PASSWORD_HASHERS con los factores de trabajo configurados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=3.0, help='Segundos por medición')
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Procesos simultáneos para medir la capacidad con todos los núcleos ocupados'
+        )
+        parser.add_argument(
+            '--slo-ms', type=float, default=None,
+            help='Latencia objetivo de un login; se indica si cada hasher la cumple'
+        )
+
+    def handle(self, *args, **options):
+        duration, processes, slo = options['duration'], options['processes'], options['slo_ms']
+        self.stdout.write(
+            f"{'hasher':<16} {'parámetros':<46} {'ms/hash':>9} {'hash/s/núcleo':>14} "
+            f"{f'hash/s ({processes} proc)':>18} {'SLO':>5}"
+        )
+        for index, hasher in enumerate(get_hashers()):
+            try:
+                if hasher.library:
+                    hasher._load_library()
+            except ValueError as e:
+                self.stdout.write(f'{hasher.algorithm:<16} omitido: {e}')
+                continue
+
+            count, elapsed = _hash_for(index, duration)
+            latency_ms = elapsed / count * 1000
+
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                runs = list(pool.map(_hash_for, [index] * processes, [duration] * processes))
+            total = sum(c / e for c, e in runs)
+
+            meets_slo = '-' if slo is None else ('sí' if latency_ms <= slo else 'no')
+            self.stdout.write(
+                f'{hasher.algorithm:<16} {self._parameters(hasher):<46} {latency_ms:>9.1f} '
+                f'{count / elapsed:>14.1f} {total:>18.1f} {meets_slo:>5}'
+            )
+
+    @staticmethod
+    def _parameters(hasher):
+        names = ['iterations', 'rounds', 'time_cost', 'memory_cost', 'parallelism', 'work_factor']
+        return ' '.join(
+            f'{name}={getattr(hasher, name)}' for name in names if hasattr(hasher, name)
+        )
@@ -0,0 +1,98 @@
+import time
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from singularity.schema import schema
+from users.models import Country, TypeDocument
+
+REGISTER_USER = '''
+    mutation($input: UserRegistrationInput!) {
+        registerUser(input: $input) { success message }
+    }
+'''
+
+BULK_REGISTER_USERS = '''
+    mutation($inputs: [UserRegistrationInput!]!) {
+        bulkRegisterUsers(inputs: $inputs) { created success message }
+    }
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara N llamadas a registerUser contra una llamada a bulkRegisterUsers. '
+        'Cada corrida se ejecuta dentro de una transacción que se revierte al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+        parser.add_argument(
+            '--fast-hasher', action='store_true',
+            help='Usa MD5PasswordHasher para medir solo el costo de base de datos'
+        )
+        parser.add_argument(
+            '--skip-single-above', type=int, default=None,
+            help='No ejecuta registerUser uno a uno para tamaños mayores a este valor'
+        )
+
+    def handle(self, *args, **options):
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hasher'] else None
+        with override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})):
+            self.stdout.write(f"{'filas':>8} {'registerUser (s)':>18} {'bulk (s)':>10} {'aceleración':>12}")
+            for size in options['sizes']:
+                single = None
+                if options['skip_single_above'] is None or size <= options['skip_single_above']:
+                    single = self._run(size, self._register_one_by_one)
+                bulk = self._run(size, self._register_bulk)
+                speedup = f'{single / bulk:.1f}x' if single else '-'
+                single_text = f'{single:.2f}' if single else '-'
+                self.stdout.write(f'{size:>8} {single_text:>18} {bulk:>10.2f} {speedup:>12}')
+
+    def _run(self, size, runner):
+        with transaction.atomic():
+            country = Country.objects.create(country_code='BNCH', country_name='Benchmark')
+            doc_type = TypeDocument.objects.create(name_type_document='Benchmark')
+            inputs = [self._input(i, country.id, doc_type.id) for i in range(size)]
+            context = RequestFactory().post('/graphql/')
+            context.user = AnonymousUser()
+
+            start = time.perf_counter()
+            runner(inputs, context)
+            elapsed = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+        return elapsed
+
+    def _register_one_by_one(self, inputs, context):
+        for variables in inputs:
+            result = schema.execute(REGISTER_USER, variable_values={'input': variables}, context_value=context)
+            if result.errors or not result.data['registerUser']['success']:
+                raise RuntimeError(result.errors or result.data['registerUser']['message'])
+
+    def _register_bulk(self, inputs, context):
+        result = schema.execute(BULK_REGISTER_USERS, variable_values={'inputs': inputs}, context_value=context)
+        if result.errors or not result.data['bulkRegisterUsers']['success']:
+            raise RuntimeError(result.errors or result.data['bulkRegisterUsers']['message'])
+
+    @staticmethod
+    def _input(i, country_id, doc_type_id):
+        return {
+            'email': f'bench_{i}@example.com',
+            'username': f'bench_{i}',
+            'password': 'benchpass123',
+            'lastName': 'Bench',
+            'name': 'User',
+            'isMilitar': False,
+            'documentType': str(doc_type_id),
+            'documentNumber': f'B{i:09d}',
+            'documentExpeditionPlace': 'Bogotá',
+            'documentExpeditionDate': '2020-01-01',
+            'country': str(country_id),
+            'address': 'Calle 123 N 45-67',
+            'city': 'Bogotá',
+            'phone': '1234567',
+            'celPhone': '3001234567',
+            'emergencyName': 'Emergency Contact',
+            'emergencyPhone': '3009876543',
+        }
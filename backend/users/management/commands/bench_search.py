@@ -0,0 +1,123 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from users.models import AppUser, Country, TypeDocument
+from users.search import _city_matches, _document_matches, _name_matches, search_user_ids
+
+NAMES = ['José', 'María', 'Ángela', 'Andrés', 'Sofía', 'Julián', 'Camila', 'Simón', 'Lucía', 'Martín']
+LAST_NAMES = ['Pérez', 'Gómez', 'Núñez', 'Rodríguez', 'Martínez', 'López', 'Díaz', 'Muñoz', 'Rojas', 'Peña']
+CITIES = ['Bogotá', 'Medellín', 'Cali', 'Barranquilla', 'Cartagena', 'Cúcuta', 'Ibagué', 'Popayán']
+
+TERMS = ['maria', 'jose perez', 'angela nunez', 'PEÑA', 'rodriguez 452134', '100045213', '1000452134', 'popay']
+
+SEED_USERS = '''
+    INSERT INTO "AppUser_TB" (
+        email, username, password, name, last_name, is_superuser, is_staff, is_active,
+        is_temporal, is_militar, email_verified, time_create
+    )
+    SELECT 'bench' || i || '@bench.invalid', 'bench' || i, '!',
+           (%(names)s)[1 + i %% %(name_count)s],
+           (%(last_names)s)[1 + (i / %(name_count)s) %% %(last_name_count)s] || ' ' || i,
+           false, false, true, false, false, false, now()
+    FROM generate_series(1, %(users)s) AS i
+'''
+
+SEED_RELATIONS = '''
+    INSERT INTO "UserDocument_TB" (user_id, type_document_id, document, place_expedition, date_expedition)
+    SELECT id, %(type_document)s, (1000000000 + substring(username from 6)::int)::text, 'Bogotá', '2020-01-01'
+    FROM "AppUser_TB" WHERE email LIKE '%%@bench.invalid';
+    INSERT INTO "ContactInfo_TB" (
+        user_id, country_id, address, city, phone, cel_phone, emergency_name, emergency_phone
+    )
+    SELECT id, %(country)s, 'Calle 1', (%(cities)s)[1 + id %% %(city_count)s],
+           '1234567', '3001234567', 'Contacto', '3009876543'
+    FROM "AppUser_TB" WHERE email LIKE '%%@bench.invalid';
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide searchUsers sobre una tabla sembrada con N usuarios (con documento '
+        'y contacto) y la compara con la búsqueda sin índices (icontains). La '
+        'siembra se revierte al final, salvo con --keep.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20, help='Repeticiones por término')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--terms', nargs='+', default=TERMS)
+        parser.add_argument('--keep', action='store_true', help='Conserva los usuarios sembrados')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            start = time.perf_counter()
+            self._seed(options['users'])
+            self.stdout.write(f"{options['users']} usuarios sembrados en {time.perf_counter() - start:.1f} s")
+
+            self.stdout.write(
+                f"{'término':<16} {'resultados':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+                f"{'sin índices (ms)':>17} {'índices usados':>15}"
+            )
+            for term in options['terms']:
+                self._measure(term, options['limit'], options['repeat'])
+
+            transaction.set_rollback(not options['keep'])
+
+    def _seed(self, users):
+        country, _ = Country.objects.get_or_create(country_code='BNCH', defaults={'country_name': 'Benchmark'})
+        type_document, _ = TypeDocument.objects.get_or_create(name_type_document='Benchmark')
+        params = {
+            'names': NAMES, 'name_count': len(NAMES),
+            'last_names': LAST_NAMES, 'last_name_count': len(LAST_NAMES),
+            'cities': CITIES, 'city_count': len(CITIES),
+            'users': users, 'country': country.pk, 'type_document': type_document.pk,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_USERS, params)
+            cursor.execute(SEED_RELATIONS, params)
+            # Dentro de la transacción no corre autovacuum: se vacía la lista
+            # pendiente del índice GIN como lo haría en producción
+            cursor.execute("SELECT gin_clean_pending_list('appuser_name_search_idx')")
+            for table in ('AppUser_TB', 'UserDocument_TB', 'ContactInfo_TB'):
+                cursor.execute(f'ANALYZE "{table}"')
+
+    def _measure(self, term, limit, repeat):
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ids = search_user_ids(term, limit)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+
+        # Referencia: la misma búsqueda sin índices utilizables
+        naive = (
+            AppUser.objects.filter(
+                Q(name__icontains=term) | Q(last_name__icontains=term)
+                | Q(userdocument__document__startswith=term) | Q(contactinfo__city__icontains=term)
+            ).values_list('pk', flat=True).distinct()[:limit]
+        )
+        start = time.perf_counter()
+        list(naive)
+        baseline = time.perf_counter() - start
+
+        self.stdout.write(
+            f'{term:<16} {len(ids):>10} {latencies[len(latencies) // 2] * 1000:>10.2f} '
+            f'{latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000:>10.2f} '
+            f'{baseline * 1000:>17.2f} {self._indexes_used(term, limit):>15}'
+        )
+
+    @staticmethod
+    def _indexes_used(term, limit):
+        """Cuántas de las consultas de search_user_ids usan un índice según EXPLAIN."""
+        used = total = 0
+        for matches in (_name_matches, _document_matches, _city_matches):
+            queryset = matches(term, limit)
+            if not hasattr(queryset, 'explain'):
+                continue
+            total += 1
+            plan = json.dumps(json.loads(queryset.explain(format='json')))
+            used += 'Index' in plan
+        return f'{used}/{total}'
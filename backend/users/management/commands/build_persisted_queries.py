@@ -0,0 +1,59 @@
+import json
+import re
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from graphql import GraphQLError, parse, print_ast, validate
+from singularity.persisted_queries import add_typename, query_hash
+from singularity.schema import schema
+
+# Plantillas gql`...` del frontend
+GQL_TEMPLATE = re.compile(r'gql`(.*?)`', re.DOTALL)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera el registro de consultas persistidas {sha256: consulta} a partir de '
+        'archivos .graphql o de las plantillas gql`...` de archivos .js. Cada '
+        'documento se valida contra el esquema y se transforma como lo hace Apollo '
+        'Client antes de enviarlo (agrega __typename y lo imprime con print_ast, '
+        'equivalente al print de graphql-js), para que los hashes coincidan con los '
+        'que calcula createPersistedQueryLink.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Archivos o directorios a recorrer')
+        parser.add_argument('--output', required=True, help='Ruta del JSON a generar')
+        parser.add_argument(
+            '--no-add-typename', action='store_false', dest='add_typename',
+            help='No agrega __typename (clientes con InMemoryCache({addTypename: false}))'
+        )
+
+    def handle(self, *args, **options):
+        registry = {}
+        for source in self._sources(options['paths']):
+            text = source.read_text(encoding='utf-8')
+            documents = [text] if source.suffix == '.graphql' else GQL_TEMPLATE.findall(text)
+            for raw in documents:
+                try:
+                    document = parse(raw)
+                except GraphQLError as e:
+                    raise CommandError(f'{source}: {e.message}')
+                if options['add_typename']:
+                    document = add_typename(document)
+                errors = validate(schema.graphql_schema, document)
+                if errors:
+                    raise CommandError(f'{source}: {errors[0].message}')
+                query = print_ast(document)
+                registry[query_hash(query)] = query
+
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(registry, output, indent=2, sort_keys=True, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'{len(registry)} consultas persistidas en {options["output"]}'))
+
+    @staticmethod
+    def _sources(paths):
+        for path in map(Path, paths):
+            if path.is_dir():
+                yield from sorted(p for p in path.rglob('*') if p.suffix in ('.graphql', '.js'))
+            else:
+                yield path
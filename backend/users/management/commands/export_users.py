@@ -0,0 +1,42 @@
+import sys
+import time
+from django.core.management.base import BaseCommand
+from users.exporter import CHUNK_SIZE, FORMATS, UserExport
+from users.importer import source_format
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta todos los usuarios con su documento y su información de contacto '
+        'en CSV o NDJSON, opcionalmente comprimido con gzip. Las filas se leen con '
+        'un cursor del servidor y se escriben a medida que llegan, así que la '
+        'memoria no depende del número de usuarios.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-', help='Archivo de salida o "-" para la salida estándar'
+        )
+        parser.add_argument('--format', choices=FORMATS, help='Por defecto, según la extensión')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida (implícito con .gz)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Filas por lectura del cursor')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = options['gzip'] or path.endswith('.gz')
+        format = options['format'] or source_format(path)
+        export = UserExport(format, compress, options['chunk_size'])
+
+        started = time.perf_counter()
+        output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for chunk in export:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        elapsed = time.perf_counter() - started
+
+        # Con la salida estándar el resumen va a stderr para no mezclarse con los datos
+        report = self.stderr if path == '-' else self.stdout
+        report.write(self.style.SUCCESS(f'{export.rows} filas exportadas en {elapsed:.1f} s'))
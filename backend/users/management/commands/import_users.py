@@ -0,0 +1,73 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from users.hashing import PasswordHashingService
+from users.importer import RejectWriter, UserImporter, open_source, read_rows, source_format
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa usuarios con su documento y su información de contacto desde un '
+        'archivo CSV o NDJSON (opcionalmente .gz, o "-" para la entrada estándar). '
+        'Las columnas son los campos de UserRegistrationInput en snake_case; el país '
+        'y el tipo de documento pueden darse por id, código o nombre. Las filas se '
+        'validan como en registerUser, se cargan con COPY en bloques y las rechazadas '
+        'se escriben en un archivo aparte. Si el comando se interrumpe, al repetirlo '
+        'continúa después del último bloque confirmado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo de entrada o "-" para la entrada estándar')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Por defecto, según la extensión')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Filas por bloque (y por transacción)')
+        parser.add_argument('--rejects', help='Archivo de filas rechazadas (por defecto <path>.rejects.<formato>)')
+        parser.add_argument(
+            '--source',
+            help='Nombre del punto de control para reanudar (por defecto, la ruta absoluta del archivo)'
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignora el punto de control y empieza de cero')
+        parser.add_argument(
+            '--hash-workers', type=int, default=os.cpu_count(),
+            help='Procesos dedicados al hash de contraseñas'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or source_format(path)
+        source = options['source'] or (None if path == '-' else os.path.abspath(path))
+        if source is None:
+            raise CommandError('Con la entrada estándar se debe indicar --source para poder reanudar')
+        rejects_path = options['rejects'] or (
+            f'import_users.rejects.{format}' if path == '-' else f'{path}.rejects.{format}'
+        )
+
+        hasher = PasswordHashingService(
+            backend='process', workers=options['hash_workers'], max_queue=options['hash_workers']
+        )
+        importer = UserImporter(source, hasher, options['chunk_size'], self._progress)
+        if options['restart']:
+            importer.restart()
+        resuming = importer.checkpoint.rows_read > 0
+        if resuming:
+            self.stdout.write(f'Reanudando {source} después de {importer.checkpoint.rows_read} filas')
+
+        rejects = RejectWriter(rejects_path, format, append=resuming)
+        try:
+            with open_source(path) as stream:
+                read, imported, rejected, elapsed = importer.run(read_rows(stream, format), rejects)
+        finally:
+            rejects.close()
+            hasher.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{imported} usuarios importados y {rejected} rechazados de {read} filas en {elapsed:.1f} s '
+            f'({read / elapsed if elapsed else 0:.0f} filas/s)'
+        ))
+        if rejected:
+            self.stdout.write(f'Filas rechazadas en {rejects_path}')
+
+    def _progress(self, read, imported, rejected, elapsed):
+        self.stdout.write(
+            f'{read} filas: {imported} importadas, {rejected} rechazadas '
+            f'({read / elapsed if elapsed else 0:.0f} filas/s)'
+        )
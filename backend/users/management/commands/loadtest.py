@@ -0,0 +1,101 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_QUERY = '''
+    query {
+        allCountries { id countryCode countryName }
+        allDocumentTypes { id nameTypeDocument }
+    }
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera carga concurrente contra uno o varios endpoints GraphQL y compara '
+        'throughput y latencias. Para comparar WSGI contra ASGI, levante ambos '
+        'servidores y páselos como objetivos, por ejemplo:\n'
+        '  gunicorn singularity.wsgi --bind :8000\n'
+        '  uvicorn singularity.asgi:application --port 8001\n'
+        '  manage.py loadtest --target wsgi=http://127.0.0.1:8000/graphql/ '
+        '--target asgi=http://127.0.0.1:8001/graphql/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='nombre=url del endpoint; se puede repetir')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10.0, help='Segundos por objetivo')
+        parser.add_argument('--query', default=DEFAULT_QUERY)
+        parser.add_argument('--variables', default=None, help='Variables en JSON')
+        parser.add_argument('--header', action='append', default=[],
+                            help='Encabezado adicional "Nombre: valor"; se puede repetir')
+
+    def handle(self, *args, **options):
+        body = json.dumps({
+            'query': options['query'],
+            'variables': json.loads(options['variables']) if options['variables'] else None,
+        })
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        for header in options['header']:
+            name, _, value = header.partition(':')
+            headers[name.strip()] = value.strip()
+
+        self.stdout.write(
+            f"{'objetivo':<10} {'req/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errores':>8}"
+        )
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Objetivo inválido: {target} (use nombre=url)')
+            latencies, errors, elapsed = self._run(url, body, headers, options['concurrency'], options['duration'])
+            if not latencies:
+                raise CommandError(f'{name}: ninguna solicitud tuvo éxito ({errors} errores)')
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{name:<10} {len(latencies) / elapsed:>9.1f} {quantiles[49] * 1000:>9.1f} '
+                f'{quantiles[94] * 1000:>9.1f} {quantiles[98] * 1000:>9.1f} {errors:>8}'
+            )
+
+    @staticmethod
+    def _run(url, body, headers, concurrency, duration):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        latencies, lock = [], threading.Lock()
+        errors = [0]
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            # Una conexión keep-alive por hilo, como haría un cliente real
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    connection.request('POST', path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                if ok:
+                    local.append(time.perf_counter() - start)
+                else:
+                    failed += 1
+            connection.close()
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.perf_counter() - started
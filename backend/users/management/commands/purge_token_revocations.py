@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from users.revocation import get_revocation_store
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las revocaciones de tokens que ya expiraron (un token expirado se '
+        'rechaza de todos modos). Pensado para ejecutarse periódicamente, por '
+        'ejemplo desde cron cada hora; el logout no hace esta limpieza.'
+    )
+
+    def handle(self, *args, **options):
+        get_revocation_store().purge()
+        self.stdout.write(self.style.SUCCESS('Revocaciones expiradas eliminadas'))
@@ -0,0 +1,75 @@
+import os
+import signal
+import socket
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from users.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta los trabajadores de la cola de trabajos en segundo plano (correos de '
+        'verificación, etc.). Cada trabajador es un hilo con su propia conexión que '
+        'reclama lotes con SELECT ... FOR UPDATE SKIP LOCKED, así que se pueden correr '
+        'varias instancias del comando en paralelo. SIGINT/SIGTERM detienen los '
+        'trabajadores después del trabajo en curso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_QUEUE.get('CONCURRENCY', 4),
+            help='Número de trabajadores'
+        )
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help='Cola a procesar (se puede repetir; por defecto "default")'
+        )
+        parser.add_argument('--batch-size', type=int, help='Trabajos reclamados por consulta')
+        parser.add_argument('--once', action='store_true', help='Termina cuando la cola quede vacía')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        workers = [
+            Worker(
+                f'{prefix}:{number}', options['queues'] or ['default'], options['batch_size'], stop=stop
+            )
+            for number in range(options['concurrency'])
+        ]
+
+        def shutdown(signum, frame):
+            self.stdout.write('Deteniendo los trabajadores...')
+            stop.set()
+
+        previous = {signum: signal.signal(signum, shutdown) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            if len(workers) == 1:
+                workers[0].run(drain=options['once'])
+            else:
+                threads = [
+                    threading.Thread(target=self._run, args=(worker, options['once']), name=worker.name)
+                    for worker in workers
+                ]
+                for thread in threads:
+                    thread.start()
+                # join con tiempo de espera para que las señales lleguen al hilo principal
+                for thread in threads:
+                    while thread.is_alive():
+                        thread.join(0.5)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        processed = sum(worker.processed for worker in workers)
+        failed = sum(worker.failed for worker in workers)
+        self.stdout.write(self.style.SUCCESS(f'{processed} trabajos procesados, {failed} con error'))
+
+    @staticmethod
+    def _run(worker, drain):
+        try:
+            worker.run(drain=drain)
+        finally:
+            # Cada hilo tiene sus propias conexiones
+            connections.close_all()
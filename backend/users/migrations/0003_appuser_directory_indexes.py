@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_appuser_is_militar_alter_appuser_password_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['time_create', 'id'], name='appuser_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['is_active', 'time_create', 'id'], name='appuser_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['email_verified', 'time_create', 'id'], name='appuser_verified_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(condition=models.Q(('is_temporal', True)), fields=['time_create', 'id'], name='appuser_temporal_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(condition=models.Q(('is_militar', True)), fields=['time_create', 'id'], name='appuser_militar_created_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:24
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def email_collisions(connection, table, batch_size=BATCH_SIZE):
+    """
+    Emails que solo difieren en mayúsculas, en lotes de `batch_size` grupos
+    (LOWER(email), [ids], [emails]). Se leen con un cursor del servidor, así
+    que la memoria no depende de cuántos haya.
+    """
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(
+            f'SELECT LOWER(email), ARRAY_AGG(id ORDER BY id), ARRAY_AGG(email ORDER BY id) '
+            f'FROM {table} GROUP BY LOWER(email) HAVING COUNT(*) > 1 ORDER BY 1'
+        )
+        while batch := cursor.fetchmany(batch_size):
+            yield batch
+
+
+def report_email_collisions(apps, schema_editor):
+    # El índice único no se puede crear si hay colisiones: se reportan todas
+    # para resolverlas (unificar o renombrar las cuentas) antes de migrar
+    AppUser = apps.get_model('users', 'AppUser')
+    table = schema_editor.quote_name(AppUser._meta.db_table)
+    total = 0
+    for batch in email_collisions(schema_editor.connection, table):
+        for identity, ids, emails in batch:
+            print(f'  {identity}: ' + ', '.join(f'#{pk} {email}' for pk, email in zip(ids, emails)))
+        total += len(batch)
+    if total:
+        raise RuntimeError(
+            f'{total} emails están registrados más de una vez sin distinguir mayúsculas (arriba). '
+            'Resuélvalos y vuelva a ejecutar migrate.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0007_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(report_email_collisions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='appuser_email_ci_uniq'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_email_case_insensitive'),
+    ]
+
+    # Versión de los datos de referencia (ver users/cache.py). Es una secuencia
+    # y no una fila porque nextval no se deshace con un rollback: una versión
+    # nunca se repite, aunque la transacción que la pidió no se confirme.
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE reference_data_version_seq',
+            'DROP SEQUENCE reference_data_version_seq',
+        ),
+    ]
@@ -1,8 +1,13 @@
 import graphene
 from graphene_django import DjangoObjectType
 from django.db import models
+from django.db.models.functions import Collate, Lower
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.validators import RegexValidator
+from django.utils import timezone
+from . import hashing
 
 # Validators
 phone_validator = RegexValidator(
@@ -15,6 +20,34 @@ address_validator = RegexValidator(
     message='La dirección solo puede contener letras, números, espacios y los caracteres - N *'
 )
 
+# Búsqueda sin tildes (ver users/search.py). translate() es IMMUTABLE y no
+# requiere extensiones (unaccent), así que sirve en índices de expresión; las
+# consultas deben usar exactamente las mismas expresiones. Los términos se
+# pliegan en Python con la misma tabla (fold_text): un carácter fuera de
+# ACCENTED queda igual en ambos lados.
+ACCENTED = 'áàäâãéèëêíìïîóòöôõúùüûñçÁÀÄÂÃÉÈËÊÍÌÏÎÓÒÖÔÕÚÙÜÛÑÇ'
+UNACCENTED = 'aaaaaeeeeiiiiooooouuuuncAAAAAEEEEIIIIOOOOOUUUUNC'
+FOLD_TABLE = str.maketrans(ACCENTED, UNACCENTED)
+
+def fold(expression):
+    """Texto en minúsculas y sin tildes."""
+    return Lower(models.Func(
+        expression, models.Value(ACCENTED), models.Value(UNACCENTED), function='translate'
+    ))
+
+def fold_text(text):
+    """`fold` en Python, para los términos de búsqueda."""
+    return text.translate(FOLD_TABLE).lower()
+
+def city_search_key():
+    # Con intercalación "C" el índice B-tree resuelve LIKE 'prefijo%' sin
+    # importar la intercalación de la base de datos
+    return Collate(fold(models.F('city')), 'C')
+
+def name_search_vector():
+    # Configuración 'simple': sin stemming ni stopwords, que no aplican a nombres
+    return SearchVector(fold(models.F('name')), fold(models.F('last_name')), config='simple')
+
 class Country(models.Model):
     country_code = models.CharField(max_length=4, unique=True)
     country_name = models.CharField(max_length=100)
@@ -34,7 +67,19 @@ class TypeDocument(models.Model):
     def __str__(self):
         return self.name_type_document
 
+def email_identity(email):
+    """
+    Forma en que se comparan los emails: la identidad no distingue
+    mayúsculas. Se consulta con `email__lower=email_identity(email)`, que usa
+    el índice único appuser_email_ci_uniq sobre LOWER(email).
+    """
+    return email.strip().lower()
+
 class CustomUserManager(BaseUserManager):
+    def get_by_natural_key(self, email):
+        # Lo usan ModelBackend (tokenAuth) y graphql_jwt para los tokens sin user_id
+        return self.get(email__lower=email_identity(email))
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('El Email es obligatorio')
@@ -70,10 +115,67 @@ class AppUser(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         db_table = 'AppUser_TB'
+        # Paginación por llave (time_create, id) del directorio de usuarios
+        # (allUsers). Los filtros frecuentes van como prefijo de igualdad; los
+        # indicadores poco comunes usan índices parciales, que son pequeños.
+        indexes = [
+            models.Index(fields=['time_create', 'id'], name='appuser_created_idx'),
+            models.Index(fields=['is_active', 'time_create', 'id'], name='appuser_active_created_idx'),
+            models.Index(
+                fields=['email_verified', 'time_create', 'id'], name='appuser_verified_created_idx'
+            ),
+            models.Index(
+                fields=['time_create', 'id'], condition=models.Q(is_temporal=True),
+                name='appuser_temporal_created_idx'
+            ),
+            models.Index(
+                fields=['time_create', 'id'], condition=models.Q(is_militar=True),
+                name='appuser_militar_created_idx'
+            ),
+            GinIndex(name_search_vector(), name='appuser_name_search_idx'),
+            # verifyEmail busca por el token; solo los usuarios sin verificar lo tienen
+            models.Index(
+                fields=['verification_token'], condition=models.Q(verification_token__isnull=False),
+                name='appuser_verification_idx'
+            ),
+        ]
+        constraints = [
+            # El email identifica al usuario sin distinguir mayúsculas
+            models.UniqueConstraint(Lower('email'), name='appuser_email_ci_uniq'),
+        ]
 
     def __str__(self):
         return self.email
 
+    # El hash y la verificación de contraseñas pasan por el pool acotado de
+    # users/hashing.py, tanto en el registro como en tokenAuth.
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        is_correct, must_update = hashing.verify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self._upgrade_password(raw_password)
+        return is_correct
+
+    async def acheck_password(self, raw_password):
+        is_correct, must_update = await hashing.averify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.password = await hashing.amake_password(raw_password)
+            await self.asave(update_fields=['password'])
+        return is_correct
+
+    def _upgrade_password(self, raw_password):
+        self.set_password(raw_password)
+        # Actualizar el hash no se considera un cambio de contraseña
+        self._password = None
+        self.save(update_fields=['password'])
+
+# `email__lower` solo para AppUser.email: LOWER("email") = ..., la misma
+# expresión del índice único
+AppUser._meta.get_field('email').register_lookup(Lower)
+
 class UserDocument(models.Model):
     user = models.ForeignKey(AppUser, on_delete=models.CASCADE)
     type_document = models.ForeignKey(TypeDocument, on_delete=models.PROTECT)
@@ -88,6 +190,12 @@ class UserDocument(models.Model):
     class Meta:
         db_table = 'UserDocument_TB'
         unique_together = ['type_document', 'document']
+        indexes = [
+            # Búsqueda por prefijo del número de documento (LIKE 'x%')
+            models.Index(
+                fields=['document'], opclasses=['varchar_pattern_ops'], name='userdocument_prefix_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.document}"
@@ -120,10 +228,86 @@ class ContactInfo(models.Model):
 
     class Meta:
         db_table = 'ContactInfo_TB'
+        indexes = [
+            # Búsqueda por prefijo de la ciudad, sin tildes
+            models.Index(city_search_key(), name='contactinfo_city_prefix_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.city}"
 
+class TokenRevocation(models.Model):
+    # Registro de revocaciones de JWT (ver users/revocation.py). `key` es
+    # `t:<jti>` para un token o `u:<id>` para todos los tokens de un usuario.
+    key = models.CharField(max_length=64, db_index=True)
+    generation = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'TokenRevocation_TB'
+
+    def __str__(self):
+        return self.key
+
+
+class ImportCheckpoint(models.Model):
+    # Avance de `manage.py import_users` por archivo de origen. Se actualiza en
+    # la misma transacción que cada bloque cargado, así que tras una caída la
+    # importación continúa exactamente después del último bloque confirmado.
+    source = models.CharField(max_length=255, unique=True)
+    rows_read = models.BigIntegerField(default=0)
+    imported = models.BigIntegerField(default=0)
+    rejected = models.BigIntegerField(default=0)
+    time_update = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ImportCheckpoint_TB'
+
+    def __str__(self):
+        return self.source
+
+
+class Job(models.Model):
+    # Cola de trabajos en segundo plano (ver users/jobs.py). Los trabajadores
+    # reclaman lotes con SELECT ... FOR UPDATE SKIP LOCKED.
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pendiente'), (RUNNING, 'En ejecución'), (DONE, 'Terminado'), (FAILED, 'Fallido')]
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    time_create = models.DateTimeField(auto_now_add=True)
+    time_finish = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'Job_TB'
+        # Índices parciales: solo cubren los trabajos que se pueden reclamar,
+        # así que no crecen con el historial de trabajos terminados
+        indexes = [
+            models.Index(
+                fields=['queue', 'run_at', 'id'], condition=models.Q(status='pending'),
+                name='job_pending_idx'
+            ),
+            models.Index(
+                fields=['queue', 'locked_at'], condition=models.Q(status='running'),
+                name='job_running_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.status})'
+
+
 class RegisterUser(graphene.Mutation):
     class Arguments:
         # User fields
@@ -188,4 +372,4 @@ class RegisterUser(graphene.Mutation):
 
             return RegisterUser(success=True, message="Usuario registrado exitosamente")
         except Exception as e:
-            return RegisterUser(success=False, message=str(e))
\ No newline at end of file
+            return RegisterUser(success=False, message=str(e))
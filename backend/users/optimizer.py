@@ -0,0 +1,196 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphene_django import DjangoObjectType
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, get_named_type
+
+
+def hints(prefetch_related=None, only=()):
+    """
+    Indica al optimizador qué cargar para un campo que no es un campo del modelo.
+
+    `prefetch_related` es la relación inversa que resuelve el campo (p. ej.
+    'userdocument_set') y `only` las columnas que el resolver necesita.
+    """
+    def decorator(resolver):
+        resolver.optimizer_hints = {'prefetch_related': prefetch_related, 'only': tuple(only)}
+        return resolver
+    return decorator
+
+
+class QueryPlan:
+    """
+    Columnas y relaciones que necesita una selección GraphQL sobre un modelo.
+
+    `only` son nombres de campos del modelo, `select` las llaves foráneas a
+    cargar con select_related y `prefetch` las relaciones inversas a cargar
+    con prefetch_related; ambas con su propio QueryPlan anidado.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.only = {model._meta.pk.name}
+        # Las llaves foráneas se conservan siempre: los DataLoaders las usan
+        self.only.update(f.name for f in model._meta.concrete_fields if f.is_relation)
+        self.select = {}
+        self.prefetch = {}
+
+    def merge(self, other):
+        self.only |= other.only
+        for plans, other_plans in ((self.select, other.select), (self.prefetch, other.prefetch)):
+            for name, plan in other_plans.items():
+                if name in plans:
+                    plans[name].merge(plan)
+                else:
+                    plans[name] = plan
+        return self
+
+    def _only(self, prefix=''):
+        fields = [prefix + name for name in self.only]
+        for name, plan in self.select.items():
+            fields.extend(plan._only(f'{prefix}{name}__'))
+        return fields
+
+    def _select_related(self, prefix=''):
+        names = []
+        for name, plan in self.select.items():
+            names.append(prefix + name)
+            names.extend(plan._select_related(f'{prefix}{name}__'))
+        return names
+
+    def _prefetches(self, prefix=''):
+        prefetches = [
+            Prefetch(prefix + name, queryset=plan.apply(plan.model._default_manager.order_by('pk')))
+            for name, plan in self.prefetch.items()
+        ]
+        for name, plan in self.select.items():
+            prefetches.extend(plan._prefetches(f'{prefix}{name}__'))
+        return prefetches
+
+    def apply(self, queryset):
+        queryset = queryset.only(*self._only())
+        select_related = self._select_related()
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetches = self._prefetches()
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+
+def _field_nodes(selection_set, fragments):
+    """Recorre una selección expandiendo fragmentos."""
+    for selection in selection_set.selections if selection_set else ():
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, InlineFragmentNode):
+            yield from _field_nodes(selection.selection_set, fragments)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = fragments.get(selection.name.value)
+            if fragment is not None:
+                yield from _field_nodes(fragment.selection_set, fragments)
+
+
+def _django_type(graphql_type):
+    graphene_type = getattr(get_named_type(graphql_type), 'graphene_type', None)
+    if graphene_type is not None and issubclass(graphene_type, DjangoObjectType):
+        return graphene_type
+    return None
+
+
+def _remote_field_name(model, accessor_name):
+    for relation in model._meta.related_objects:
+        if relation.get_accessor_name() == accessor_name:
+            return relation.field.name
+    return None
+
+
+def _build_plan(graphene_type, graphql_type, field_nodes, fragments):
+    model = graphene_type._meta.model
+    plan = QueryPlan(model)
+    graphql_type = get_named_type(graphql_type)
+
+    for field_node in field_nodes:
+        for node in _field_nodes(field_node.selection_set, fragments):
+            name = node.name.value
+            if name.startswith('__') or name not in graphql_type.fields:
+                continue
+            snake_name = to_snake_case(name)
+            field_type = graphql_type.fields[name].type
+            related_type = _django_type(field_type)
+
+            resolver = getattr(graphene_type, f'resolve_{snake_name}', None)
+            field_hints = getattr(resolver, 'optimizer_hints', None)
+            if field_hints is not None:
+                plan.only.update(field_hints['only'])
+                prefetch = field_hints['prefetch_related']
+                if prefetch and related_type is not None:
+                    nested = _build_plan(related_type, field_type, [node], fragments)
+                    # prefetch_related ya asigna el objeto padre a cada fila
+                    nested.select.pop(_remote_field_name(model, prefetch), None)
+                    if prefetch in plan.prefetch:
+                        plan.prefetch[prefetch].merge(nested)
+                    else:
+                        plan.prefetch[prefetch] = nested
+                continue
+
+            try:
+                model_field = model._meta.get_field(snake_name)
+            except FieldDoesNotExist:
+                continue
+            if not model_field.concrete:
+                continue
+            if model_field.is_relation and related_type is not None:
+                nested = _build_plan(related_type, field_type, [node], fragments)
+                if snake_name in plan.select:
+                    plan.select[snake_name].merge(nested)
+                else:
+                    plan.select[snake_name] = nested
+            plan.only.add(model_field.name)
+    return plan
+
+
+def _descend(graphql_type, field_nodes, path, fragments):
+    """Sigue `path` (nombres GraphQL) dentro de la selección, p. ej. ('edges', 'node')."""
+    for name in path:
+        graphql_type = get_named_type(graphql_type)
+        if name not in getattr(graphql_type, 'fields', {}):
+            return None, []
+        field_nodes = [
+            node for field_node in field_nodes
+            for node in _field_nodes(field_node.selection_set, fragments)
+            if node.name.value == name
+        ]
+        graphql_type = graphql_type.fields[name].type
+    return graphql_type, field_nodes
+
+
+def query_plan(info, path=()):
+    """
+    QueryPlan de la selección del campo que se está resolviendo, o None.
+
+    `path` permite planear una selección anidada, como los nodos de una
+    conexión Relay: query_plan(info, path=('edges', 'node')).
+    """
+    graphql_type, field_nodes = _descend(info.return_type, info.field_nodes, path, info.fragments)
+    graphene_type = _django_type(graphql_type)
+    if graphene_type is None:
+        return None
+    return _build_plan(graphene_type, graphql_type, field_nodes, info.fragments)
+
+
+def optimize(queryset, info, path=()):
+    """Aplica only/select_related/prefetch_related según la selección de `info`."""
+    plan = query_plan(info, path)
+    if plan is None or plan.model is not queryset.model:
+        return queryset
+    return plan.apply(queryset)
+
+
+def selected_fields(info):
+    """Nombres GraphQL seleccionados directamente bajo el campo que se está resolviendo."""
+    return {
+        node.name.value
+        for field_node in info.field_nodes
+        for node in _field_nodes(field_node.selection_set, info.fragments)
+    }
@@ -0,0 +1,121 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.db.models import F, Field, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from graphene import relay
+from graphql import GraphQLError
+from .optimizer import query_plan, selected_fields
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class Row(Func):
+    """Constructor de fila de SQL, `(a, b)`, para comparar llaves compuestas."""
+    template = '(%(expressions)s)'
+    output_field = Field()
+
+
+def encode_cursor(obj, ordering):
+    values = [getattr(obj, name) for name in ordering]
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError(cursor)
+        return [model._meta.get_field(name).to_python(v) for name, v in zip(ordering, values)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        raise GraphQLError(f'Cursor inválido: {cursor}')
+
+
+def seek(queryset, ordering, cursor, lookup):
+    """Filtra las filas posteriores (GreaterThan) o anteriores (LessThan) a `cursor`."""
+    values = decode_cursor(cursor, queryset.model, ordering)
+    return queryset.filter(lookup(
+        Row(*(F(name) for name in ordering)), Row(*(Value(v) for v in values))
+    ))
+
+
+def keyset_page(queryset, ordering, first=None, after=None, last=None, before=None):
+    """
+    Devuelve (objetos, hay_siguiente, hay_anterior) de una página por llave.
+
+    En lugar de OFFSET, la página empieza con una comparación de filas sobre
+    `ordering` (p. ej. `(time_create, id) > (%s, %s)`), que el índice
+    compuesto resuelve sin recorrer las filas anteriores: el costo no depende
+    de qué tan lejos esté la página. Se lee una fila de más para saber si hay
+    otra página.
+    """
+    if first is not None and last is not None:
+        raise GraphQLError('Use first o last, no ambos')
+    size = first if last is None else last
+    size = DEFAULT_PAGE_SIZE if size is None else size
+    if not 0 <= size <= MAX_PAGE_SIZE:
+        raise GraphQLError(f'El tamaño de página debe estar entre 0 y {MAX_PAGE_SIZE}')
+
+    if after:
+        queryset = seek(queryset, ordering, after, GreaterThan)
+    if before:
+        queryset = seek(queryset, ordering, before, LessThan)
+
+    if last is None:
+        objects = list(queryset.order_by(*ordering)[:size + 1])
+        return objects[:size], len(objects) > size, bool(after)
+    objects = list(queryset.order_by(*(f'-{name}' for name in ordering))[:size + 1])
+    return objects[:size][::-1], bool(before), len(objects) > size
+
+
+def estimated_count(queryset):
+    """
+    Total estimado por el planificador de PostgreSQL (EXPLAIN, sin ejecutar).
+
+    Usa las estadísticas de la tabla (ANALYZE/autovacuum), así que es
+    aproximado pero no recorre las filas como COUNT(*).
+    """
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def keyset_connection(connection_type, queryset, info, ordering,
+                      first=None, after=None, last=None, before=None):
+    """
+    Construye una conexión Relay paginada por llave sobre `queryset`.
+
+    Los nodos se cargan con el plan del optimizador para `edges.node`. El
+    conteo exacto (totalCount) solo se calcula si la consulta lo pide.
+    """
+    selected = selected_fields(info)
+    total_count = queryset.count() if 'totalCount' in selected else None
+    estimate = estimated_count(queryset) if 'estimatedCount' in selected else None
+
+    nodes = queryset
+    plan = query_plan(info, path=('edges', 'node'))
+    if plan is not None and plan.model is queryset.model:
+        # El cursor necesita las columnas del orden
+        plan.only.update(ordering)
+        nodes = plan.apply(queryset)
+    objects, has_next_page, has_previous_page = keyset_page(
+        nodes, ordering, first=first, after=after, last=last, before=before
+    )
+
+    edges = [
+        connection_type.Edge(node=obj, cursor=encode_cursor(obj, ordering)) for obj in objects
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=relay.PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_next_page=has_next_page,
+            has_previous_page=has_previous_page,
+        ),
+        total_count=total_count,
+        estimated_count=estimate,
+    )
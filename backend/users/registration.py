@@ -0,0 +1,322 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Lower
+from .availability import record_registrations
+from .hashing import make_passwords
+from .models import (
+    UserDocument, ContactInfo, Country, TypeDocument,
+    address_validator, email_identity, phone_validator,
+)
+from .verification import enqueue_verification, enqueue_verifications
+
+# Tamaño de lote para las consultas IN (...) y los bulk_create
+BATCH_SIZE = 1000
+
+EMAIL_TAKEN = 'El email ya está registrado'
+USERNAME_TAKEN = 'El nombre de usuario ya está registrado'
+DOCUMENT_TYPE_MISSING = 'El tipo de documento no existe'
+COUNTRY_MISSING = 'El país no existe'
+DOCUMENT_TAKEN = 'El documento ya está registrado'
+
+# Fragmentos del nombre de las restricciones de PostgreSQL y el mensaje que
+# corresponde a cada una. El orden importa: la restricción única de documento
+# también contiene "type_document_id".
+CONSTRAINT_MESSAGES = [
+    ('_email_', EMAIL_TAKEN),
+    ('_username_', USERNAME_TAKEN),
+    ('_type_document_id_document_', DOCUMENT_TAKEN),
+    ('_type_document_id_', DOCUMENT_TYPE_MISSING),
+    ('_country_id_', COUNTRY_MISSING),
+]
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def validate_contact_fields(data):
+    """Valida el formato de la dirección y los teléfonos de un registro."""
+    address_validator(data.get('address'))
+    phone_validator(data.get('phone'))
+    phone_validator(data.get('cel_phone'))
+    phone_validator(data.get('emergency_phone'))
+
+
+def _conflicts_query(email, username, type_document_id, country_id, document):
+    User = get_user_model()
+
+    def flag(queryset, name):
+        return queryset.values_list(Value(name, output_field=CharField()))
+
+    return flag(User.objects.filter(email__lower=email_identity(email)), 'email').union(
+        flag(User.objects.filter(username=username), 'username'),
+        flag(TypeDocument.objects.filter(id=type_document_id), 'type_document'),
+        flag(Country.objects.filter(id=country_id), 'country'),
+        flag(UserDocument.objects.filter(type_document_id=type_document_id, document=document), 'document'),
+    )
+
+
+def _first_conflict(found):
+    if 'email' in found:
+        return EMAIL_TAKEN
+    if 'username' in found:
+        return USERNAME_TAKEN
+    if 'type_document' not in found:
+        return DOCUMENT_TYPE_MISSING
+    if 'country' not in found:
+        return COUNTRY_MISSING
+    if 'document' in found:
+        return DOCUMENT_TAKEN
+    return None
+
+
+def find_registration_conflict(email, username, type_document_id, country_id, document):
+    """
+    Verifica en una sola consulta (UNION) las condiciones previas del registro.
+
+    Devuelve el mensaje de error correspondiente al primer conflicto
+    encontrado, o None si el registro puede continuar.
+    """
+    conflicts = _conflicts_query(email, username, type_document_id, country_id, document)
+    return _first_conflict({name for (name,) in conflicts})
+
+
+async def afind_registration_conflict(email, username, type_document_id, country_id, document):
+    """Versión asíncrona de `find_registration_conflict`."""
+    conflicts = _conflicts_query(email, username, type_document_id, country_id, document)
+    return _first_conflict({name async for (name,) in conflicts})
+
+
+def create_registration(data, password_hash):
+    """
+    Crea el usuario, su documento, su información de contacto y el trabajo
+    que envía el correo de verificación, en una sola transacción.
+
+    Recibe la contraseña ya hasheada para que el hash, que es costoso, pueda
+    calcularse fuera de la transacción (o en otro hilo).
+    """
+    if not data.get('email'):
+        raise ValueError('El Email es obligatorio')
+    User = get_user_model()
+
+    with transaction.atomic():
+        # Crear usuario
+        user = User.objects.create(
+            email=User.objects.normalize_email(data.get('email')),
+            username=data.get('username'),
+            password=password_hash,
+            last_name=data.get('last_name'),
+            name=data.get('name'),
+            is_militar=data.get('is_militar')
+        )
+
+        # Crear documento de usuario
+        UserDocument.objects.create(
+            user=user,
+            type_document_id=data.get('document_type'),
+            document=data.get('document_number'),
+            place_expedition=data.get('document_expedition_place'),
+            date_expedition=data.get('document_expedition_date')
+        )
+
+        # Crear información de contacto
+        ContactInfo.objects.create(
+            user=user,
+            country_id=data.get('country'),
+            address=data.get('address'),
+            city=data.get('city'),
+            phone=data.get('phone'),
+            cel_phone=data.get('cel_phone'),
+            emergency_name=data.get('emergency_name'),
+            emergency_phone=data.get('emergency_phone')
+        )
+
+        # El correo de verificación sale de la cola de trabajos, no de esta solicitud
+        enqueue_verification(user)
+        record_registrations([
+            (user.email, user.username, int(data.get('document_type')), data.get('document_number'))
+        ])
+
+    return user
+
+
+def integrity_error_message(error):
+    """Traduce una violación de restricción al mensaje de validación existente."""
+    diag = getattr(error.__cause__, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None) or str(error)
+    for fragment, message in CONSTRAINT_MESSAGES:
+        if fragment in constraint:
+            return message
+    return str(error)
+
+
+def _existing(queryset, field, values):
+    """Devuelve el subconjunto de `values` que ya existe en la columna `field`."""
+    found = set()
+    for chunk in _chunks(set(values)):
+        found.update(queryset.filter(**{f'{field}__in': chunk}).values_list(field, flat=True))
+    return found
+
+
+def _existing_emails(emails):
+    """Devuelve las identidades (`email_identity`) de `emails` ya registradas."""
+    queryset = get_user_model().objects
+    found = set()
+    for chunk in _chunks({email_identity(email) for email in emails}):
+        found.update(queryset.filter(email__lower__in=chunk).values_list(Lower('email'), flat=True))
+    return found
+
+
+def _existing_documents(pairs):
+    """Devuelve los pares (tipo de documento, número) ya registrados."""
+    found = set()
+    for chunk in _chunks({document for _, document in pairs}):
+        found.update(
+            UserDocument.objects.filter(document__in=chunk)
+            .values_list('type_document_id', 'document')
+        )
+    return found & set(pairs)
+
+
+def validate_registrations(inputs):
+    """
+    Valida un lote de registros con las reglas de RegisterUser, sin escribir.
+
+    Las unicidades y las llaves foráneas se verifican con unas pocas consultas
+    IN (...) para todo el lote. Devuelve (errores, válidas): `errores` es un
+    dict {índice: mensaje} y `válidas` una lista de tuplas
+    (índice, datos, email normalizado) en el orden de `inputs`.
+    """
+    User = get_user_model()
+    errors = {}
+    rows = []
+
+    # Validaciones de formato, fila por fila
+    for index, data in enumerate(inputs):
+        try:
+            if not data.get('email'):
+                raise ValidationError('El Email es obligatorio')
+            validate_contact_fields(data)
+            document_key = (int(data.get('document_type')), data.get('document_number'))
+            country_id = int(data.get('country'))
+        except ValidationError as e:
+            errors[index] = ' '.join(e.messages)
+            continue
+        except (TypeError, ValueError) as e:
+            errors[index] = str(e)
+            continue
+        email = User.objects.normalize_email(data.get('email'))
+        rows.append((index, data, email, document_key, country_id))
+
+    # Validaciones contra la base de datos, por conjuntos
+    existing_emails = _existing_emails(row[2] for row in rows)
+    existing_usernames = _existing(User.objects, 'username', [row[1].get('username') for row in rows])
+    existing_document_types = _existing(TypeDocument.objects, 'id', [row[3][0] for row in rows])
+    existing_countries = _existing(Country.objects, 'id', [row[4] for row in rows])
+    existing_documents = _existing_documents([row[3] for row in rows])
+
+    # Las filas repetidas dentro del mismo lote también son duplicados
+    seen_emails, seen_usernames, seen_documents = set(), set(), set()
+    valid_rows = []
+    for index, data, email, document_key, country_id in rows:
+        if email_identity(email) in existing_emails or email_identity(email) in seen_emails:
+            message = EMAIL_TAKEN
+        elif data.get('username') in existing_usernames or data.get('username') in seen_usernames:
+            message = USERNAME_TAKEN
+        elif document_key[0] not in existing_document_types:
+            message = DOCUMENT_TYPE_MISSING
+        elif country_id not in existing_countries:
+            message = COUNTRY_MISSING
+        elif document_key in existing_documents or document_key in seen_documents:
+            message = DOCUMENT_TAKEN
+        else:
+            message = None
+
+        if message:
+            errors[index] = message
+            continue
+        seen_emails.add(email_identity(email))
+        seen_usernames.add(data.get('username'))
+        seen_documents.add(document_key)
+        valid_rows.append((index, data, email))
+
+    return errors, valid_rows
+
+
+def bulk_register_users(inputs):
+    """
+    Registra un lote de usuarios con validaciones por conjuntos.
+
+    Valida con `validate_registrations` e inserta las filas válidas con
+    bulk_create dentro de una única transacción. Devuelve una lista de tuplas
+    (usuario, mensaje de error) en el mismo orden de `inputs`.
+    """
+    User = get_user_model()
+    errors, valid_rows = validate_registrations(inputs)
+    results = [(None, errors[index]) if index in errors else None for index in range(len(inputs))]
+
+    users = [
+        User(
+            email=email,
+            username=data.get('username'),
+            password=password_hash,
+            last_name=data.get('last_name'),
+            name=data.get('name'),
+            is_militar=data.get('is_militar'),
+        )
+        for (_, data, email), password_hash in zip(
+            valid_rows, make_passwords(data.get('password') for _, data, _ in valid_rows)
+        )
+    ]
+
+    try:
+        with transaction.atomic():
+            # En PostgreSQL bulk_create devuelve las llaves primarias generadas
+            User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+            UserDocument.objects.bulk_create(
+                [
+                    UserDocument(
+                        user=user,
+                        type_document_id=data.get('document_type'),
+                        document=data.get('document_number'),
+                        place_expedition=data.get('document_expedition_place'),
+                        date_expedition=data.get('document_expedition_date'),
+                    )
+                    for user, (_, data, _) in zip(users, valid_rows)
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            ContactInfo.objects.bulk_create(
+                [
+                    ContactInfo(
+                        user=user,
+                        country_id=data.get('country'),
+                        address=data.get('address'),
+                        city=data.get('city'),
+                        phone=data.get('phone'),
+                        cel_phone=data.get('cel_phone'),
+                        emergency_name=data.get('emergency_name'),
+                        emergency_phone=data.get('emergency_phone'),
+                    )
+                    for user, (_, data, _) in zip(users, valid_rows)
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            enqueue_verifications(users)
+            record_registrations(
+                (email, data.get('username'), int(data.get('document_type')), data.get('document_number'))
+                for _, data, email in valid_rows
+            )
+    except IntegrityError as e:
+        # Un registro concurrente ganó la carrera: el lote completo se revierte
+        for index, _, _ in valid_rows:
+            results[index] = (None, integrity_error_message(e))
+        return results
+
+    for user, (index, _, _) in zip(users, valid_rows):
+        results[index] = (user, None)
+    return results
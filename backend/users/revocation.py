@@ -0,0 +1,251 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .bloom import BloomFilter
+
+# Filas que se vuelven a leer en cada sincronización: una revocación puede
+# confirmarse después de otra con un id mayor
+SYNC_OVERLAP = 100
+
+
+def token_key(jti):
+    return f't:{jti}'
+
+
+def user_key(user_id):
+    return f'u:{user_id}'
+
+
+class RevocationBackend:
+    """
+    Almacén compartido y autoritativo de revocaciones.
+
+    Guarda un registro de llaves (`t:<jti>` para un token, `u:<id>` para
+    todos los tokens de un usuario) con su generación y expiración.
+    """
+
+    def add(self, key, generation=0, expires_at=None):
+        raise NotImplementedError
+
+    def generation(self, key):
+        """Generación más alta registrada para `key`, o None si no está."""
+        raise NotImplementedError
+
+    def changes_since(self, cursor):
+        """Devuelve ([(llave, generación)] registradas después de `cursor`, nuevo cursor)."""
+        raise NotImplementedError
+
+    def purge(self, now):
+        """Borra las revocaciones de tokens que ya expiraron."""
+
+
+class DatabaseRevocationBackend(RevocationBackend):
+    """
+    Revocaciones en la base de datos principal (modelo TokenRevocation).
+
+    Siempre se lee de la principal, aunque haya una réplica configurada: una
+    réplica atrasada devolvería generaciones viejas.
+    """
+
+    def __init__(self, **options):
+        from .models import TokenRevocation
+        self.model = TokenRevocation
+
+    @property
+    def objects(self):
+        return self.model.objects.using(DEFAULT_DB_ALIAS)
+
+    def add(self, key, generation=0, expires_at=None):
+        self.objects.create(key=key, generation=generation, expires_at=expires_at)
+
+    def generation(self, key):
+        return self.objects.filter(key=key).aggregate(generation=Max('generation'))['generation']
+
+    def changes_since(self, cursor):
+        rows = list(
+            self.objects.filter(pk__gt=cursor).order_by('pk').values_list('pk', 'key', 'generation')
+        )
+        return [(key, generation) for _, key, generation in rows], max([cursor] + [row[0] for row in rows])
+
+    def purge(self, now):
+        self.objects.filter(expires_at__lt=now).delete()
+
+
+class SQLiteRevocationBackend(RevocationBackend):
+    """
+    Revocaciones en un archivo SQLite, compartido por los procesos de una
+    misma máquina. Sirve para pruebas y desarrollo sin otra infraestructura.
+    """
+
+    def __init__(self, PATH, **options):
+        self.path = PATH
+        with closing(self._connect()) as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS revocation ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' key TEXT NOT NULL,'
+                ' generation INTEGER NOT NULL DEFAULT 0,'
+                ' expires_at REAL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS revocation_key ON revocation (key)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def add(self, key, generation=0, expires_at=None):
+        with closing(self._connect()) as db:
+            db.execute(
+                'INSERT INTO revocation (key, generation, expires_at) VALUES (?, ?, ?)',
+                (key, generation, expires_at.timestamp() if expires_at else None)
+            )
+
+    def generation(self, key):
+        with closing(self._connect()) as db:
+            return db.execute('SELECT MAX(generation) FROM revocation WHERE key = ?', (key,)).fetchone()[0]
+
+    def changes_since(self, cursor):
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                'SELECT id, key, generation FROM revocation WHERE id > ? ORDER BY id', (cursor,)
+            ).fetchall()
+        return [(key, generation) for _, key, generation in rows], max([cursor] + [row[0] for row in rows])
+
+    def purge(self, now):
+        with closing(self._connect()) as db:
+            db.execute('DELETE FROM revocation WHERE expires_at < ?', (now.timestamp(),))
+
+
+class RevocationStore:
+    """
+    Verifica si un token está revocado sin E/S en el caso común.
+
+    Cada proceso mantiene un filtro de Bloom con los tokens revocados y un
+    diccionario con la generación vigente de cada usuario revocado. Un token
+    cuyo `jti` no está en el filtro no está revocado, y eso se responde en
+    memoria; solo los positivos (revocaciones reales o falsos positivos,
+    ~ERROR_RATE) se confirman contra el backend compartido. La generación
+    del usuario siempre se compara en memoria: un usuario revocado una vez
+    no vuelve a costar una consulta por solicitud. Ambos se ponen al día con
+    el backend a lo sumo una vez cada SYNC_INTERVAL segundos, así que una
+    revocación hecha en otro proceso tarda como máximo eso en aplicarse; en
+    el proceso que la hace es inmediata.
+
+    Las revocaciones de tokens expirados no se borran aquí: el comando
+    `purge_token_revocations` lo hace periódicamente.
+    """
+
+    def __init__(self, backend, capacity=100000, error_rate=0.001, sync_interval=5):
+        self.backend = backend
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._filter = None
+        self._user_generations = {}
+        self._cursor = 0
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._filter is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._filter is not None and now - self._synced_at < self.sync_interval:
+                return
+            if self._filter is None or self._filter.saturated:
+                changes, cursor = self.backend.changes_since(0)
+                bloom = BloomFilter(max(self.capacity, 2 * len(changes)), self.error_rate)
+                generations = {}
+            else:
+                changes, cursor = self.backend.changes_since(max(0, self._cursor - SYNC_OVERLAP))
+                bloom, generations = self._filter, dict(self._user_generations)
+            for key, generation in changes:
+                if key.startswith('u:'):
+                    generations[key] = max(generations.get(key, 0), generation)
+                else:
+                    bloom.add(key)
+            self._filter, self._user_generations = bloom, generations
+            self._cursor, self._synced_at = cursor, now
+
+    def _might_be_revoked(self, key):
+        self._sync()
+        return key in self._filter
+
+    def is_revoked(self, payload):
+        jti = payload.get('jti')
+        if jti and self._might_be_revoked(token_key(jti)):
+            if self.backend.generation(token_key(jti)) is not None:
+                return True
+        user_id = payload.get('user_id')
+        return user_id is not None and payload.get('gen', 0) < self.user_generation(user_id)
+
+    def user_generation(self, user_id):
+        self._sync()
+        return self._user_generations.get(user_key(user_id), 0)
+
+    def issue_generation(self, user_id):
+        """
+        Generación para un token nuevo, leída del backend: con la copia local,
+        un login poco después de una revocación hecha en otro proceso recibiría
+        la generación vieja y el token quedaría revocado en la siguiente
+        sincronización.
+        """
+        key = user_key(user_id)
+        generation = self.backend.generation(key) or 0
+        with self._lock:
+            if generation > self._user_generations.get(key, 0):
+                self._user_generations = {**self._user_generations, key: generation}
+        return generation
+
+    def revoke_token(self, payload):
+        """Revoca un token hasta su expiración (logout)."""
+        key = token_key(payload['jti'])
+        self.backend.add(key, expires_at=datetime.fromtimestamp(payload['exp'], timezone.utc))
+        self._sync()
+        self._filter.add(key)
+
+    def revoke_user(self, user_id):
+        """Revoca todos los tokens emitidos hasta ahora para el usuario."""
+        key = user_key(user_id)
+        generation = (self.backend.generation(key) or 0) + 1
+        self.backend.add(key, generation=generation)
+        self._sync()
+        with self._lock:
+            self._user_generations = {**self._user_generations, key: generation}
+        return generation
+
+    def purge(self):
+        """Borra del backend las revocaciones de tokens que ya expiraron."""
+        self.backend.purge(datetime.now(timezone.utc))
+
+
+_store = None
+
+
+def get_revocation_store():
+    global _store
+    if _store is None:
+        config = getattr(settings, 'TOKEN_REVOCATION', {})
+        backend = import_string(config.get('BACKEND', 'users.revocation.DatabaseRevocationBackend'))
+        _store = RevocationStore(
+            backend(**config.get('OPTIONS', {})),
+            capacity=config.get('CAPACITY', 100000),
+            error_rate=config.get('ERROR_RATE', 0.001),
+            sync_interval=config.get('SYNC_INTERVAL', 5),
+        )
+    return _store
+
+
+@receiver(setting_changed)
+def reset_revocation_store(setting, **kwargs):
+    global _store
+    if setting == 'TOKEN_REVOCATION':
+        _store = None
@@ -1,12 +1,32 @@
 import graphene
+from graphene import relay
 from graphene_django import DjangoObjectType
 from django.contrib.auth import get_user_model
 from .models import UserDocument, ContactInfo, Country, TypeDocument
 import graphql_jwt
-from graphql_jwt.decorators import login_required
+from graphql_jwt.decorators import login_required, staff_member_required
 from django.core.exceptions import ValidationError
-from django.core.validators import RegexValidator
-import bcrypt
+from django.db import IntegrityError
+from graphql import GraphQLError
+from graphql_jwt.utils import get_credentials, get_payload
+from asgiref.sync import sync_to_async
+from .auth import aget_user, get_user
+from .availability import get_availability_index
+from .cache import (
+    get_countries, get_country, get_document_type, get_document_types,
+    aget_countries, aget_country, aget_document_type, aget_document_types,
+)
+from .hashing import amake_password, make_password
+from .loaders import batched, get_loaders, load_related, load_reverse
+from .optimizer import hints, optimize
+from .pagination import keyset_connection
+from .search import MAX_SEARCH_LIMIT, search_users
+from .revocation import get_revocation_store
+from .verification import verify_email
+from .registration import (
+    bulk_register_users, create_registration, find_registration_conflict,
+    afind_registration_conflict, integrity_error_message, validate_contact_fields,
+)
 
 # Types
 class CountryType(DjangoObjectType):
@@ -20,21 +40,78 @@ class TypeDocumentType(DjangoObjectType):
         fields = '__all__'
 
 class UserType(DjangoObjectType):
+    documents = graphene.List(graphene.NonNull(lambda: UserDocumentType))
+    contacts = graphene.List(graphene.NonNull(lambda: ContactInfoType))
+
     class Meta:
         model = get_user_model()
         fields = ('id', 'email', 'username', 'last_name', 'name', 'is_active', 
                  'is_temporal', 'is_militar', 'time_create', 'email_verified')
 
+    # Las relaciones se cargan en lote con los DataLoaders de la solicitud
+    # (ver users/loaders.py), salvo que el optimizador ya las haya precargado
+    # (ver users/optimizer.py)
+    @staticmethod
+    @batched
+    @hints(prefetch_related='userdocument_set')
+    def resolve_documents(root, info):
+        return load_reverse(root, 'userdocument_set', get_loaders(info).documents_by_user, info)
+
+    @staticmethod
+    @batched
+    @hints(prefetch_related='contactinfo_set')
+    def resolve_contacts(root, info):
+        return load_reverse(root, 'contactinfo_set', get_loaders(info).contacts_by_user, info)
+
 class UserDocumentType(DjangoObjectType):
     class Meta:
         model = UserDocument
         fields = '__all__'
 
+    @staticmethod
+    @batched
+    def resolve_user(root, info):
+        return load_related(root, 'user', get_loaders(info).user, info)
+
+    @staticmethod
+    @batched
+    def resolve_type_document(root, info):
+        return load_related(root, 'type_document', get_loaders(info).type_document, info)
+
 class ContactInfoType(DjangoObjectType):
     class Meta:
         model = ContactInfo
         fields = '__all__'
 
+    @staticmethod
+    @batched
+    def resolve_user(root, info):
+        return load_related(root, 'user', get_loaders(info).user, info)
+
+    @staticmethod
+    @batched
+    def resolve_country(root, info):
+        return load_related(root, 'country', get_loaders(info).country, info)
+
+class UserConnection(relay.Connection):
+    total_count = graphene.Int(description='Total exacto (COUNT); solo se calcula si se pide')
+    estimated_count = graphene.Int(description='Total estimado por el planificador, sin COUNT')
+
+    class Meta:
+        node = UserType
+
+class BulkRegistrationResultType(graphene.ObjectType):
+    index = graphene.Int()
+    user = graphene.Field(UserType)
+    success = graphene.Boolean()
+    message = graphene.String()
+
+class AvailabilityType(graphene.ObjectType):
+    # True si el valor está libre; null si no se consultó
+    email = graphene.Boolean()
+    username = graphene.Boolean()
+    document = graphene.Boolean()
+
 # Inputs
 class UserRegistrationInput(graphene.InputObjectType):
     email = graphene.String(required=True)
@@ -130,88 +207,160 @@ class RegisterUser(graphene.Mutation):
     success = graphene.Boolean()
     message = graphene.String()
 
-    @staticmethod
-    def mutate(root, info, input):
+    @classmethod
+    def mutate(cls, root, info, input):
         try:
-            # Validaciones de campos específicos
-            address_validator = RegexValidator(
-                regex=r'^[a-zA-Z0-9\s\-N*]+$',
-                message='La dirección solo puede contener letras, números, espacios y los caracteres - N *'
-            )
-            phone_validator = RegexValidator(
-                regex=r'^\d+$',
-                message='El número de teléfono debe contener solo dígitos'
-            )
-
             # Validar formato de dirección y teléfonos
-            address_validator(input.address)
-            phone_validator(input.phone)
-            phone_validator(input.cel_phone)
-            phone_validator(input.emergency_phone)
-
-            # Validar si el usuario ya existe
-            User = get_user_model()
-            if User.objects.filter(email=input.email).exists():
-                raise ValidationError('El email ya está registrado')
-            if User.objects.filter(username=input.username).exists():
-                raise ValidationError('El nombre de usuario ya está registrado')
-
-            # Validar si existe el tipo de documento
-            if not TypeDocument.objects.filter(id=input.document_type).exists():
-                raise ValidationError('El tipo de documento no existe')
-
-            # Validar si existe el país
-            if not Country.objects.filter(id=input.country).exists():
-                raise ValidationError('El país no existe')
-
-            # Crear usuario
-            user = User.objects.create_user(
-                email=input.email,
-                username=input.username,
-                password=input.password,
-                last_name=input.last_name,
-                name=input.name,
-                is_militar=input.is_militar
-            )
+            validate_contact_fields(input)
 
-            # Crear documento de usuario
-            UserDocument.objects.create(
-                user=user,
-                type_document_id=input.document_type,
-                document=input.document_number,
-                place_expedition=input.document_expedition_place,
-                date_expedition=input.document_expedition_date
-            )
+            # Validar unicidad y llaves foráneas en una sola consulta
+            conflict = find_registration_conflict(**cls.conflict_arguments(input))
+            if conflict:
+                raise ValidationError(conflict)
 
-            # Crear información de contacto
-            ContactInfo.objects.create(
+            # Crear usuario, documento e información de contacto
+            user = create_registration(input, make_password(input.password))
+
+            return cls(
                 user=user,
-                country_id=input.country,
-                address=input.address,
-                city=input.city,
-                phone=input.phone,
-                cel_phone=input.cel_phone,
-                emergency_name=input.emergency_name,
-                emergency_phone=input.emergency_phone
+                success=True,
+                message='Usuario registrado exitosamente'
             )
+        except Exception as e:
+            return cls.failure(e)
 
-            return RegisterUser(
+    @staticmethod
+    def conflict_arguments(input):
+        return {
+            'email': get_user_model().objects.normalize_email(input.email),
+            'username': input.username,
+            'type_document_id': input.document_type,
+            'country_id': input.country,
+            'document': input.document_number,
+        }
+
+    @classmethod
+    def failure(cls, error):
+        if isinstance(error, ValidationError):
+            message = ' '.join(error.messages)
+        elif isinstance(error, IntegrityError):
+            # Un registro concurrente pasó la verificación previa
+            message = integrity_error_message(error)
+        else:
+            message = str(error)
+        return cls(success=False, message=message)
+
+class AsyncRegisterUser(RegisterUser):
+    """RegisterUser para el esquema asíncrono: ORM asíncrono y hash en el pool de hilos."""
+
+    class Meta:
+        name = 'RegisterUser'
+
+    @classmethod
+    async def mutate(cls, root, info, input):
+        try:
+            validate_contact_fields(input)
+
+            conflict = await afind_registration_conflict(**cls.conflict_arguments(input))
+            if conflict:
+                raise ValidationError(conflict)
+
+            password_hash = await amake_password(input.password)
+            user = await sync_to_async(create_registration)(input, password_hash)
+
+            return cls(
                 user=user,
                 success=True,
                 message='Usuario registrado exitosamente'
             )
+        except Exception as e:
+            return cls.failure(e)
 
-        except ValidationError as e:
-            return RegisterUser(
-                success=False,
-                message=str(e)
+class BulkRegisterUsers(graphene.Mutation):
+    class Arguments:
+        inputs = graphene.List(graphene.NonNull(UserRegistrationInput), required=True)
+
+    results = graphene.List(BulkRegistrationResultType)
+    created = graphene.Int()
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    @staticmethod
+    def mutate(root, info, inputs):
+        try:
+            results = [
+                BulkRegistrationResultType(
+                    index=index,
+                    user=user,
+                    success=error is None,
+                    message=error or 'Usuario registrado exitosamente'
+                )
+                for index, (user, error) in enumerate(bulk_register_users(inputs))
+            ]
+            get_loaders(info).prepare_users(result.user for result in results)
+            created = sum(1 for result in results if result.success)
+
+            return BulkRegisterUsers(
+                results=results,
+                created=created,
+                success=created == len(results),
+                message=f'{created} de {len(results)} usuarios registrados exitosamente'
             )
         except Exception as e:
-            return RegisterUser(
+            return BulkRegisterUsers(
+                created=0,
                 success=False,
                 message=str(e)
             )
 
+class Logout(graphene.Mutation):
+    class Arguments:
+        all_sessions = graphene.Boolean(default_value=False)
+
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, all_sessions):
+        payload = get_payload(get_credentials(info.context), info.context)
+        store = get_revocation_store()
+        # Los tokens sin jti solo se pueden revocar junto con los demás
+        if all_sessions or 'jti' not in payload:
+            store.revoke_user(info.context.user.pk)
+        else:
+            store.revoke_token(payload)
+        return Logout(success=True, message="Sesión cerrada exitosamente")
+
+class RevokeUserTokens(graphene.Mutation):
+    class Arguments:
+        user_id = graphene.ID(required=True)
+
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    @staticmethod
+    @staff_member_required
+    def mutate(root, info, user_id):
+        if not get_user_model().objects.filter(pk=user_id).exists():
+            return RevokeUserTokens(success=False, message=f"No existe un usuario con el id: {user_id}")
+        get_revocation_store().revoke_user(int(user_id))
+        return RevokeUserTokens(success=True, message="Tokens del usuario revocados exitosamente")
+
+class VerifyEmail(graphene.Mutation):
+    class Arguments:
+        token = graphene.String(required=True)
+
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    @staticmethod
+    def mutate(root, info, token):
+        error = verify_email(token)
+        if error:
+            return VerifyEmail(success=False, message=error)
+        return VerifyEmail(success=True, message="Correo electrónico verificado exitosamente")
+
 # Query
 class Query(graphene.ObjectType):
     me = graphene.Field(UserType)
@@ -219,36 +368,136 @@ class Query(graphene.ObjectType):
     all_document_types = graphene.List(TypeDocumentType)
     country_by_id = graphene.Field(CountryType, id=graphene.ID(required=True))
     document_type_by_id = graphene.Field(TypeDocumentType, id=graphene.ID(required=True))
-
+    all_users = graphene.Field(
+        UserConnection,
+        first=graphene.Int(),
+        after=graphene.String(),
+        last=graphene.Int(),
+        before=graphene.String(),
+        is_active=graphene.Boolean(),
+        is_temporal=graphene.Boolean(),
+        is_militar=graphene.Boolean(),
+        email_verified=graphene.Boolean(),
+    )
+    search_users = graphene.List(
+        graphene.NonNull(UserType),
+        term=graphene.String(required=True),
+        limit=graphene.Int(default_value=20),
+        description=(
+            'Usuarios cuyo nombre, apellido, número de documento o ciudad empieza por las palabras '
+            'de `term`, sin distinguir mayúsculas ni tildes. No tolera errores de escritura.'
+        ),
+    )
+    check_availability = graphene.Field(
+        AvailabilityType,
+        email=graphene.String(),
+        username=graphene.String(),
+        document_type=graphene.ID(),
+        document=graphene.String(),
+    )
+
+    # El usuario se sirve desde la caché de usuarios (ver users/auth.py)
     @login_required
     def resolve_me(self, info):
-        return info.context.user
-
+        user = get_user(info.context.user)
+        get_loaders(info).user.prime(user.pk, user)
+        return user
+
+    # Directorio de usuarios paginado por llave sobre (time_create, id)
+    # (ver users/pagination.py)
+    @staff_member_required
+    def resolve_all_users(self, info, first=None, after=None, last=None, before=None, **filters):
+        queryset = get_user_model().objects.filter(
+            **{name: value for name, value in filters.items() if value is not None}
+        )
+        connection = keyset_connection(
+            UserConnection, queryset, info, ('time_create', 'id'),
+            first=first, after=after, last=last, before=before
+        )
+        get_loaders(info).prepare_users(edge.node for edge in connection.edges)
+        return connection
+
+    # Búsqueda por nombre, documento o ciudad con índices (ver users/search.py)
+    @staff_member_required
+    def resolve_search_users(self, info, term, limit):
+        if len(term.strip()) < 2:
+            raise GraphQLError('El término de búsqueda debe tener al menos 2 caracteres')
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise GraphQLError(f'El límite debe estar entre 1 y {MAX_SEARCH_LIMIT}')
+        users = search_users(term, limit, optimize(get_user_model().objects.all(), info))
+        get_loaders(info).prepare_users(users)
+        return users
+
+    # Verificación en vivo del formulario de registro: los valores libres se
+    # descartan en memoria con un filtro de Bloom (ver users/availability.py)
+    def resolve_check_availability(self, info, email=None, username=None, document_type=None, document=None):
+        index = get_availability_index()
+        result = AvailabilityType()
+        if email:
+            result.email = index.email_available(email)
+        if username:
+            result.username = index.username_available(username)
+        if document_type and document:
+            try:
+                document_type = int(document_type)
+            except ValueError:
+                raise GraphQLError(f'Tipo de documento inválido: {document_type}')
+            result.document = index.document_available(document_type, document)
+        return result
+
+    # Los datos de referencia se sirven desde la caché (ver users/cache.py)
     def resolve_all_countries(self, info):
-        return Country.objects.all()
+        return get_countries()
 
     def resolve_all_document_types(self, info):
-        return TypeDocument.objects.all()
+        return get_document_types()
 
     def resolve_country_by_id(self, info, id):
-        try:
-            return Country.objects.get(pk=id)
-        except Country.DoesNotExist:
-            return None
+        return get_country(id)
 
     def resolve_document_type_by_id(self, info, id):
-        try:
-            return TypeDocument.objects.get(pk=id)
-        except TypeDocument.DoesNotExist:
-            return None
+        return get_document_type(id)
 
 # Mutation
 class Mutation(graphene.ObjectType):
     create_type_document = CreateTypeDocument.Field()
     create_country = CreateCountry.Field()
     register_user = RegisterUser.Field()
+    bulk_register_users = BulkRegisterUsers.Field()
     token_auth = graphql_jwt.ObtainJSONWebToken.Field()
     verify_token = graphql_jwt.Verify.Field()
     refresh_token = graphql_jwt.Refresh.Field()
+    logout = Logout.Field()
+    revoke_user_tokens = RevokeUserTokens.Field()
+    verify_email = VerifyEmail.Field()
+
+# Versiones asíncronas usadas por AsyncGraphQLView (ver singularity/views.py)
+class AsyncQuery(Query):
+    class Meta:
+        name = 'Query'
+
+    @login_required
+    async def resolve_me(self, info):
+        user = await aget_user(info.context.user)
+        get_loaders(info).user.prime(user.pk, user)
+        return user
+
+    async def resolve_all_countries(self, info):
+        return await aget_countries()
+
+    async def resolve_all_document_types(self, info):
+        return await aget_document_types()
+
+    async def resolve_country_by_id(self, info, id):
+        return await aget_country(id)
+
+    async def resolve_document_type_by_id(self, info, id):
+        return await aget_document_type(id)
+
+class AsyncMutation(Mutation):
+    class Meta:
+        name = 'Mutation'
+
+    register_user = AsyncRegisterUser.Field()
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, FloatField, Subquery, Value, When
+from .models import AppUser, ContactInfo, UserDocument, city_search_key, fold_text, name_search_vector
+
+MAX_SEARCH_LIMIT = 50
+# Coincidencias por nombre que se ordenan por relevancia. Un término común
+# ('maria') coincide con una fracción grande de la tabla y ts_rank debe
+# recalcular el tsvector de cada fila; se ordena solo una muestra acotada.
+NAME_CANDIDATES = 500
+
+# Puntaje por fuente: un documento exacto pesa más que uno por prefijo, y
+# ambos más que el nombre; la ciudad solo desempata.
+DOCUMENT_EXACT_SCORE = 3.0
+DOCUMENT_PREFIX_SCORE = 2.0
+NAME_SCORE = 1.0
+CITY_SCORE = 0.5
+
+
+def name_query(term):
+    """tsquery de prefijos: 'jose per' coincide con 'José Pérez'."""
+    words = re.findall(r'\w+', fold_text(term))
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config='simple')
+
+
+def _name_matches(term, limit):
+    query = name_query(term)
+    if query is None:
+        return []
+    candidates = (
+        AppUser.objects
+        .annotate(search=name_search_vector())
+        .filter(search=query)
+        .values('pk')[:NAME_CANDIDATES]
+    )
+    return (
+        AppUser.objects
+        .filter(pk__in=Subquery(candidates))
+        .annotate(rank=SearchRank(name_search_vector(), query) + NAME_SCORE)
+        .order_by('-rank', 'pk')
+        .values_list('pk', 'rank')[:limit]
+    )
+
+
+def _document_matches(term, limit):
+    document = re.sub(r'\s', '', term)
+    if not document:
+        return []
+    return (
+        UserDocument.objects
+        .filter(document__startswith=document)
+        .annotate(rank=Case(
+            When(document=document, then=Value(DOCUMENT_EXACT_SCORE)),
+            default=Value(DOCUMENT_PREFIX_SCORE),
+            output_field=FloatField(),
+        ))
+        .order_by('-rank')
+        .values_list('user_id', 'rank')[:limit]
+    )
+
+
+def _city_matches(term, limit):
+    city = fold_text(term.strip())
+    if not city:
+        return []
+    return (
+        ContactInfo.objects
+        .annotate(folded_city=city_search_key())
+        .filter(folded_city__startswith=city)
+        .values_list('user_id', Value(CITY_SCORE))[:limit]
+    )
+
+
+def search_user_ids(term, limit):
+    """
+    Ids de usuarios que coinciden con `term`, del más al menos relevante.
+
+    Cada fuente (nombre y apellido, número de documento, ciudad) es una
+    consulta acotada que resuelve su propio índice (ver la migración 0004);
+    unirlas con OR en una sola consulta obligaría a recorrer AppUser_TB. Los
+    puntajes de un usuario en varias fuentes se suman.
+
+    Las coincidencias son por prefijo, sin distinguir mayúsculas ni las
+    tildes de ACCENTED; no toleran errores de escritura ('perz' no encuentra
+    'Pérez'), que requerirían pg_trgm.
+    """
+    scores = {}
+    for matches in (_name_matches, _document_matches, _city_matches):
+        for user_id, score in matches(term, limit):
+            scores[user_id] = scores.get(user_id, 0) + score
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [user_id for user_id, _ in ranked[:limit]]
+
+
+def search_users(term, limit, queryset=None):
+    """Usuarios que coinciden con `term`, en orden de relevancia."""
+    ids = search_user_ids(term, limit)
+    if not ids:
+        return []
+    queryset = AppUser.objects.all() if queryset is None else queryset
+    users = queryset.in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
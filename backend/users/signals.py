@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .cache import reference_cache, user_cache
+from .models import AppUser, Country, TypeDocument
+from .revocation import get_revocation_store
+
+
+@receiver([post_save, post_delete], sender=Country)
+@receiver([post_save, post_delete], sender=TypeDocument)
+def invalidate_reference_data(sender, **kwargs):
+    reference_cache.invalidate_on_commit()
+
+
+@receiver([post_save, post_delete], sender=AppUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate_on_commit(instance.pk)
+
+
+@receiver(post_init, sender=AppUser)
+def remember_is_active(sender, instance, **kwargs):
+    # Valor cargado de is_active; None si el campo quedó diferido (sin
+    # consultarlo), y entonces se asume que podía estar activo
+    instance._was_active = instance.__dict__.get('is_active')
+
+
+@receiver(post_save, sender=AppUser)
+def revoke_user_tokens(sender, instance, created, update_fields, **kwargs):
+    # Desactivar al usuario o cambiar su contraseña invalida sus tokens; guardar
+    # de nuevo un usuario que ya estaba inactivo no vuelve a revocarlos
+    deactivated = (
+        instance._was_active is not False and not instance.is_active
+        and (update_fields is None or 'is_active' in update_fields)
+    )
+    if not created and (deactivated or instance._password is not None):
+        get_revocation_store().revoke_user(instance.pk)
+    instance._was_active = instance.is_active
@@ -0,0 +1,160 @@
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from graphql_jwt.shortcuts import get_token
+from ..cache import reference_cache
+from ..models import AppUser, Country, TypeDocument
+from singularity.views import AsyncGraphQLView
+
+urlpatterns = [
+    path('graphql/', csrf_exempt(AsyncGraphQLView.as_view())),
+]
+
+
+@override_settings(ROOT_URLCONF='users.tests.test_async')
+class AsyncGraphQLViewTests(TestCase):
+    """Pruebas para la vista GraphQL asíncrona (ASGI)"""
+
+    def setUp(self):
+        reference_cache.clear()
+        self.country = Country.objects.create(
+            country_code="CO",
+            country_name="Colombia"
+        )
+        self.doc_type = TypeDocument.objects.create(
+            name_type_document="Cédula de Ciudadanía"
+        )
+
+    async def _post(self, query, variables=None, headers=None):
+        response = await self.async_client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}),
+            content_type='application/json', headers=headers
+        )
+        return response.json()
+
+    async def test_reference_data_queries(self):
+        result = await self._post('''
+            query($id: ID!) {
+                allCountries { countryName }
+                allDocumentTypes { nameTypeDocument }
+                countryById(id: $id) { countryCode }
+            }
+        ''', {'id': str(self.country.id)})
+        self.assertIsNone(result.get('errors'))
+        self.assertEqual(result['data']['allCountries'][0]['countryName'], "Colombia")
+        self.assertEqual(result['data']['allDocumentTypes'][0]['nameTypeDocument'], "Cédula de Ciudadanía")
+        self.assertEqual(result['data']['countryById']['countryCode'], "CO")
+
+    async def test_register_user(self):
+        result = await self._post('''
+            mutation($input: UserRegistrationInput!) {
+                registerUser(input: $input) {
+                    success message
+                    user {
+                        email
+                        documents { document typeDocument { nameTypeDocument } }
+                        contacts { user { email } country { countryName } }
+                    }
+                }
+            }
+        ''', {'input': {
+            "email": "async@example.com",
+            "username": "async_user",
+            "password": "testpass123",
+            "lastName": "User",
+            "name": "Test",
+            "isMilitar": False,
+            "documentType": str(self.doc_type.id),
+            "documentNumber": "1234567890",
+            "documentExpeditionPlace": "Bogotá",
+            "documentExpeditionDate": "2020-01-01",
+            "country": str(self.country.id),
+            "address": "Calle 123 N 45-67",
+            "city": "Bogotá",
+            "phone": "1234567",
+            "celPhone": "3001234567",
+            "emergencyName": "Emergency Contact",
+            "emergencyPhone": "3009876543"
+        }})
+        self.assertTrue(result['data']['registerUser']['success'], result)
+        registered = result['data']['registerUser']['user']
+        self.assertEqual(
+            registered['documents'],
+            [{'document': '1234567890', 'typeDocument': {'nameTypeDocument': 'Cédula de Ciudadanía'}}]
+        )
+        self.assertEqual(
+            registered['contacts'],
+            [{'user': {'email': 'async@example.com'}, 'country': {'countryName': 'Colombia'}}]
+        )
+        user = await AppUser.objects.aget(email="async@example.com")
+        self.assertTrue(await user.userdocument_set.aexists())
+        self.assertTrue(user.check_password("testpass123"))
+
+    def _savepoints(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            result = async_to_sync(self._post)(query)
+        self.assertIsNone(result.get('errors'))
+        return [query['sql'] for query in queries if query['sql'].startswith('SAVEPOINT')]
+
+    def test_atomic_mutations(self):
+        mutation = 'mutation { createCountry(countryCode: "%s", countryName: "País") { success } }'
+        # Dentro de TestCase, transaction.atomic abre un savepoint
+        self.assertEqual(self._savepoints(mutation % 'PE'), [])
+        with mock.patch.dict(connection.settings_dict, {'ATOMIC_MUTATIONS': True}):
+            self.assertEqual(len(self._savepoints(mutation % 'EC')), 1)
+            self.assertEqual(self._savepoints('{ allCountries { id } }'), [])
+        self.assertTrue(Country.objects.filter(country_code='EC').exists())
+
+    async def test_sync_mutation_runs_in_thread(self):
+        result = await self._post(
+            'mutation { createCountry(countryCode: "PE", countryName: "Perú") { success country { countryName } } }'
+        )
+        self.assertTrue(result['data']['createCountry']['success'])
+        self.assertEqual(await Country.objects.acount(), 2)
+
+    async def test_me_with_token(self):
+        user = await AppUser.objects.acreate(
+            email="me@example.com", username="me", name="Me", last_name="User"
+        )
+        token = await sync_to_async(get_token)(user)
+        result = await self._post('{ me { email } }', headers={'Authorization': f'JWT {token}'})
+        self.assertIsNone(result.get("errors"), result)
+        self.assertEqual(result['data']['me']['email'], "me@example.com")
+
+    async def test_me_requires_authentication(self):
+        result = await self._post('{ me { email } }')
+        self.assertIsNotNone(result.get('errors'))
+
+    async def test_all_users_connection(self):
+        staff = await AppUser.objects.acreate(
+            email="staff@example.com", username="staff", name="Staff", last_name="User", is_staff=True
+        )
+        token = await sync_to_async(get_token)(staff)
+        result = await self._post(
+            '{ allUsers(first: 5) { estimatedCount edges { node { email documents { document } } } } }',
+            headers={'Authorization': f'JWT {token}'}
+        )
+        self.assertIsNone(result.get("errors"), result)
+        edges = result['data']['allUsers']['edges']
+        self.assertEqual([edge['node']['email'] for edge in edges], ["staff@example.com"])
+        self.assertEqual(edges[0]['node']['documents'], [])
+
+    @override_settings(GRAPHQL_QUERY_COST={'MAX_DEPTH': 3})
+    async def test_query_budget(self):
+        result = await self._post('{ me { documents { user { email } } } }')
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'QUERY_TOO_DEEP')
+
+    @override_settings(GRAPHQL_INSTRUMENTATION={'DEBUG_TOKEN': 'secreto'})
+    async def test_timing_extensions(self):
+        await sync_to_async(reference_cache.clear)()
+        result = await self._post(
+            '{ allCountries { countryName } }', headers={'X-GraphQL-Debug': 'secreto'}
+        )
+        timing = result['extensions']['timing']
+        self.assertEqual(timing['sql']['count'], 1)
+        self.assertIn('Query.allCountries', [resolver['field'] for resolver in timing['resolvers']])
@@ -0,0 +1,92 @@
+import json
+from django.test import TestCase, override_settings
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_token
+from graphql_jwt.utils import jwt_encode, jwt_payload
+from ..auth import TokenUser
+from ..cache import reference_cache, user_cache
+from ..models import AppUser, Country
+
+
+class TokenAuthenticationTests(TestCase):
+    """Pruebas para la autenticación JWT sin consultas por solicitud"""
+
+    def setUp(self):
+        user_cache.clear()
+        reference_cache.clear()
+        Country.objects.create(country_code='CO', country_name='Colombia')
+        self.user = AppUser.objects.create_user(
+            email='token@example.com',
+            username='token',
+            password='testpass123',
+            name='Token',
+            last_name='User'
+        )
+        # Emitir un token consulta la generación del usuario: se hace fuera de
+        # las consultas medidas en las pruebas
+        self.token = get_token(self.user)
+
+    def _post(self, query, token=None):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query}), content_type='application/json',
+            HTTP_AUTHORIZATION=f'JWT {token or self.token}'
+        ).json()
+
+    def test_token_includes_user_id(self):
+        payload = jwt_settings.JWT_DECODE_HANDLER(get_token(self.user))
+        self.assertEqual(payload['user_id'], self.user.pk)
+
+    def test_me_is_served_from_the_user_cache(self):
+        token = get_token(self.user)
+        with self.assertNumQueries(1):
+            result = self._post('{ me { email name } }', token)
+        self.assertEqual(result['data']['me']['email'], 'token@example.com')
+        with self.assertNumQueries(0):
+            result = self._post('{ me { email name } }', token)
+        self.assertEqual(result['data']['me']['name'], 'Token')
+
+    def test_fields_that_do_not_need_the_user_do_not_load_it(self):
+        self._post('{ allCountries { id } }')
+        with self.assertNumQueries(0):
+            result = self._post('{ allCountries { countryName } }')
+        self.assertEqual(result['data']['allCountries'][0]['countryName'], 'Colombia')
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        self._post('{ me { name } }')
+        self.user.name = 'Renamed'
+        self.user.save()
+        self.assertEqual(self._post('{ me { name } }')['data']['me']['name'], 'Renamed')
+
+    def test_disabled_users_are_rejected(self):
+        token = get_token(self.user)
+        AppUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        result = self._post('{ me { email } }', token)
+        self.assertEqual(result['errors'][0]['message'], 'User is disabled')
+
+        # Con el usuario en caché se rechaza al autenticar
+        self.user.is_active = False
+        user_cache._store(self.user)
+        result = self._post('{ me { email } }', token)
+        self.assertEqual(result['errors'][0]['message'], 'User is disabled')
+
+    @override_settings(USER_CACHE={'TIMEOUT': 0})
+    def test_cache_can_be_disabled(self):
+        self._post('{ me { email } }')
+        with self.assertNumQueries(1):
+            self._post('{ me { email } }')
+
+    def test_tokens_without_user_id_are_still_accepted(self):
+        payload = jwt_payload(self.user)
+        self.assertNotIn('user_id', payload)
+        result = self._post('{ me { email } }', jwt_encode(payload))
+        self.assertEqual(result['data']['me']['email'], 'token@example.com')
+
+    def test_token_user_loads_lazily(self):
+        principal = TokenUser(self.user.pk, self.user.email)
+        self.assertTrue(principal.is_authenticated)
+        with self.assertNumQueries(0):
+            self.assertEqual(principal.pk, self.user.pk)
+            self.assertEqual(principal, self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(principal.username, 'token')
+            self.assertFalse(principal.is_staff)
@@ -0,0 +1,79 @@
+from django.test import TestCase, override_settings
+from graphene.test import Client
+from singularity.schema import schema
+from ..availability import AvailabilityIndex, get_availability_index
+from ..models import AppUser, Country, TypeDocument, UserDocument
+from ..registration import create_registration
+
+
+@override_settings(AVAILABILITY_INDEX={'SYNC_INTERVAL': 60})
+class AvailabilityTests(TestCase):
+    """Pruebas para la verificación de disponibilidad con filtro de Bloom"""
+
+    query = '''
+        query ($email: String, $username: String, $documentType: ID, $document: String) {
+            checkAvailability(email: $email, username: $username, documentType: $documentType, document: $document) {
+                email username document
+            }
+        }
+    '''
+
+    def setUp(self):
+        self.country = Country.objects.create(country_code='CO', country_name='Colombia')
+        self.doc_type = TypeDocument.objects.create(name_type_document='Cédula')
+        self.user = AppUser.objects.create_user(
+            email='ana@example.com', username='ana', password='clave', last_name='Pérez', name='Ana'
+        )
+        UserDocument.objects.create(
+            user=self.user, type_document=self.doc_type, document='123',
+            place_expedition='Bogotá', date_expedition='2015-06-01',
+        )
+        self.index = get_availability_index()
+        self.index.rebuild()
+
+    def _check(self, **variables):
+        result = Client(schema).execute(self.query, variables=variables)
+        self.assertNotIn('errors', result)
+        return result['data']['checkAvailability']
+
+    def test_free_values_do_not_query_the_database(self):
+        with self.assertNumQueries(0):
+            result = self._check(
+                email='nueva@example.com', username='nueva', documentType=str(self.doc_type.id), document='999'
+            )
+        self.assertEqual(result, {'email': True, 'username': True, 'document': True})
+
+    def test_taken_values_are_confirmed_by_index(self):
+        with self.assertNumQueries(3):
+            result = self._check(
+                email='ANA@example.com', username='ana', documentType=str(self.doc_type.id), document='123'
+            )
+        self.assertEqual(result, {'email': False, 'username': False, 'document': False})
+        # Solo se responde lo que se pregunta
+        self.assertEqual(self._check(username='otra'), {'email': None, 'username': True, 'document': None})
+
+    def test_registration_updates_the_filter(self):
+        data = {
+            'email': 'luis@example.com', 'username': 'luis', 'last_name': 'Ruiz', 'name': 'Luis',
+            'is_militar': False, 'document_type': str(self.doc_type.id), 'document_number': '456',
+            'document_expedition_place': 'Cali', 'document_expedition_date': '2016-01-01',
+            'country': self.country.id, 'address': 'Calle 2', 'city': 'Cali', 'phone': '602',
+            'cel_phone': '301', 'emergency_name': 'Eva', 'emergency_phone': '301',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            create_registration(data, '!')
+        self.assertFalse(self.index.username_available('luis'))
+        self.assertFalse(self.index.document_available(self.doc_type.id, '456'))
+
+    def test_resync_picks_up_registrations_from_other_processes(self):
+        index = AvailabilityIndex(sync_interval=0)
+        index.rebuild()
+        AppUser.objects.create_user(
+            email='eva@example.com', username='eva', password='clave', last_name='Ruiz', name='Eva'
+        )
+        self.assertFalse(index.email_available('eva@example.com'))
+        self.assertTrue(index.email_available('otra@example.com'))
+
+    def test_invalid_document_type(self):
+        result = Client(schema).execute(self.query, variables={'documentType': 'x', 'document': '1'})
+        self.assertIn('Tipo de documento inválido', result['errors'][0]['message'])
@@ -0,0 +1,123 @@
+import json
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from graphql_jwt.shortcuts import get_token
+from ..cache import reference_cache, user_cache
+from ..models import AppUser, Country, TypeDocument, UserDocument
+from singularity.views import AsyncGraphQLView
+
+urlpatterns = [
+    path('graphql/batch/', csrf_exempt(AsyncGraphQLView.as_view(batch=True))),
+]
+
+ALL_COUNTRIES = '{ allCountries { countryCode } }'
+CREATE_COUNTRY = 'mutation { createCountry(countryCode: "PE", countryName: "Perú") { success } }'
+ME_DOCUMENTS = '{ me { email documents { document } } }'
+
+
+class BatchTestMixin:
+    def setUp(self):
+        reference_cache.clear()
+        user_cache.clear()
+        Country.objects.create(country_code='CO', country_name='Colombia')
+        self.user = AppUser.objects.create_user(
+            email='ana@example.com', username='ana', password='clave', last_name='Pérez', name='Ana'
+        )
+        UserDocument.objects.create(
+            user=self.user, type_document=TypeDocument.objects.create(name_type_document='Cédula'),
+            document='123', place_expedition='Bogotá', date_expedition='2015-06-01',
+        )
+
+    def _body(self, operations):
+        return json.dumps([
+            {'id': str(index), 'query': query} if isinstance(query, str) else query
+            for index, query in enumerate(operations)
+        ])
+
+
+class BatchGraphQLViewTests(BatchTestMixin, TestCase):
+    """Pruebas para el endpoint GraphQL por lotes (vista síncrona)"""
+
+    def _post(self, operations, **extra):
+        return self.client.post('/graphql/batch/', self._body(operations), content_type='application/json', **extra)
+
+    def test_operations_run_in_order_with_their_own_errors(self):
+        response = self._post([ALL_COUNTRIES, '{ me { email } }', CREATE_COUNTRY, ALL_COUNTRIES, {'id': 'x'}])
+        results = response.json()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['id'] for result in results], ['0', '1', '2', '3', 'x'])
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 200, 400])
+        self.assertEqual(results[0]['data'], {'allCountries': [{'countryCode': 'CO'}]})
+        self.assertEqual(results[1]['data'], {'me': None})
+        self.assertEqual(len(results[1]['errors']), 1)
+        self.assertEqual(results[2]['data'], {'createCountry': {'success': True}})
+        # La consulta posterior a la mutación ve lo que esta escribió
+        self.assertEqual(results[3]['data'], {'allCountries': [{'countryCode': 'CO'}, {'countryCode': 'PE'}]})
+        self.assertEqual(results[4]['errors'][0]['message'], 'Must provide query string.')
+
+    def test_operations_share_authentication_and_loaders(self):
+        token = get_token(self.user)
+        with CaptureQueriesContext(connection) as single:
+            self._post([ME_DOCUMENTS], HTTP_AUTHORIZATION=f'JWT {token}')
+        user_cache.clear()
+        with CaptureQueriesContext(connection) as batch:
+            results = self._post([ME_DOCUMENTS, ME_DOCUMENTS], HTTP_AUTHORIZATION=f'JWT {token}').json()
+        expected = {'me': {'email': 'ana@example.com', 'documents': [{'document': '123'}]}}
+        self.assertEqual([result['data'] for result in results], [expected, expected])
+        self.assertEqual(len(batch), len(single))
+
+    @override_settings(GRAPHQL_BATCH={'MAX_OPERATIONS': 2})
+    def test_batch_size_is_capped(self):
+        response = self._post([ALL_COUNTRIES] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 2 operations', response.json()['errors'][0]['message'])
+
+    def test_invalid_batches(self):
+        response = self.client.post('/graphql/batch/', json.dumps({'query': ALL_COUNTRIES}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/graphql/batch/', json.dumps(['{ x }']), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/graphql/batch/', {'query': ALL_COUNTRIES}).status_code, 405)
+
+
+@override_settings(ROOT_URLCONF='users.tests.test_batch')
+class AsyncBatchGraphQLViewTests(BatchTestMixin, TestCase):
+    """Pruebas para el endpoint GraphQL por lotes (vista asíncrona)"""
+
+    async def _post(self, operations, **headers):
+        response = await self.async_client.post(
+            '/graphql/batch/', self._body(operations), content_type='application/json', headers=headers
+        )
+        return response.json()
+
+    def test_mutations_split_concurrent_groups(self):
+        view = AsyncGraphQLView(batch=True)
+        operations = [{'query': query} for query in (ALL_COUNTRIES, ME_DOCUMENTS, CREATE_COUNTRY, ALL_COUNTRIES, '{')]
+        groups = view.batch_groups(RequestFactory().post('/graphql/batch/'), operations)
+        self.assertEqual([(mutation, len(entries)) for mutation, entries in groups], [(False, 2), (True, 1), (False, 2)])
+
+    async def test_operations_run_in_order_with_their_own_errors(self):
+        results = await self._post([ALL_COUNTRIES, CREATE_COUNTRY, ALL_COUNTRIES, '{ me { email } }', {'id': 'x'}])
+        self.assertEqual([result['id'] for result in results], ['0', '1', '2', '3', 'x'])
+        self.assertEqual(results[0]['data'], {'allCountries': [{'countryCode': 'CO'}]})
+        self.assertEqual(results[1]['data'], {'createCountry': {'success': True}})
+        self.assertEqual(results[2]['data'], {'allCountries': [{'countryCode': 'CO'}, {'countryCode': 'PE'}]})
+        self.assertEqual(results[3]['data'], {'me': None})
+        self.assertEqual(results[4]['status'], 400)
+
+    @override_settings(GRAPHQL_INSTRUMENTATION={'DEBUG_TOKEN': 'secreto'})
+    async def test_concurrent_queries_share_loaders(self):
+        token = await sync_to_async(get_token)(self.user)
+        headers = {'Authorization': f'JWT {token}', 'X-GraphQL-Debug': 'secreto'}
+        # La primera solicitud deja al usuario en la caché
+        await self._post([ME_DOCUMENTS], **headers)
+        results = await self._post([ME_DOCUMENTS, ME_DOCUMENTS, ME_DOCUMENTS], **headers)
+        expected = {'me': {'email': 'ana@example.com', 'documents': [{'document': '123'}]}}
+        self.assertEqual([result['data'] for result in results], [expected] * 3)
+        # Cada operación cuenta sus propias consultas: los documentos se cargan
+        # una sola vez para las tres
+        self.assertEqual(sum(result['extensions']['timing']['sql']['count'] for result in results), 1)
@@ -0,0 +1,119 @@
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from graphene.test import Client
+from ..cache import VERSION_SEQUENCE, LRUCache, reference_cache
+from ..models import Country, TypeDocument
+from singularity.schema import schema
+
+
+class ReferenceDataCacheTests(TestCase):
+    """Pruebas para la caché de países y tipos de documento"""
+
+    query = '''
+        query {
+            allCountries { id countryName }
+            allDocumentTypes { id nameTypeDocument }
+        }
+    '''
+
+    def setUp(self):
+        reference_cache.clear()
+        self.client = Client(schema)
+        self.country = Country.objects.create(
+            country_code="CO",
+            country_name="Colombia"
+        )
+        self.doc_type = TypeDocument.objects.create(
+            name_type_document="Cédula de Ciudadanía"
+        )
+
+    def _bump_version(self):
+        # Lo que hace invalidate() en otro worker
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT nextval('{VERSION_SEQUENCE}')")
+            return cursor.fetchone()[0]
+
+    def test_reference_data_is_served_from_cache(self):
+        self.client.execute(self.query)
+        with self.assertNumQueries(0):
+            response = self.client.execute(self.query)
+        self.assertEqual(response['data']['allCountries'][0]['countryName'], "Colombia")
+
+    def test_lookup_by_id_uses_cache(self):
+        self.client.execute(self.query)
+        with self.assertNumQueries(0):
+            response = self.client.execute(
+                'query($id: ID!) { countryById(id: $id) { countryName } }',
+                variables={"id": str(self.country.id)}
+            )
+        self.assertEqual(response['data']['countryById']['countryName'], "Colombia")
+
+    def test_mutation_invalidates_cache(self):
+        self.client.execute(self.query)
+        self.client.execute(
+            'mutation { createCountry(countryCode: "PE", countryName: "Perú") { success } }'
+        )
+        response = self.client.execute(self.query)
+        self.assertEqual(len(response['data']['allCountries']), 2)
+
+    def test_delete_invalidates_cache(self):
+        self.client.execute(self.query)
+        self.doc_type.delete()
+        response = self.client.execute(self.query)
+        self.assertEqual(response['data']['allDocumentTypes'], [])
+
+    @override_settings(REFERENCE_DATA_CACHE={'VERSION_CHECK_INTERVAL': 0})
+    def test_version_bump_from_another_worker_invalidates_local_entries(self):
+        self.client.execute(self.query)
+        # Otro worker invalida la caché incrementando la versión en la base
+        Country.objects.filter(pk=self.country.pk).update(country_name="República de Colombia")
+        self._bump_version()
+        response = self.client.execute(self.query)
+        self.assertEqual(response['data']['allCountries'][0]['countryName'], "República de Colombia")
+
+    @override_settings(REFERENCE_DATA_CACHE={'VERSION_CHECK_INTERVAL': 60})
+    def test_version_is_checked_once_per_interval(self):
+        self.client.execute(self.query)
+        version = self._bump_version()
+        with self.assertNumQueries(0):
+            self.client.execute(self.query)
+        self.assertEqual(reference_cache.version(refresh=True), version)
+
+    @override_settings(REFERENCE_DATA_CACHE={'LOCAL_TIMEOUT': -1})
+    def test_local_entries_expire(self):
+        self.client.execute(self.query)
+        # Sin invalidación (p. ej. un UPDATE directo) la entrada vence sola
+        Country.objects.filter(pk=self.country.pk).update(country_name="República de Colombia")
+        response = self.client.execute(self.query)
+        self.assertEqual(response['data']['allCountries'][0]['countryName'], "República de Colombia")
+
+    def test_rolled_back_version_is_not_reused(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            reference_cache.invalidate()
+            rolled_back = reference_cache.version()
+            raise RuntimeError
+        reference_cache.invalidate()
+        self.assertGreater(reference_cache.version(), rolled_back)
+
+    @override_settings(REFERENCE_DATA_CACHE={'ALIAS': 'default'})
+    def test_shared_tier(self):
+        self.client.execute(self.query)
+        with self.assertNumQueries(0):
+            self.client.execute(self.query)
+        Country.objects.create(country_code="EC", country_name="Ecuador")
+        response = self.client.execute(self.query)
+        self.assertEqual(len(response['data']['allCountries']), 2)
+
+
+class LRUCacheTests(TestCase):
+    """Pruebas unitarias para el LRU en memoria"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
@@ -0,0 +1,86 @@
+import time
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase
+from singularity.pooled_postgresql.base import DatabaseWrapper, close_pools
+
+
+class PooledPostgresqlTests(TestCase):
+    """Pruebas para el backend de PostgreSQL con pool de conexiones"""
+
+    def setUp(self):
+        self.addCleanup(close_pools)
+
+    def wrapper(self, health_checks=True, **pool):
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'singularity.pooled_postgresql',
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': health_checks,
+            'OPTIONS': {'pool': {'min_size': 1, 'max_size': 2, 'timeout': 5, **pool}},
+        }
+        wrapper = DatabaseWrapper(settings_dict, 'pooled')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @staticmethod
+    def backend_pid(wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_closed_connection_is_reused(self):
+        # Con una sola conexión: psycopg_pool entrega primero la más antigua
+        wrapper = self.wrapper(max_size=1)
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        self.assertEqual(self.backend_pid(wrapper), pid)
+
+    def test_exhausted_pool_times_out(self):
+        first, second = self.wrapper(max_size=1, timeout=0.1), self.wrapper(max_size=1, timeout=0.1)
+        self.backend_pid(first)
+        with self.assertRaises(OperationalError):
+            self.backend_pid(second)
+        first.close()
+        self.backend_pid(second)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        wrapper = self.wrapper()
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_probe (id int)')
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pool_probe')")
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_broken_connection_is_discarded(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.connection.close()
+        wrapper.close()
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
+
+    def test_session_state_is_reset_on_return(self):
+        wrapper = self.wrapper(max_size=1)
+        pid = self.backend_pid(wrapper)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SET statement_timeout = '1234ms'")
+            cursor.execute('CREATE TEMPORARY TABLE pool_probe (id int)')
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid(), current_setting('statement_timeout'), to_regclass('pool_probe')")
+            self.assertEqual(cursor.fetchone(), (pid, '0', None))
+
+    def test_dead_idle_connection_is_replaced(self):
+        wrapper = self.wrapper()
+        pid = self.backend_pid(wrapper)
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+            for _ in range(50):
+                cursor.execute('SELECT 1 FROM pg_stat_activity WHERE pid = %s', [pid])
+                if cursor.fetchone() is None:
+                    break
+                time.sleep(0.02)
+        self.assertNotEqual(self.backend_pid(wrapper), pid)
@@ -0,0 +1,108 @@
+import json
+from importlib import import_module
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ..models import AppUser, Country, TypeDocument
+from ..registration import EMAIL_TAKEN, find_registration_conflict, validate_registrations
+
+email_migration = import_module('users.migrations.0008_email_case_insensitive')
+
+
+class EmailIdentityTests(TestCase):
+    """Pruebas para la identidad de email sin distinguir mayúsculas"""
+
+    def setUp(self):
+        self.user = AppUser.objects.create_user(
+            email='Ana.Perez@Example.com', username='ana', password='clave-segura', last_name='Pérez', name='Ana'
+        )
+        self.country = Country.objects.create(country_code='CO', country_name='Colombia')
+        self.doc_type = TypeDocument.objects.create(name_type_document='Cédula')
+
+    def _post(self, query, variables):
+        response = self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}), content_type='application/json'
+        )
+        return response.json()
+
+    def _token_auth(self, email):
+        return self._post(
+            'mutation ($email: String!, $password: String!) { tokenAuth(email: $email, password: $password) { token } }',
+            {'email': email, 'password': 'clave-segura'},
+        )
+
+    def _register(self, email):
+        return self._post(
+            'mutation ($input: UserRegistrationInput!) { registerUser(input: $input) { success message } }',
+            {'input': {
+                'email': email, 'username': 'otra', 'password': 'Clave-segura-1', 'lastName': 'Ruiz',
+                'name': 'Eva', 'isMilitar': False, 'documentType': str(self.doc_type.id),
+                'documentNumber': '777', 'documentExpeditionPlace': 'Cali',
+                'documentExpeditionDate': '2015-06-01', 'country': str(self.country.id),
+                'address': 'Calle 1', 'city': 'Cali', 'phone': '1', 'celPhone': '1',
+                'emergencyName': 'Ana', 'emergencyPhone': '1',
+            }},
+        )
+
+    def _assert_email_lookups_use_index(self, queries):
+        lookups = [query['sql'] for query in queries if 'LOWER("AppUser_TB"."email")' in query['sql']]
+        self.assertTrue(lookups)
+        with connection.cursor() as cursor:
+            # Con pocas filas el planificador prefiere recorrer la tabla; se
+            # desactiva para comprobar que la expresión coincide con el índice
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for sql in lookups:
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                self.assertIn('Index', plan)
+                self.assertIn('appuser_email_ci_uniq', plan)
+
+    def test_login_ignores_case(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self._token_auth('ANA.PEREZ@example.COM')
+        self.assertIsNone(result.get('errors'))
+        self.assertTrue(result['data']['tokenAuth']['token'])
+        self._assert_email_lookups_use_index(queries.captured_queries)
+
+    def test_registration_rejects_case_variants(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self._register('ana.perez@example.com')
+        self.assertEqual(result['data']['registerUser'], {'success': False, 'message': EMAIL_TAKEN})
+        self._assert_email_lookups_use_index(queries.captured_queries)
+        self.assertEqual(
+            find_registration_conflict('ANA.perez@example.com', 'otra', self.doc_type.id, self.country.id, '1'),
+            EMAIL_TAKEN,
+        )
+
+    def test_bulk_validation_rejects_case_variants(self):
+        row = {
+            'document_type': self.doc_type.id, 'country': self.country.id, 'address': 'Calle 1',
+            'phone': '1', 'cel_phone': '1', 'emergency_phone': '1',
+        }
+        with CaptureQueriesContext(connection) as queries:
+            errors, valid = validate_registrations([
+                dict(row, email='ANA.PEREZ@example.com', username='a1', document_number='1'),
+                dict(row, email='Eva@example.com', username='a2', document_number='2'),
+                dict(row, email='eva@EXAMPLE.com', username='a3', document_number='3'),
+            ])
+        self.assertEqual(errors, {0: EMAIL_TAKEN, 2: EMAIL_TAKEN})
+        self.assertEqual([index for index, _, _ in valid], [1])
+        self._assert_email_lookups_use_index(queries.captured_queries)
+
+    def test_database_rejects_case_variants(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AppUser.objects.create_user(
+                email='ANA.PEREZ@example.com', username='otra', password='x', last_name='R', name='E'
+            )
+
+    def test_migration_reports_collisions_in_batches(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX appuser_email_ci_uniq')
+        for email, username in (('ana.perez@example.com', 'a1'), ('eva@example.com', 'e1'), ('EVA@example.com', 'e2')):
+            AppUser.objects.create_user(email=email, username=username, password='x', last_name='R', name='E')
+        batches = list(email_migration.email_collisions(connection, '"AppUser_TB"', batch_size=1))
+        self.assertEqual(len(batches), 2)
+        identity, ids, emails = batches[0][0]
+        self.assertEqual(identity, 'ana.perez@example.com')
+        self.assertEqual(emails, ['Ana.Perez@example.com', 'ana.perez@example.com'])
+        self.assertEqual(batches[1][0][2], ['eva@example.com', 'EVA@example.com'])
@@ -0,0 +1,116 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from django.core.management import call_command
+from django.test import TestCase
+from graphql_jwt.shortcuts import get_token
+from ..exporter import UserExport
+from ..importer import FIELDS
+from ..models import AppUser, ContactInfo, Country, TypeDocument, UserDocument
+
+
+class ExportUsersTests(TestCase):
+    """Pruebas para el export de usuarios por streaming"""
+
+    def setUp(self):
+        country = Country.objects.create(country_code='CO', country_name='Colombia')
+        doc_type = TypeDocument.objects.create(name_type_document='Cédula')
+        for i in range(5):
+            user = AppUser.objects.create_user(
+                email=f'paciente{i}@example.com', username=f'paciente{i}', password='clave',
+                last_name='Pérez', name='Ana', is_militar=i == 0,
+            )
+            UserDocument.objects.create(
+                user=user, type_document=doc_type, document=f'{9000 + i}',
+                place_expedition='Bogotá', date_expedition='2015-06-01',
+            )
+            ContactInfo.objects.create(
+                user=user, country=country, address='Calle 1', city='Bogotá', phone='601',
+                cel_phone='300', emergency_name='Luis', emergency_phone='300',
+            )
+        # Sin documento ni contacto: sale igual, con esas columnas vacías
+        AppUser.objects.create_user(
+            email='sin.datos@example.com', username='sindatos', password='clave', last_name='Ruiz', name='Eva'
+        )
+        self.staff = AppUser.objects.create_user(
+            email='staff@example.com', username='staff', password='clave', last_name='Admin',
+            name='Admin', is_staff=True,
+        )
+
+    def test_csv_export_in_a_single_query(self):
+        export = UserExport('csv', compress=False, chunk_size=2)
+        with self.assertNumQueries(1):
+            content = b''.join(export).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(export.rows, 7)
+        self.assertEqual(len(rows), 7)
+        # Las columnas de import_users (menos la contraseña) permiten reimportar el archivo
+        self.assertTrue(set(FIELDS) - {'password'} <= set(rows[0]))
+        self.assertEqual(rows[0]['document_number'], '9000')
+        self.assertEqual(rows[0]['country'], 'CO')
+        self.assertEqual(rows[0]['is_militar'], 'True')
+        self.assertEqual(rows[5]['email'], 'sin.datos@example.com')
+        self.assertEqual(rows[5]['document_number'], '')
+
+    def test_one_row_per_user(self):
+        # Varios documentos y contactos: una sola fila, con los primeros
+        user = AppUser.objects.get(username='paciente2')
+        UserDocument.objects.create(
+            user=user, type_document=TypeDocument.objects.get(), document='1111',
+            place_expedition='Cali', date_expedition='2020-01-01',
+        )
+        ContactInfo.objects.create(
+            user=user, country=Country.objects.get(), address='Calle 2', city='Cali', phone='602',
+            cel_phone='301', emergency_name='Mía', emergency_phone='301',
+        )
+        rows = list(csv.DictReader(io.StringIO(b''.join(UserExport('csv', compress=False)).decode('utf-8'))))
+        self.assertEqual(len(rows), 7)
+        row, = [row for row in rows if row['email'] == 'paciente2@example.com']
+        self.assertEqual(row['document_number'], '9002')
+        self.assertEqual(row['city'], 'Bogotá')
+
+    def test_ndjson_gzip_export(self):
+        content = gzip.decompress(b''.join(UserExport('ndjson', chunk_size=3)))
+        rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1]['document_expedition_date'], '2015-06-01')
+        self.assertIs(rows[1]['is_militar'], False)
+        self.assertIsNone(rows[5]['city'])
+
+    def test_endpoint_requires_staff(self):
+        self.assertEqual(self.client.get('/users/export').status_code, 401)
+        self.assertEqual(
+            self.client.get('/users/export', HTTP_AUTHORIZATION='JWT no-es-un-token').status_code, 401
+        )
+        user = AppUser.objects.get(username='paciente1')
+        response = self.client.get('/users/export', HTTP_AUTHORIZATION=f'JWT {get_token(user)}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_endpoint_streams_gzip(self):
+        response = self.client.get(
+            '/users/export', {'format': 'ndjson'}, HTTP_AUTHORIZATION=f'JWT {get_token(self.staff)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('usuarios.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 7)
+
+        response = self.client.get(
+            '/users/export', {'format': 'xml'}, HTTP_AUTHORIZATION=f'JWT {get_token(self.staff)}'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'usuarios.csv.gz')
+        output = io.StringIO()
+        call_command('export_users', path, '--chunk-size', '2', stdout=output)
+        self.assertIn('7 filas exportadas', output.getvalue())
+        with gzip.open(path, 'rt', encoding='utf-8') as exported:
+            self.assertEqual(len(list(csv.DictReader(exported))), 7)
@@ -0,0 +1,108 @@
+import json
+import threading
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import TestCase, override_settings
+from ..hashing import PasswordHashingBusy, PasswordHashingService
+from ..models import AppUser
+
+
+class PasswordHashingServiceTests(TestCase):
+    """Pruebas para el pool acotado de hash de contraseñas"""
+
+    def setUp(self):
+        self.service = PasswordHashingService(workers=1, max_queue=0)
+        self.addCleanup(self.service.shutdown)
+
+    def test_full_queue_is_rejected_immediately(self):
+        release = threading.Event()
+        blocked = self.service.submit(release.wait, 5)
+        with self.assertRaises(PasswordHashingBusy):
+            self.service.make_password('clave-segura')
+        release.set()
+        blocked.result()
+        self.assertEqual(self.service.metrics.snapshot()['rejected'], 1)
+        self.assertEqual(self.service.in_flight, 0)
+
+    def test_metrics_record_queue_wait_and_hash_time(self):
+        encoded = self.service.make_password('clave-segura')
+        self.assertTrue(check_password('clave-segura', encoded))
+        metrics = self.service.metrics.snapshot()
+        self.assertEqual(metrics['count'], 1)
+        self.assertGreater(metrics['hash_time_avg'], 0)
+        self.assertGreaterEqual(metrics['queue_wait_max'], 0)
+
+    def test_batch_hashes_keep_input_order(self):
+        passwords = [f'clave-{i}' for i in range(4)]
+        hashes = self.service.make_passwords(passwords)
+        self.assertEqual(len(hashes), 4)
+        for password, encoded in zip(passwords, hashes):
+            self.assertTrue(check_password(password, encoded))
+
+
+class PasswordHashingLoginTests(TestCase):
+    """Pruebas del login a través del servicio de hash"""
+
+    mutation = '''
+        mutation($email: String!, $password: String!) {
+            tokenAuth(email: $email, password: $password) { token }
+        }
+    '''
+
+    def setUp(self):
+        self.user = AppUser.objects.create_user(
+            email='login@example.com',
+            username='login',
+            password='clave-segura',
+            name='Login',
+            last_name='User',
+            is_militar=False
+        )
+
+    def token_auth(self, password):
+        response = self.client.post(
+            '/graphql/',
+            json.dumps({
+                'query': self.mutation,
+                'variables': {'email': 'login@example.com', 'password': password},
+            }),
+            content_type='application/json',
+        )
+        return response.json()
+
+    def test_token_auth_verifies_through_service(self):
+        result = self.token_auth('clave-segura')
+        self.assertIsNone(result.get('errors'))
+        self.assertTrue(result['data']['tokenAuth']['token'])
+
+        result = self.token_auth('incorrecta')
+        self.assertIsNotNone(result.get('errors'))
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        AppUser.objects.filter(pk=self.user.pk).update(
+            password=make_password('clave-segura', hasher='pbkdf2_sha1')
+        )
+        user = AppUser.objects.get(pk=self.user.pk)
+        self.assertTrue(user.check_password('clave-segura'))
+        user.refresh_from_db()
+        self.assertFalse(user.password.startswith('pbkdf2_sha1$'))
+        self.assertTrue(user.check_password('clave-segura'))
+
+    @override_settings(PASSWORD_HASHER_WORK_FACTORS={'PBKDF2_ITERATIONS': 1000})
+    def test_token_auth_rehashes_with_new_work_factor(self):
+        self.user.set_password('clave-segura')
+        self.user.save()
+        with override_settings(PASSWORD_HASHER_WORK_FACTORS={'PBKDF2_ITERATIONS': 2000}):
+            self.assertTrue(self.token_auth('clave-segura')['data']['tokenAuth']['token'])
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_token_auth_rehashes_with_preferred_algorithm(self):
+        hashers = [
+            'users.hashers.BCryptSHA256PasswordHasher',
+            'users.hashers.PBKDF2PasswordHasher',
+        ]
+        with override_settings(PASSWORD_HASHERS=hashers, PASSWORD_HASHER_WORK_FACTORS={'BCRYPT_ROUNDS': 4}):
+            self.assertTrue(self.token_auth('clave-segura')['data']['tokenAuth']['token'])
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('bcrypt_sha256$'))
+            self.assertTrue(self.user.check_password('clave-segura'))
@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from ..availability import get_availability_index
+from ..hashing import PasswordHashingService
+from ..importer import FIELDS, RejectWriter, UserImporter, read_rows
+from ..models import AppUser, ContactInfo, Country, ImportCheckpoint, Job, TypeDocument, UserDocument
+from ..verification import SEND_VERIFICATION_EMAIL
+
+
+def patient(i, **overrides):
+    row = {
+        'email': f'Paciente{i}@Example.com',
+        'username': f'paciente{i}',
+        'password': f'clave-{i}',
+        'last_name': 'Pérez',
+        'name': 'Ana',
+        'is_militar': 'no',
+        'document_type': 'Cédula',
+        'document_number': f'{9000 + i}',
+        'document_expedition_place': 'Bogotá',
+        'document_expedition_date': '2015-06-01',
+        'country': 'CO',
+        'address': 'Calle 1 N 2-3',
+        'city': 'Bogotá',
+        'phone': '6011234567',
+        'cel_phone': '3001234567',
+        'emergency_name': 'Luis Pérez',
+        'emergency_phone': '3007654321',
+    }
+    row.update(overrides)
+    return row
+
+
+def as_csv(rows):
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    stream.seek(0)
+    return stream
+
+
+class ImportUsersTests(TestCase):
+    """Pruebas para la importación masiva de usuarios con COPY"""
+
+    def setUp(self):
+        self.country = Country.objects.create(country_code='CO', country_name='Colombia')
+        self.doc_type = TypeDocument.objects.create(name_type_document='Cédula')
+        self.hasher = PasswordHashingService(workers=2, max_queue=2)
+        self.addCleanup(self.hasher.shutdown)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _import(self, rows, format='csv', chunk_size=2, source='roster'):
+        rejects_path = os.path.join(self.directory, f'rejects.{format}')
+        rejects = RejectWriter(rejects_path, format)
+        importer = UserImporter(source, self.hasher, chunk_size)
+        result = importer.run(rows, rejects)
+        rejects.close()
+        with open(rejects_path, encoding='utf-8') as rejected:
+            return result, rejected.read()
+
+    def test_valid_rows_are_loaded_and_invalid_rows_rejected(self):
+        rows = [
+            patient(1),
+            patient(2, address='Calle #5'),
+            patient(3, country=str(self.country.id), document_type=str(self.doc_type.id), is_militar='sí'),
+            patient(4, email='PACIENTE1@example.com'),
+            patient(5, country='XX'),
+            patient(6, document_expedition_date='no es fecha'),
+            patient(7, password=''),
+        ]
+        (read, imported, rejected, _), rejects = self._import(read_rows(as_csv(rows), 'csv'))
+        self.assertEqual((read, imported, rejected), (7, 3, 4))
+
+        user = AppUser.objects.get(username='paciente3')
+        self.assertEqual(user.email, 'Paciente3@example.com')
+        self.assertTrue(user.is_militar)
+        self.assertTrue(user.check_password('clave-3'))
+        self.assertIsNotNone(user.time_create)
+        self.assertEqual(UserDocument.objects.get(user=user).document, '9003')
+        self.assertEqual(ContactInfo.objects.get(user=user).country, self.country)
+        self.assertFalse(AppUser.objects.get(username='paciente7').has_usable_password())
+
+        lines = {int(row['line']): row['error'] for row in csv.DictReader(io.StringIO(rejects))}
+        self.assertEqual(sorted(lines), [2, 4, 5, 6])
+        self.assertIn('La dirección solo puede contener', lines[2])
+        self.assertEqual(lines[4], 'El email ya está registrado')
+        self.assertEqual(lines[5], 'El país no existe')
+
+    def test_ndjson_with_invalid_lines(self):
+        stream = io.StringIO('\n'.join([
+            json.dumps(patient(1, is_militar=True)),
+            '{no es json',
+            json.dumps(patient(2, username='paciente1')),
+        ]))
+        (read, imported, rejected, _), rejects = self._import(read_rows(stream, 'ndjson'), 'ndjson')
+        self.assertEqual((read, imported, rejected), (3, 1, 2))
+        errors = [json.loads(line)['error'] for line in rejects.splitlines()]
+        self.assertTrue(errors[0].startswith('JSON inválido'))
+        self.assertEqual(errors[1], 'El nombre de usuario ya está registrado')
+
+    def test_concurrent_registration_rejects_only_the_conflicting_row(self):
+        rows = [patient(i) for i in range(1, 6)] + [patient(6, country='XX')]
+        prepare = UserImporter._prepare
+
+        def prepare_then_register(importer, chunk):
+            # Alguien se registra con el usuario de la fila 3 después de validar
+            result = prepare(importer, chunk)
+            AppUser.objects.create_user(
+                email='otra@example.com', username='paciente3', password='clave', last_name='Ruiz', name='Eva'
+            )
+            return result
+
+        get_availability_index().rebuild()
+        with mock.patch.object(UserImporter, '_prepare', prepare_then_register), \
+                self.captureOnCommitCallbacks(execute=True):
+            (read, imported, rejected, _), rejects = self._import(read_rows(as_csv(rows), 'csv'), chunk_size=10)
+        self.assertEqual((read, imported, rejected), (6, 4, 2))
+        lines = {int(row['line']): row['error'] for row in csv.DictReader(io.StringIO(rejects))}
+        self.assertEqual(lines[6], 'El país no existe')
+        self.assertEqual(lines[3], 'El nombre de usuario ya está registrado')
+        self.assertEqual(AppUser.objects.filter(email__startswith='Paciente').count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.get(source='roster').rejected, 2)
+
+        # Como en el registro: correo de verificación y filtro de disponibilidad
+        imported_ids = set(AppUser.objects.filter(email__startswith='Paciente').values_list('pk', flat=True))
+        jobs = Job.objects.filter(task=SEND_VERIFICATION_EMAIL)
+        self.assertEqual({job.payload['user_id'] for job in jobs}, imported_ids)
+        with self.assertNumQueries(0):
+            self.assertTrue(get_availability_index().username_available('paciente9'))
+        self.assertFalse(get_availability_index().username_available('paciente5'))
+
+    def test_resume_after_a_crash(self):
+        rows = [patient(i) for i in range(1, 8)]
+
+        def crash_after(limit):
+            for number, row in enumerate(read_rows(as_csv(rows), 'csv')):
+                if number == limit:
+                    raise RuntimeError('caída')
+                yield row
+
+        with self.assertRaises(RuntimeError):
+            self._import(crash_after(5))
+        # Los dos primeros bloques quedaron confirmados; el tercero no
+        self.assertEqual(AppUser.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.get(source='roster').rows_read, 4)
+
+        (read, imported, rejected, _), _ = self._import(read_rows(as_csv(rows), 'csv'))
+        self.assertEqual((read, imported, rejected), (3, 3, 0))
+        self.assertEqual(AppUser.objects.count(), 7)
+        checkpoint = ImportCheckpoint.objects.get(source='roster')
+        self.assertEqual((checkpoint.rows_read, checkpoint.imported), (7, 7))
+
+    def test_command(self):
+        path = os.path.join(self.directory, 'roster.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as roster:
+            roster.write(as_csv([patient(1), patient(2, phone='abc')]).getvalue())
+        output = io.StringIO()
+        call_command('import_users', path, '--hash-workers', '1', stdout=output)
+        self.assertIn('1 usuarios importados y 1 rechazados de 2 filas', output.getvalue())
+        self.assertTrue(os.path.exists(f'{path}.rejects.csv'))
+        self.assertTrue(AppUser.objects.filter(username='paciente1').exists())
@@ -0,0 +1,93 @@
+import json
+import threading
+from django.test import TestCase, override_settings
+from singularity.instrumentation import metrics_registry
+from ..cache import reference_cache
+from ..hashing import PasswordHashingBusy, PasswordHashingService
+from ..models import AppUser, Country
+
+INSTRUMENTATION = {'DEBUG_TOKEN': 'secreto', 'METRICS_TOKEN': 'metricas'}
+
+
+@override_settings(GRAPHQL_INSTRUMENTATION=INSTRUMENTATION)
+class InstrumentationTests(TestCase):
+    """Pruebas para la medición de operaciones GraphQL y el endpoint /metrics"""
+
+    def setUp(self):
+        metrics_registry.reset()
+        reference_cache.clear()
+        Country.objects.create(country_code='CO', country_name='Colombia')
+
+    def _post(self, query, variables=None, debug=None):
+        headers = {'X-GraphQL-Debug': debug} if debug else {}
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}),
+            content_type='application/json', headers=headers
+        ).json()
+
+    def test_timing_requires_the_debug_token(self):
+        self.assertNotIn('extensions', self._post('{ allCountries { id } }', debug='otro'))
+
+        reference_cache.clear()
+        with self.assertNumQueries(1):
+            result = self._post('query Countries { allCountries { countryName } }', debug='secreto')
+        timing = result['extensions']['timing']
+        self.assertEqual(timing['sql']['count'], 1)
+        self.assertGreater(timing['total'], 0)
+        self.assertGreaterEqual(timing['total'], timing['parseValidate'] + timing['execute'])
+        fields = {resolver['field']: resolver for resolver in timing['resolvers']}
+        self.assertEqual(fields['Query.allCountries']['count'], 1)
+        self.assertEqual(fields['CountryType.countryName']['count'], 1)
+
+    def test_password_hash_time_is_reported(self):
+        AppUser.objects.create_user(
+            email='hash@example.com', username='hash', password='testpass123', name='Hash', last_name='User'
+        )
+        result = self._post(
+            'mutation Login($email: String!, $password: String!) { tokenAuth(email: $email, password: $password) { token } }',
+            {'email': 'hash@example.com', 'password': 'testpass123'}, debug='secreto'
+        )
+        self.assertTrue(result['data']['tokenAuth']['token'])
+        self.assertEqual(result['extensions']['timing']['passwordHash']['count'], 1)
+        self.assertGreater(result['extensions']['timing']['passwordHash']['time'], 0)
+
+    def test_metrics_are_aggregated_per_operation(self):
+        self._post('query Countries { allCountries { id } }')
+        self._post('query Countries { allCountries { id } }')
+        self._post('{ me { email } }')
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer metricas'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('graphql_request_duration_seconds_count{operation="Countries"} 2', body)
+        self.assertIn('graphql_sql_queries_bucket{operation="Countries",le="1"} 2', body)
+        self.assertIn('graphql_request_duration_seconds_count{operation="anonymous"} 1', body)
+        self.assertIn('graphql_errors_total{operation="anonymous"} 1', body)
+        self.assertNotIn('graphql_errors_total{operation="Countries"}', body)
+
+    @override_settings(GRAPHQL_INSTRUMENTATION={**INSTRUMENTATION, 'MAX_OPERATIONS': 2})
+    def test_operation_names_are_bounded(self):
+        for name in ('A', 'B', 'C', 'D'):
+            self._post(f'query {name} {{ allCountries {{ id }} }}')
+        body = self.client.get('/metrics', headers={'Authorization': 'Bearer metricas'}).content.decode()
+        self.assertIn('graphql_request_duration_seconds_count{operation="other"} 2', body)
+        self.assertNotIn('operation="C"', body)
+
+    def test_password_hashing_pool_is_exposed(self):
+        service = PasswordHashingService(workers=1, max_queue=0)
+        service.make_password('clave-segura')
+        release = threading.Event()
+        blocked = service.submit(release.wait, 5)
+        with self.assertRaises(PasswordHashingBusy):
+            service.make_password('clave-segura')
+        release.set()
+        blocked.result()
+        # Espera a que el pool registre las observaciones pendientes
+        service.shutdown()
+
+        body = self.client.get('/metrics', headers={'Authorization': 'Bearer metricas'}).content.decode()
+        self.assertIn('password_hashing_queue_wait_seconds_count 2', body)
+        self.assertIn('password_hashing_duration_seconds_bucket{le="+Inf"} 2', body)
+        self.assertIn('password_hashing_rejected_total 1', body)
@@ -3,6 +3,8 @@ from graphene.test import Client
 from ..models import Country, TypeDocument, AppUser
 from singularity.schema import schema
 from datetime import date
+from unittest import mock
+from django.db import IntegrityError
 
 class GraphQLIntegrationTests(TestCase):
     """Pruebas de integración para GraphQL"""
@@ -117,6 +119,30 @@ class GraphQLIntegrationTests(TestCase):
         response = self.client.execute(mutation, variables=variables)
         self.assertFalse(response['data']['registerUser']['success'])
 
+    def test_user_registration_query_count(self):
+        # 1 consulta de validación + savepoint + 3 inserts + trabajo de verificación
+        # + liberación del savepoint
+        with self.assertNumQueries(7):
+            result = self._register_user("queries@example.com")
+        self.assertTrue(result['success'])
+
+    def test_user_registration_is_atomic(self):
+        with mock.patch(
+            'users.schema.ContactInfo.objects.create',
+            side_effect=IntegrityError('fallo simulado')
+        ):
+            result = self._register_user("orphan@example.com")
+        self.assertFalse(result['success'])
+        self.assertFalse(AppUser.objects.filter(email="orphan@example.com").exists())
+
+    def test_user_registration_maps_constraint_violations(self):
+        self._register_user("race@example.com")
+        # Simula un registro concurrente que pasó la verificación previa
+        with mock.patch('users.schema.find_registration_conflict', return_value=None):
+            result = self._register_user("race@example.com")
+        self.assertFalse(result['success'])
+        self.assertEqual(result['message'], "El email ya está registrado")
+
     def _register_user(self, email):
         """Helper method para registrar usuarios"""
         mutation = '''
@@ -150,4 +176,96 @@ class GraphQLIntegrationTests(TestCase):
             }
         }
         response = self.client.execute(mutation, variables=variables)
-        return response['data']['registerUser']
\ No newline at end of file
+        return response['data']['registerUser']
+
+class BulkRegistrationTests(TestCase):
+    """Pruebas de integración para el registro masivo de usuarios"""
+
+    mutation = '''
+        mutation($inputs: [UserRegistrationInput!]!) {
+            bulkRegisterUsers(inputs: $inputs) {
+                created
+                success
+                message
+                results { index success message user { email } }
+            }
+        }
+    '''
+
+    def setUp(self):
+        self.client = Client(schema)
+        self.country = Country.objects.create(
+            country_code="CO",
+            country_name="Colombia"
+        )
+        self.doc_type = TypeDocument.objects.create(
+            name_type_document="Cédula de Ciudadanía"
+        )
+
+    def _input(self, i, **overrides):
+        data = {
+            "email": f"bulk{i}@example.com",
+            "username": f"bulk_{i}",
+            "password": "testpass123",
+            "lastName": "User",
+            "name": "Test",
+            "isMilitar": False,
+            "documentType": str(self.doc_type.id),
+            "documentNumber": f"{i:010d}",
+            "documentExpeditionPlace": "Bogotá",
+            "documentExpeditionDate": "2020-01-01",
+            "country": str(self.country.id),
+            "address": "Calle 123 N 45-67",
+            "city": "Bogotá",
+            "phone": "1234567",
+            "celPhone": "3001234567",
+            "emergencyName": "Emergency Contact",
+            "emergencyPhone": "3009876543"
+        }
+        data.update(overrides)
+        return data
+
+    def _execute(self, inputs):
+        response = self.client.execute(self.mutation, variables={"inputs": inputs})
+        self.assertIsNone(response.get('errors'))
+        return response['data']['bulkRegisterUsers']
+
+    def test_bulk_registration_creates_all_rows(self):
+        result = self._execute([self._input(i) for i in range(5)])
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created'], 5)
+        self.assertEqual(AppUser.objects.count(), 5)
+        user = AppUser.objects.get(email="bulk3@example.com")
+        self.assertTrue(user.check_password("testpass123"))
+        self.assertEqual(user.userdocument_set.get().document, "0000000003")
+        self.assertEqual(user.contactinfo_set.get().country, self.country)
+
+    def test_bulk_registration_reports_errors_per_row(self):
+        self._execute([self._input(0)])
+        result = self._execute([
+            self._input(0),                                  # email existente
+            self._input(1),
+            self._input(2, email="bulk1@example.com"),       # repetido en el lote
+            self._input(3, documentNumber="0000000001"),     # documento repetido
+            self._input(4, country="999999"),                # país inexistente
+            self._input(5, phone="123abc"),                  # teléfono inválido
+        ])
+        self.assertFalse(result['success'])
+        self.assertEqual(result['created'], 1)
+        messages = [row['message'] for row in result['results']]
+        self.assertIn("email ya está registrado", messages[0])
+        self.assertTrue(result['results'][1]['success'])
+        self.assertEqual(result['results'][1]['user']['email'], "bulk1@example.com")
+        self.assertIn("email ya está registrado", messages[2])
+        self.assertIn("documento ya está registrado", messages[3])
+        self.assertIn("país no existe", messages[4])
+        self.assertIn("solo dígitos", messages[5])
+        self.assertEqual(AppUser.objects.count(), 2)
+
+    def test_bulk_registration_query_count_is_independent_of_batch_size(self):
+        # 5 consultas de validación + savepoint + 3 bulk_create + trabajos de
+        # verificación + liberación del savepoint
+        with self.assertNumQueries(11):
+            self._execute([self._input(i) for i in range(3)])
+        with self.assertNumQueries(11):
+            self._execute([self._input(i) for i in range(3, 10)])
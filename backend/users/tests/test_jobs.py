@@ -0,0 +1,188 @@
+import io
+import os
+import re
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from graphene.test import Client
+from singularity.schema import schema
+from ..jobs import TASKS, Worker, claim, enqueue, requeue_stale, task
+from ..models import AppUser, Country, Job, TypeDocument
+from ..registration import create_registration
+
+FLAKY_CALLS = []
+PROCESSED = []
+PROCESSED_LOCK = threading.Lock()
+
+
+@task('tests.flaky')
+def flaky(fail):
+    FLAKY_CALLS.append(fail)
+    if fail:
+        raise RuntimeError('servicio no disponible')
+
+
+@task('tests.record')
+def record(number):
+    with PROCESSED_LOCK:
+        PROCESSED.append(number)
+
+
+class JobQueueTests(TestCase):
+    """Pruebas para la cola de trabajos y la verificación de correo"""
+
+    verify = '''
+        mutation ($token: String!) {
+            verifyEmail(token: $token) { success message }
+        }
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.mail_dir = directory.name
+        email = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend', EMAIL_FILE_PATH=self.mail_dir
+        )
+        email.enable()
+        self.addCleanup(email.disable)
+        FLAKY_CALLS.clear()
+
+    def _register(self, email):
+        country = Country.objects.create(country_code='CO', country_name='Colombia')
+        doc_type = TypeDocument.objects.create(name_type_document='Cédula')
+        return create_registration({
+            'email': email, 'username': 'paciente', 'last_name': 'Pérez', 'name': 'Ana',
+            'is_militar': False, 'document_type': doc_type.id, 'document_number': '123',
+            'document_expedition_place': 'Bogotá', 'document_expedition_date': '2015-06-01',
+            'country': country.id, 'address': 'Calle 1', 'city': 'Bogotá', 'phone': '601',
+            'cel_phone': '300', 'emergency_name': 'Luis', 'emergency_phone': '300',
+        }, '!')
+
+    def _sent_email(self):
+        [message] = os.listdir(self.mail_dir)
+        with open(os.path.join(self.mail_dir, message), encoding='utf-8') as sent:
+            content = sent.read()
+        return content, re.search(r'token=(\S+)', content).group(1)
+
+    def _verify(self, token):
+        return Client(schema).execute(self.verify, variables={'token': token})['data']['verifyEmail']
+
+    def test_registration_enqueues_verification_email(self):
+        user = self._register('paciente@example.com')
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.task, job.payload, job.status), ('users.send_verification_email', {'user_id': user.pk}, 'pending')
+        )
+        # Registrar no envía nada ni genera el token
+        self.assertEqual(os.listdir(self.mail_dir), [])
+        self.assertIsNone(AppUser.objects.get(pk=user.pk).verification_token)
+
+        self.assertEqual(Worker('prueba').run_once(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+        content, token = self._sent_email()
+        self.assertIn('To: paciente@example.com', content)
+        # Solo se guarda el hash del token
+        self.assertNotEqual(AppUser.objects.get(pk=user.pk).verification_token, token)
+
+        self.assertEqual(self._verify(token + 'x')['message'], 'El enlace de verificación no es válido')
+        self.assertTrue(self._verify(token)['success'])
+        user.refresh_from_db()
+        self.assertTrue(user.email_verified)
+        self.assertIsNone(user.verification_token)
+        # El token es de un solo uso
+        self.assertFalse(self._verify(token)['success'])
+
+    def test_expired_token(self):
+        user = self._register('paciente@example.com')
+        Worker('prueba').run_once()
+        _, token = self._sent_email()
+        with override_settings(EMAIL_VERIFICATION={'MAX_AGE': -1}):
+            self.assertEqual(self._verify(token)['message'], 'El enlace de verificación expiró')
+        self.assertFalse(AppUser.objects.get(pk=user.pk).email_verified)
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        job = enqueue('tests.flaky', {'fail': True}, max_attempts=2)
+        worker = Worker('prueba')
+        with self.assertLogs('users.jobs', 'WARNING'):
+            self.assertEqual(worker.run_once(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('servicio no disponible', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        # No se reintenta antes de tiempo
+        self.assertEqual(worker.run_once(), 0)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('users.jobs', 'ERROR'):
+            self.assertEqual(worker.run_once(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(FLAKY_CALLS, [True, True])
+        self.assertEqual(worker.failed, 2)
+
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue('tests.flaky', {'fail': False})
+        Job.objects.filter(pk=job.pk).update(
+            status='running', attempts=1, locked_by='caído', locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(requeue_stale(['default']), 1)
+        Worker('prueba').run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_stale_jobs_out_of_attempts_fail(self):
+        # Una tarea que tumba al trabajador no se reintenta indefinidamente
+        exhausted = enqueue('tests.flaky', {'fail': False}, max_attempts=2)
+        retried = enqueue('tests.flaky', {'fail': False}, max_attempts=2)
+        locked_at = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(pk=exhausted.pk).update(status='running', attempts=2, locked_at=locked_at)
+        Job.objects.filter(pk=retried.pk).update(status='running', attempts=1, locked_at=locked_at)
+        with self.assertLogs('users.jobs', 'ERROR'):
+            self.assertEqual(requeue_stale(['default']), 2)
+        exhausted.refresh_from_db()
+        retried.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.last_error), ('failed', 'Trabajador sin respuesta'))
+        self.assertIsNotNone(exhausted.time_finish)
+        self.assertEqual(retried.status, 'pending')
+
+    def test_unknown_tasks_cannot_be_enqueued(self):
+        self.assertNotIn('tests.missing', TASKS)
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+
+class RunWorkersTests(TransactionTestCase):
+    """Pruebas para los trabajadores concurrentes con SKIP LOCKED"""
+
+    def test_each_job_runs_once(self):
+        PROCESSED.clear()
+        for number in range(40):
+            enqueue('tests.record', {'number': number})
+        output = io.StringIO()
+        call_command('run_workers', '--concurrency', '4', '--batch-size', '3', '--once', stdout=output)
+        self.assertIn('40 trabajos procesados, 0 con error', output.getvalue())
+        self.assertEqual(sorted(PROCESSED), list(range(40)))
+        self.assertEqual(set(Job.objects.values_list('status', 'attempts')), {('done', 1)})
+
+    def test_worker_survives_database_errors(self):
+        job = enqueue('tests.flaky', {'fail': False})
+        errors = [OperationalError('el servidor cerró la conexión')]
+
+        def flaky_claim(*args):
+            if errors:
+                raise errors.pop()
+            return claim(*args)
+
+        worker = Worker('prueba', poll_interval=0)
+        with mock.patch('users.jobs.claim', side_effect=flaky_claim), self.assertLogs('users.jobs', 'ERROR') as logs:
+            worker.run(drain=True)
+        self.assertIn('OperationalError', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
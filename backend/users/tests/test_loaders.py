@@ -0,0 +1,157 @@
+import asyncio
+from asgiref.sync import async_to_sync
+from datetime import date
+from django.test import RequestFactory, TestCase
+from graphene.test import Client
+from ..cache import reference_cache
+from ..loaders import DataLoader, Loaders
+from ..models import AppUser, ContactInfo, Country, TypeDocument, UserDocument
+from singularity.schema import schema
+
+
+class DataLoaderTests(TestCase):
+    """Pruebas para la carga en lote de relaciones de usuarios"""
+
+    query = '''
+        query {
+            me {
+                email
+                documents {
+                    document
+                    user { email }
+                    typeDocument { nameTypeDocument }
+                }
+                contacts {
+                    city
+                    user { email }
+                    country { countryName }
+                }
+            }
+        }
+    '''
+
+    def setUp(self):
+        reference_cache.clear()
+        self.client = Client(schema)
+        self.countries = [
+            Country.objects.create(country_code=code, country_name=code) for code in ('CO', 'PE', 'EC')
+        ]
+        self.doc_types = [
+            TypeDocument.objects.create(name_type_document=name) for name in ('CC', 'CE', 'PA')
+        ]
+        self.users = [self._create_user(i) for i in range(3)]
+
+    def _create_user(self, i):
+        user = AppUser.objects.create_user(
+            email=f'loader{i}@example.com',
+            username=f'loader{i}',
+            password='testpass123',
+            name='Loader',
+            last_name='User',
+            is_militar=False
+        )
+        for doc_type in self.doc_types:
+            UserDocument.objects.create(
+                user=user,
+                type_document=doc_type,
+                document=f'{i}-{doc_type.pk}',
+                place_expedition='Bogotá',
+                date_expedition=date(2020, 1, 1)
+            )
+        for country in self.countries:
+            ContactInfo.objects.create(
+                user=user,
+                country=country,
+                address='Calle 123 N 45-67',
+                city='Bogotá',
+                phone='1234567',
+                cel_phone='3001234567',
+                emergency_name='Contacto',
+                emergency_phone='3009876543'
+            )
+        return user
+
+    def _execute(self, user):
+        request = RequestFactory().post('/graphql/')
+        request.user = user
+        return self.client.execute(self.query, context_value=request)
+
+    def test_user_relations_are_batched(self):
+        # Documentos y contactos, con sus relaciones en la misma consulta
+        with self.assertNumQueries(2):
+            response = self._execute(self.users[0])
+        self.assertIsNone(response.get('errors'))
+
+        me = response['data']['me']
+        self.assertEqual(len(me['documents']), 3)
+        self.assertEqual(len(me['contacts']), 3)
+        self.assertEqual(
+            [d['typeDocument']['nameTypeDocument'] for d in me['documents']], ['CC', 'CE', 'PA']
+        )
+        self.assertEqual({c['country']['countryName'] for c in me['contacts']}, {'CO', 'PE', 'EC'})
+        self.assertEqual(me['documents'][0]['user']['email'], 'loader0@example.com')
+
+        with self.assertNumQueries(2):
+            self._execute(self.users[1])
+
+    def test_prepared_users_load_in_one_query(self):
+        loaders = Loaders()
+        loaders.prepare_users(self.users)
+        with self.assertNumQueries(1):
+            documents = [loaders.documents_by_user.load(user.pk) for user in self.users]
+        self.assertEqual([len(docs) for docs in documents], [3, 3, 3])
+        self.assertEqual(loaders.user.load(self.users[2].pk), self.users[2])
+
+    def test_missing_keys_resolve_to_defaults(self):
+        loaders = Loaders()
+        self.assertEqual(loaders.contacts_by_user.load(-1), [])
+        self.assertIsNone(loaders.user.load(-1))
+
+    def test_keys_of_one_tick_load_in_one_query(self):
+        loaders = Loaders()
+
+        async def load():
+            users = await asyncio.gather(*(loaders.user.load(user.pk) for user in self.users))
+            return users, await loaders.user.load(self.users[0].pk)
+
+        with self.assertNumQueries(1):
+            users, again = async_to_sync(load)()
+        self.assertEqual(users, self.users)
+        self.assertEqual(again, self.users[0])
+
+    def test_keys_requested_during_a_load_wait_for_it(self):
+        calls = []
+
+        class SlowLoader(DataLoader):
+            async def abatch_load(self, keys):
+                calls.append(keys)
+                await asyncio.sleep(0.01)
+                return {key: key * 2 for key in keys}
+
+        loader = SlowLoader()
+
+        async def load():
+            first = asyncio.ensure_future(loader.load(1))
+            # La primera carga ya empezó cuando llega la segunda llamada
+            await asyncio.sleep(0.001)
+            return await asyncio.gather(first, loader.load(1))
+
+        self.assertEqual(async_to_sync(load)(), [2, 2])
+        self.assertEqual(calls, [[1]])
+
+    def test_dispatch_task_is_referenced_until_it_finishes(self):
+        referenced = []
+
+        class Loader(DataLoader):
+            async def abatch_load(self, keys):
+                referenced.append(asyncio.current_task() in self._tasks)
+                return {key: key for key in keys}
+
+        loader = Loader()
+
+        async def load():
+            return await loader.load(1)
+
+        self.assertEqual(async_to_sync(load)(), 1)
+        self.assertEqual(referenced, [True])
+        self.assertEqual(loader._tasks, set())
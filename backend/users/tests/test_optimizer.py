@@ -0,0 +1,137 @@
+import json
+from datetime import date
+import graphene
+from django.test import RequestFactory, TestCase, override_settings
+from graphene.test import Client
+from graphql_jwt.shortcuts import get_token
+from ..models import AppUser, ContactInfo, Country, TypeDocument, UserDocument
+from ..optimizer import optimize
+from ..schema import UserType
+
+
+class UsersQuery(graphene.ObjectType):
+    # Campo raíz de prueba que devuelve un queryset optimizado
+    users = graphene.List(UserType)
+
+    def resolve_users(self, info):
+        return optimize(AppUser.objects.order_by('pk'), info)
+
+
+users_schema = graphene.Schema(query=UsersQuery)
+
+
+class QueryOptimizerTests(TestCase):
+    """Pruebas para el optimizador de querysets según la selección GraphQL"""
+
+    query = '''
+        query {
+            users {
+                email
+                ...Relations
+            }
+        }
+        fragment Relations on UserType {
+            documents { document typeDocument { nameTypeDocument } }
+            contacts { city country { countryName } }
+        }
+    '''
+
+    def setUp(self):
+        self.client = Client(users_schema)
+        self.country = Country.objects.create(country_code='CO', country_name='Colombia')
+        self.doc_type = TypeDocument.objects.create(name_type_document='Cédula de Ciudadanía')
+        self.created = 0
+
+    def _create_users(self, count, documents=2):
+        for _ in range(count):
+            i = self.created = self.created + 1
+            user = AppUser.objects.create_user(
+                email=f'opt{i}@example.com',
+                username=f'opt{i}',
+                password='testpass123',
+                name='Opt',
+                last_name='User',
+                is_militar=False
+            )
+            for n in range(documents):
+                UserDocument.objects.create(
+                    user=user,
+                    type_document=self.doc_type,
+                    document=f'{i}-{n}',
+                    place_expedition='Bogotá',
+                    date_expedition=date(2020, 1, 1)
+                )
+            ContactInfo.objects.create(
+                user=user,
+                country=self.country,
+                address='Calle 123 N 45-67',
+                city='Bogotá',
+                phone='1234567',
+                cel_phone='3001234567',
+                emergency_name='Contacto',
+                emergency_phone='3009876543'
+            )
+
+    def _execute(self):
+        request = RequestFactory().post('/graphql/')
+        response = self.client.execute(self.query, context_value=request)
+        self.assertIsNone(response.get('errors'))
+        return response['data']['users']
+
+    def test_query_count_is_constant_as_results_grow(self):
+        # Usuarios, documentos y contactos: una consulta cada uno
+        self._create_users(1)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self._execute()), 1)
+
+        self._create_users(9, documents=5)
+        with self.assertNumQueries(3):
+            users = self._execute()
+        self.assertEqual(len(users), 10)
+        self.assertEqual(len(users[-1]['documents']), 5)
+        self.assertEqual(users[-1]['contacts'][0]['country']['countryName'], 'Colombia')
+        self.assertEqual(
+            users[0]['documents'][0]['typeDocument']['nameTypeDocument'], 'Cédula de Ciudadanía'
+        )
+
+    def test_only_selected_columns_are_loaded(self):
+        self._create_users(1)
+        request = RequestFactory().post('/graphql/')
+        with self.assertNumQueries(1) as queries:
+            self.client.execute('{ users { email } }', context_value=request)
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"email"', sql)
+        self.assertNotIn('"password"', sql)
+        self.assertNotIn('UserDocument_TB', sql)
+
+
+class SQLDebugExtensionTests(TestCase):
+    """Pruebas para el reporte de SQL en extensions de la respuesta"""
+
+    def setUp(self):
+        self.user = AppUser.objects.create_user(
+            email='debug@example.com',
+            username='debug',
+            password='testpass123',
+            name='Debug',
+            last_name='User',
+            is_militar=False
+        )
+
+    def _post(self, query):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query}), content_type='application/json',
+            HTTP_AUTHORIZATION=f'JWT {get_token(self.user)}'
+        ).json()
+
+    @override_settings(GRAPHQL_DEBUG_SQL=True)
+    def test_sql_is_reported_per_operation(self):
+        result = self._post('{ me { email documents { document } } }')
+        sql = result['extensions']['sql']
+        self.assertEqual(sql['count'], len(sql['queries']))
+        self.assertTrue(any('UserDocument_TB' in query['sql'] for query in sql['queries']))
+
+    @override_settings(GRAPHQL_DEBUG_SQL=False)
+    def test_sql_is_not_reported_when_disabled(self):
+        result = self._post('{ me { email } }')
+        self.assertNotIn('extensions', result)
@@ -0,0 +1,115 @@
+from datetime import timedelta
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from graphene.test import Client
+from ..models import AppUser
+from singularity.schema import schema
+
+
+class AllUsersConnectionTests(TestCase):
+    """Pruebas para el directorio de usuarios paginado por llave"""
+
+    query = '''
+        query ($first: Int, $after: String, $last: Int, $before: String, $isMilitar: Boolean) {
+            allUsers(first: $first, after: $after, last: $last, before: $before, isMilitar: $isMilitar) {
+                edges { cursor node { email } }
+                pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+            }
+        }
+    '''
+
+    def setUp(self):
+        self.client = Client(schema)
+        self.staff = AppUser.objects.create_user(
+            email='staff@example.com',
+            username='staff',
+            password='testpass123',
+            name='Staff',
+            last_name='User',
+            is_staff=True
+        )
+        # Varios usuarios con la misma fecha de creación: el id desempata
+        created = timezone.now() - timedelta(days=1)
+        for i in range(12):
+            user = AppUser.objects.create_user(
+                email=f'page{i:02}@example.com',
+                username=f'page{i:02}',
+                password='testpass123',
+                name='Page',
+                last_name='User',
+                is_militar=i % 3 == 0
+            )
+            AppUser.objects.filter(pk=user.pk).update(time_create=created + timedelta(hours=i // 4))
+        self.emails = [f'page{i:02}@example.com' for i in range(12)] + ['staff@example.com']
+
+    def _execute(self, query=None, user=None, **variables):
+        request = RequestFactory().post('/graphql/')
+        request.user = user or self.staff
+        return self.client.execute(query or self.query, context_value=request, variables=variables)
+
+    def _page(self, **variables):
+        response = self._execute(**variables)
+        self.assertIsNone(response.get('errors'))
+        return response['data']['allUsers']
+
+    def test_forward_pagination_follows_cursors(self):
+        emails, after = [], None
+        while True:
+            page = self._page(first=5, after=after)
+            emails += [edge['node']['email'] for edge in page['edges']]
+            self.assertEqual(page['pageInfo']['hasPreviousPage'], after is not None)
+            if not page['pageInfo']['hasNextPage']:
+                break
+            after = page['pageInfo']['endCursor']
+        self.assertEqual(emails, self.emails)
+
+    def test_backward_pagination(self):
+        page = self._page(last=5)
+        self.assertEqual([e['node']['email'] for e in page['edges']], self.emails[-5:])
+        self.assertTrue(page['pageInfo']['hasPreviousPage'])
+
+        page = self._page(last=5, before=page['pageInfo']['startCursor'])
+        self.assertEqual([e['node']['email'] for e in page['edges']], self.emails[-10:-5])
+        self.assertTrue(page['pageInfo']['hasNextPage'])
+
+    def test_filters(self):
+        page = self._page(first=20, isMilitar=True)
+        self.assertEqual(
+            [e['node']['email'] for e in page['edges']],
+            [f'page{i:02}@example.com' for i in range(0, 12, 3)]
+        )
+
+    def test_page_uses_row_comparison_and_no_count(self):
+        cursor = self._page(first=2)['pageInfo']['endCursor']
+        with self.assertNumQueries(1) as queries:
+            self._execute(first=2, after=cursor)
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('("AppUser_TB"."time_create", "AppUser_TB"."id") >', sql)
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_counts_only_when_requested(self):
+        with self.assertNumQueries(3) as queries:
+            response = self._execute('''
+                query { allUsers(first: 1, isMilitar: true) { totalCount estimatedCount } }
+            ''')
+        self.assertIsNone(response.get('errors'))
+        self.assertEqual(response['data']['allUsers']['totalCount'], 4)
+        self.assertGreaterEqual(response['data']['allUsers']['estimatedCount'], 1)
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertTrue(any('COUNT(' in s for s in sql))
+        self.assertTrue(any(s.startswith('EXPLAIN') for s in sql))
+
+    def test_invalid_cursor(self):
+        response = self._execute(first=2, after='no-es-un-cursor')
+        self.assertIn('Cursor inválido', response['errors'][0]['message'])
+
+    def test_page_size_is_capped(self):
+        response = self._execute(first=1000)
+        self.assertIn('tamaño de página', response['errors'][0]['message'])
+
+    def test_requires_staff(self):
+        user = AppUser.objects.get(email='page01@example.com')
+        response = self._execute(user=user, first=5)
+        self.assertIsNotNone(response.get('errors'))
+        self.assertIsNone(response['data']['allUsers'])
@@ -0,0 +1,125 @@
+import json
+from django.test import SimpleTestCase, TestCase, override_settings
+from graphql import get_operation_ast, parse
+from singularity.persisted_queries import query_hash, registry
+from singularity.query_cost import analyze_operation
+from singularity.schema import schema
+
+# Un cliente que anida las relaciones inversas una y otra vez
+NESTED = '''
+    query Nested {
+        me { contacts { user { documents { user { contacts { user { documents {
+            user { contacts { user { email } } }
+        } } } } } } } }
+    }
+'''
+
+
+def cost_of(query, variables=None):
+    document = parse(query)
+    operation = get_operation_ast(document)
+    return analyze_operation(schema.graphql_schema, document, operation, variables)
+
+
+@override_settings(GRAPHQL_QUERY_COST={'DEFAULT_LIST_SIZE': 10, 'FIELD_COSTS': {'Query.searchUsers': 5}})
+class CostAnalyzerTests(SimpleTestCase):
+    """Pruebas para el cálculo estático del costo de una operación"""
+
+    def test_lists_multiply_their_selection(self):
+        # me (1) + documents (1 + 10 * typeDocument (1))
+        cost = cost_of('{ me { email documents { document typeDocument { nameTypeDocument } } } }')
+        self.assertEqual((cost.cost, cost.depth), (12, 4))
+
+    def test_size_arguments_and_connections(self):
+        query = '''
+            query ($first: Int) {
+                allUsers(first: $first) { totalCount edges { node { documents { document } } } }
+            }
+        '''
+        # allUsers (1) + first * (edges (1) + node (1) + documents (1 + 10 * 0))
+        self.assertEqual(cost_of(query, {'first': 5}).cost, 1 + 5 * 3)
+        self.assertEqual(cost_of(query, {'first': 50}).cost, 1 + 50 * 3)
+        self.assertEqual(cost_of('{ searchUsers(term: "ana", limit: 7) { email } }').cost, 5)
+
+    def test_fragments_are_counted(self):
+        query = '''
+            { me { ...Contacts } }
+            fragment Contacts on UserType { contacts { country { countryName } } }
+        '''
+        self.assertEqual(cost_of(query).cost, 1 + 1 + 10 * 1)
+
+    def test_introspection_is_free(self):
+        self.assertEqual(cost_of('{ __schema { types { name } } }').cost, 0)
+
+    @override_settings(GRAPHQL_QUERY_COST={'FIELD_COSTS': {'Mutation.bulkRegisterUsers': 10}})
+    def test_batch_mutations_cost_per_input(self):
+        query = 'mutation ($inputs: [UserRegistrationInput!]!) { bulkRegisterUsers(inputs: $inputs) { created } }'
+        registration = {
+            'email': 'ana@example.com', 'username': 'ana', 'password': 'clave', 'lastName': 'Pérez',
+            'name': 'Ana', 'isMilitar': False, 'documentType': '1', 'documentNumber': '123',
+            'documentExpeditionPlace': 'Bogotá', 'documentExpeditionDate': '2015-06-01', 'country': '1',
+            'address': 'Calle 1', 'city': 'Bogotá', 'phone': '123', 'celPhone': '300',
+            'emergencyName': 'Luis', 'emergencyPhone': '301',
+        }
+        self.assertEqual(cost_of(query, {'inputs': [registration]}).cost, 10)
+        self.assertEqual(cost_of(query, {'inputs': [registration] * 50}).cost, 500)
+
+
+@override_settings(GRAPHQL_QUERY_COST={'MAX_DEPTH': 6, 'MAX_COST': 500, 'DEFAULT_LIST_SIZE': 10})
+class QueryBudgetTests(TestCase):
+    """Pruebas para el rechazo de operaciones que exceden su presupuesto"""
+
+    def _post(self, query, variables=None):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query, 'variables': variables}),
+            content_type='application/json'
+        )
+
+    def test_too_deep_is_rejected_before_execution(self):
+        with self.assertNumQueries(0):
+            response = self._post(NESTED)
+        self.assertEqual(response.status_code, 400)
+        error = response.json()['errors'][0]
+        self.assertEqual(error['extensions']['code'], 'QUERY_TOO_DEEP')
+        self.assertEqual(error['extensions']['maxDepth'], 6)
+        self.assertGreater(error['extensions']['depth'], 6)
+
+    def test_too_expensive_is_rejected(self):
+        query = '''
+            query ($first: Int) {
+                allUsers(first: $first) { edges { node { documents { user { email } } } } }
+            }
+        '''
+        error = self._post(query, {'first': 100}).json()['errors'][0]
+        self.assertEqual(error['extensions']['code'], 'QUERY_TOO_EXPENSIVE')
+        self.assertEqual(error['extensions']['maxCost'], 500)
+        self.assertEqual(error['extensions']['cost'], 1 + 100 * (1 + 1 + 1 + 10 * 1))
+
+        # La misma consulta con una página pequeña sí se ejecuta
+        error = self._post(query, {'first': 5}).json()['errors'][0]
+        self.assertNotIn(error.get('extensions', {}).get('code'), ('QUERY_TOO_EXPENSIVE', 'QUERY_TOO_DEEP'))
+
+    def test_budgets_per_persisted_query(self):
+        self.addCleanup(registry.reload)
+        budgets = {'MAX_DEPTH': 6, 'OPERATIONS': {query_hash(NESTED): {'MAX_DEPTH': 20}}}
+        with override_settings(GRAPHQL_QUERY_COST=budgets):
+            # Fuera del registro estático el documento no tiene presupuesto propio
+            registry._static = {}
+            self.assertEqual(self._post(NESTED).status_code, 400)
+
+            registry._static = {query_hash(NESTED): NESTED}
+            self.assertEqual(self._post(NESTED).status_code, 200)
+            # Otro documento con el mismo nombre de operación no lo hereda
+            self.assertEqual(self._post(NESTED.replace('email', 'id')).status_code, 400)
+
+    def test_cost_is_recorded(self):
+        with self.assertLogs('singularity.query_cost', 'INFO') as logs:
+            self._post('query Countries { allCountries { id } }')
+            self._post(NESTED)
+        self.assertEqual(
+            [record.graphql_cost for record in logs.records],
+            [
+                {'operation': 'Countries', 'type': 'query', 'cost': 1, 'depth': 2, 'rejected': False},
+                {'operation': 'Nested', 'type': 'query', 'cost': 122222, 'depth': 12, 'rejected': True},
+            ]
+        )
@@ -0,0 +1,91 @@
+import json
+import time
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from singularity.db_router import ReplicaRoutingMiddleware, pin_to_primary, read_from_replica
+from ..models import AppUser, Country
+
+REPLICA_ROUTING = {'ALIAS': 'replica', 'STICKY_SECONDS': 5, 'COOKIE_NAME': 'db_primary_until'}
+
+
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+class ReplicaRoutingTests(TestCase):
+    """Pruebas para el enrutamiento de lecturas a la réplica"""
+
+    def _view(self, write=False):
+        def view(request):
+            request.read_before = Country.objects.all().db
+            if write:
+                Country.objects.create(country_code='PE', country_name='Perú')
+            request.read_after = Country.objects.all().db
+            return HttpResponse()
+        return view
+
+    def test_reads_use_replica_until_a_write(self):
+        self.assertEqual(Country.objects.all().db, 'default')
+        with read_from_replica():
+            self.assertEqual(Country.objects.all().db, 'replica')
+            self.assertEqual(Country.objects.select_for_update().db, 'default')
+            self.assertEqual(Country.objects.all().db, 'default')
+        with read_from_replica():
+            pin_to_primary()
+            self.assertEqual(AppUser.objects.all().db, 'default')
+
+    def test_write_sets_sticky_cookie(self):
+        request = RequestFactory().get('/')
+        response = ReplicaRoutingMiddleware(self._view(write=True))(request)
+        self.assertEqual((request.read_before, request.read_after), ('replica', 'default'))
+        cookie = response.cookies['db_primary_until']
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertGreater(float(cookie.value), time.time())
+
+        request = RequestFactory().get('/')
+        request.COOKIES['db_primary_until'] = cookie.value
+        response = ReplicaRoutingMiddleware(self._view())(request)
+        self.assertEqual(request.read_before, 'default')
+        self.assertNotIn('db_primary_until', response.cookies)
+
+    def test_expired_or_invalid_cookie_reads_replica(self):
+        for value in (str(time.time() - 1), 'x'):
+            request = RequestFactory().get('/')
+            request.COOKIES['db_primary_until'] = value
+            ReplicaRoutingMiddleware(self._view())(request)
+            self.assertEqual(request.read_before, 'replica')
+
+    def test_async_middleware(self):
+        async def view(request):
+            request.read_before = Country.objects.all().db
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        response = async_to_sync(ReplicaRoutingMiddleware(view))(request)
+        self.assertEqual(request.read_before, 'replica')
+        self.assertNotIn('db_primary_until', response.cookies)
+
+    @override_settings(REPLICA_ROUTING={'ALIAS': None})
+    def test_without_replica(self):
+        request = RequestFactory().get('/')
+        response = ReplicaRoutingMiddleware(self._view(write=True))(request)
+        self.assertEqual(request.read_before, 'default')
+        self.assertNotIn('db_primary_until', response.cookies)
+
+    @override_settings(AVAILABILITY_INDEX={'SYNC_INTERVAL': 60})
+    def test_mutations_read_from_primary(self):
+        # Sin base 'replica' configurada, cualquier lectura enrutada allí fallaría
+        response = self.client.post(
+            '/graphql/',
+            json.dumps({'query': 'mutation { createCountry(countryCode: "CO", countryName: "Colombia") { success message } }'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['data']['createCountry'], {'success': True, 'message': 'País creado exitosamente'})
+        self.assertIn('db_primary_until', response.cookies)
+
+        # La cookie mantiene en la principal las lecturas de la siguiente consulta
+        AppUser.objects.create_user(email='ana@example.com', username='ana', password='x', last_name='P', name='Ana')
+        response = self.client.post(
+            '/graphql/',
+            json.dumps({'query': '{ checkAvailability(username: "ana") { username } }'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'data': {'checkAvailability': {'username': False}}})
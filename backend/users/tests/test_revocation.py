@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_token
+from ..bloom import BloomFilter
+from ..cache import reference_cache, user_cache
+from ..models import AppUser, Country
+from ..revocation import RevocationStore, SQLiteRevocationBackend, get_revocation_store
+
+
+class BloomFilterTests(SimpleTestCase):
+    """Pruebas para el filtro de Bloom"""
+
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        bloom.update(f'k{i}' for i in range(1000))
+        self.assertTrue(all(f'k{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'x{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertFalse(bloom.saturated)
+        bloom.add('extra')
+        self.assertTrue(bloom.saturated)
+
+
+class SQLiteRevocationBackendTests(SimpleTestCase):
+    """Pruebas para el respaldo SQLite compartido entre procesos"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'revocations.sqlite3')
+
+    def test_revocations_reach_other_processes_on_sync(self):
+        first = RevocationStore(SQLiteRevocationBackend(self.path), sync_interval=0)
+        second = RevocationStore(SQLiteRevocationBackend(self.path), sync_interval=0)
+        payload = {'jti': 'abc', 'user_id': 7, 'gen': 0, 'exp': 4102444800}
+        self.assertFalse(second.is_revoked(payload))
+
+        first.revoke_token(payload)
+        self.assertTrue(second.is_revoked(payload))
+        self.assertFalse(second.is_revoked(dict(payload, jti='other')))
+
+        self.assertEqual(first.revoke_user(7), 1)
+        self.assertTrue(second.is_revoked(dict(payload, jti='other')))
+        self.assertEqual(second.user_generation(7), 1)
+        self.assertFalse(second.is_revoked(dict(payload, jti='other', gen=1)))
+
+    def test_new_tokens_get_the_current_generation(self):
+        first = RevocationStore(SQLiteRevocationBackend(self.path), sync_interval=60)
+        second = RevocationStore(SQLiteRevocationBackend(self.path), sync_interval=60)
+        self.assertEqual(second.user_generation(7), 0)
+
+        # Otro proceso revoca (p. ej. un cambio de contraseña) y el usuario
+        # inicia sesión en este antes de la siguiente sincronización
+        first.revoke_user(7)
+        generation = second.issue_generation(7)
+        self.assertEqual(generation, 1)
+        second._synced_at = float('-inf')
+        self.assertFalse(second.is_revoked({'jti': 'nuevo', 'user_id': 7, 'gen': generation}))
+        self.assertTrue(second.is_revoked({'jti': 'viejo', 'user_id': 7, 'gen': 0}))
+
+    def test_revoked_users_are_checked_in_memory(self):
+        store = RevocationStore(SQLiteRevocationBackend(self.path), sync_interval=60)
+        store.revoke_user(7)
+        payload = {'jti': 'abc', 'user_id': 7, 'gen': 0}
+        with mock.patch.object(store.backend, 'generation') as generation:
+            self.assertTrue(store.is_revoked(payload))
+            self.assertFalse(store.is_revoked(dict(payload, gen=1)))
+            self.assertFalse(store.is_revoked(dict(payload, user_id=8)))
+        generation.assert_not_called()
+
+    def test_expired_revocations_are_purged(self):
+        store = RevocationStore(SQLiteRevocationBackend(self.path))
+        store.revoke_token({'jti': 'old', 'exp': 0})
+        store.revoke_token({'jti': 'new', 'exp': 4102444800})
+        self.assertEqual(store.backend.generation('t:old'), 0)
+        with override_settings(TOKEN_REVOCATION={
+            'BACKEND': 'users.revocation.SQLiteRevocationBackend', 'OPTIONS': {'PATH': self.path},
+        }):
+            call_command('purge_token_revocations', stdout=io.StringIO())
+        self.assertIsNone(store.backend.generation('t:old'))
+        self.assertEqual(store.backend.generation('t:new'), 0)
+
+
+@override_settings(TOKEN_REVOCATION={'SYNC_INTERVAL': 60})
+class TokenRevocationTests(TestCase):
+    """Pruebas para la revocación de tokens (logout y usuarios desactivados)"""
+
+    def setUp(self):
+        user_cache.clear()
+        reference_cache.clear()
+        Country.objects.create(country_code='CO', country_name='Colombia')
+        self.user = AppUser.objects.create_user(
+            email='revoke@example.com',
+            username='revoke',
+            password='testpass123',
+            name='Revoke',
+            last_name='User'
+        )
+
+    def _post(self, query, token):
+        return self.client.post(
+            '/graphql/', json.dumps({'query': query}), content_type='application/json',
+            HTTP_AUTHORIZATION=f'JWT {token}'
+        ).json()
+
+    def _me(self, token):
+        result = self._post('{ me { email } }', token)
+        return result['errors'][0]['message'] if 'errors' in result else result['data']['me']['email']
+
+    def test_tokens_carry_jti_and_generation(self):
+        first = jwt_settings.JWT_DECODE_HANDLER(get_token(self.user))
+        second = jwt_settings.JWT_DECODE_HANDLER(get_token(self.user))
+        self.assertNotEqual(first['jti'], second['jti'])
+        self.assertEqual(first['gen'], 0)
+
+    def test_logout_revokes_only_that_token(self):
+        token, other = get_token(self.user), get_token(self.user)
+        result = self._post('mutation { logout { success } }', token)
+        self.assertTrue(result['data']['logout']['success'])
+        self.assertEqual(self._me(token), 'Token has been revoked')
+        self.assertEqual(self._me(other), 'revoke@example.com')
+
+    def test_logout_from_all_sessions(self):
+        token, other = get_token(self.user), get_token(self.user)
+        self._post('mutation { logout(allSessions: true) { success } }', token)
+        self.assertEqual(self._me(token), 'Token has been revoked')
+        self.assertEqual(self._me(other), 'Token has been revoked')
+        # Los tokens emitidos después siguen siendo válidos
+        self.assertEqual(self._me(get_token(self.user)), 'revoke@example.com')
+
+    def test_valid_tokens_are_checked_without_queries(self):
+        token = get_token(self.user)
+        self._post('mutation { logout { success } }', get_token(self.user))
+        self._post('{ allCountries { id } }', token)
+        with self.assertNumQueries(0):
+            result = self._post('{ allCountries { countryName } }', token)
+        self.assertEqual(result['data']['allCountries'][0]['countryName'], 'Colombia')
+
+    def test_deactivating_or_changing_password_revokes(self):
+        token = get_token(self.user)
+        self.user.set_password('newpass456')
+        self.user.save()
+        self.assertEqual(self._me(token), 'Token has been revoked')
+
+        token = get_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self._me(token), 'Token has been revoked')
+
+    def test_saving_an_inactive_user_does_not_revoke_again(self):
+        self.user.is_active = False
+        self.user.save()
+        generation = get_revocation_store().user_generation(self.user.pk)
+
+        self.user.name = 'Otro'
+        self.user.save()
+        user = AppUser.objects.get(pk=self.user.pk)
+        user.last_name = 'Nombre'
+        user.save(update_fields=['last_name'])
+        self.assertEqual(get_revocation_store().user_generation(self.user.pk), generation)
+
+        user = AppUser.objects.only('email').get(pk=self.user.pk)
+        user.is_active = True
+        user.save()
+        user.is_active = False
+        user.save()
+        self.assertEqual(get_revocation_store().user_generation(self.user.pk), generation + 1)
+
+    def test_verify_and_refresh_reject_revoked_tokens(self):
+        token = get_token(self.user)
+        self._post('mutation { logout { success } }', token)
+        for mutation in ('verifyToken', 'refreshToken'):
+            result = self._post(f'mutation {{ {mutation}(token: "{token}") {{ payload }} }}', token)
+            self.assertEqual(result['errors'][0]['message'], 'Token has been revoked')
+
+    def test_staff_can_revoke_user_tokens(self):
+        token = get_token(self.user)
+        staff = AppUser.objects.create_user(
+            email='staff@example.com', username='staff', password='testpass123',
+            name='Staff', last_name='User', is_staff=True
+        )
+        mutation = f'mutation {{ revokeUserTokens(userId: {self.user.pk}) {{ success }} }}'
+        self.assertIn('errors', self._post(mutation, token))
+        result = self._post(mutation, get_token(staff))
+        self.assertTrue(result['data']['revokeUserTokens']['success'])
+        self.assertEqual(self._me(token), 'Token has been revoked')
@@ -0,0 +1,127 @@
+from datetime import date
+from django.db import connection
+from django.db.models import Value
+from django.test import RequestFactory, TestCase
+from graphene.test import Client
+from ..models import AppUser, ContactInfo, Country, TypeDocument, UserDocument, fold
+from ..search import _city_matches, _document_matches, _name_matches, fold_text
+from singularity.schema import schema
+
+
+class SearchUsersTests(TestCase):
+    """Pruebas para la búsqueda indexada de usuarios"""
+
+    query = '''
+        query ($term: String!, $limit: Int) {
+            searchUsers(term: $term, limit: $limit) { email name lastName }
+        }
+    '''
+
+    def setUp(self):
+        self.client = Client(schema)
+        self.country = Country.objects.create(country_code='CO', country_name='Colombia')
+        self.doc_type = TypeDocument.objects.create(name_type_document='Cédula de Ciudadanía')
+        self.staff = AppUser.objects.create_user(
+            email='staff@example.com',
+            username='staff',
+            password='testpass123',
+            name='Staff',
+            last_name='User',
+            is_staff=True
+        )
+        self._create_user('jose', 'José', 'Pérez', '1012345678', 'Bogotá')
+        self._create_user('josefina', 'Josefina', 'Núñez', '1012345', 'Medellín')
+        self._create_user('angela', 'Ángela', 'Peña', '2098765', 'Bogotá')
+
+    def _create_user(self, username, name, last_name, document, city):
+        user = AppUser.objects.create_user(
+            email=f'{username}@example.com',
+            username=username,
+            password='testpass123',
+            name=name,
+            last_name=last_name
+        )
+        UserDocument.objects.create(
+            user=user,
+            type_document=self.doc_type,
+            document=document,
+            place_expedition='Bogotá',
+            date_expedition=date(2020, 1, 1)
+        )
+        ContactInfo.objects.create(
+            user=user,
+            country=self.country,
+            address='Calle 123 N 45-67',
+            city=city,
+            phone='1234567',
+            cel_phone='3001234567',
+            emergency_name='Contacto',
+            emergency_phone='3009876543'
+        )
+
+    def _search(self, term, limit=None, user=None):
+        request = RequestFactory().post('/graphql/')
+        request.user = user or self.staff
+        variables = {'term': term} if limit is None else {'term': term, 'limit': limit}
+        return self.client.execute(self.query, context_value=request, variables=variables)
+
+    def _emails(self, term, **kwargs):
+        response = self._search(term, **kwargs)
+        self.assertIsNone(response.get('errors'))
+        return [user['email'] for user in response['data']['searchUsers']]
+
+    def test_fold_text(self):
+        self.assertEqual(fold_text('ÁNGELA Núñez Peña'), 'angela nunez pena')
+
+    def test_fold_text_matches_the_index_expression(self):
+        # Los caracteres fuera de la tabla (Ō, ø, ß) quedan igual en ambos lados
+        text = 'ÁNGELA Núñez Ōtsuka Søren Strauß'
+        folded = AppUser.objects.annotate(folded=fold(Value(text))).values_list('folded', flat=True)[:1].get()
+        self.assertEqual(fold_text(text), folded)
+
+    def test_names_outside_the_fold_table_are_found(self):
+        self._create_user('otsuka', 'Ōtsuka', 'Sato', '3011111', 'Cali')
+        self.assertEqual(self._emails('ŌTSUKA'), ['otsuka@example.com'])
+
+    def test_names_match_without_accents(self):
+        self.assertEqual(self._emails('PEREZ'), ['jose@example.com'])
+        self.assertEqual(self._emails('angela pena'), ['angela@example.com'])
+        self.assertEqual(self._emails('Nuñez'), ['josefina@example.com'])
+
+    def test_names_match_by_prefix(self):
+        self.assertEqual(set(self._emails('jose')), {'jose@example.com', 'josefina@example.com'})
+
+    def test_exact_document_ranks_first(self):
+        self.assertEqual(self._emails('1012345'), ['josefina@example.com', 'jose@example.com'])
+        self.assertEqual(self._emails('1012345678'), ['jose@example.com'])
+
+    def test_city_prefix(self):
+        self.assertEqual(set(self._emails('bogo')), {'jose@example.com', 'angela@example.com'})
+        self.assertEqual(self._emails('MEDELLIN'), ['josefina@example.com'])
+
+    def test_limit(self):
+        self.assertEqual(len(self._emails('bogota', limit=1)), 1)
+        response = self._search('bogota', limit=500)
+        self.assertIn('límite', response['errors'][0]['message'])
+
+    def test_short_terms_are_rejected(self):
+        response = self._search(' a ')
+        self.assertIn('al menos 2 caracteres', response['errors'][0]['message'])
+
+    def test_requires_staff(self):
+        user = AppUser.objects.get(email='jose@example.com')
+        response = self._search('jose', user=user)
+        self.assertIsNotNone(response.get('errors'))
+
+    def test_searches_use_the_expression_indexes(self):
+        # Con pocas filas el planificador prefiere recorrer la tabla; se
+        # desactiva para comprobar que las expresiones coinciden con los índices
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for matches, index in (
+            (_name_matches, 'appuser_name_search_idx'),
+            (_document_matches, 'userdocument_prefix_idx'),
+            (_city_matches, 'contactinfo_city_prefix_idx'),
+        ):
+            with self.subTest(index=index):
+                self.assertIn(index, matches('bogo', 20).explain())
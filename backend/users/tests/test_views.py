@@ -0,0 +1,188 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from graphql import parse
+from ..cache import VERSION_SEQUENCE, reference_cache
+from ..models import Country
+from singularity.persisted_queries import document_cache, query_hash, registry
+
+FRONTEND_SRC = settings.BASE_DIR.parent / 'frontend' / 'src'
+
+# GET_INITIAL_DATA de RegistrationForm.js tal como lo envía Apollo Client:
+# con __typename agregado por InMemoryCache e impreso con print de graphql-js
+APOLLO_INITIAL_DATA = (
+    '{\n  allCountries {\n    id\n    countryCode\n    countryName\n    __typename\n  }\n'
+    '  allDocumentTypes {\n    id\n    nameTypeDocument\n    __typename\n  }\n}'
+)
+
+
+class CachingGraphQLViewTests(TestCase):
+    """Pruebas para el caché HTTP de consultas GraphQL de solo lectura"""
+
+    query = '{ allCountries { id countryName } }'
+
+    def setUp(self):
+        reference_cache.clear()
+        Country.objects.create(country_code="CO", country_name="Colombia")
+
+    def _get(self, query, **headers):
+        return self.client.get(
+            '/graphql/', {'query': query}, HTTP_ACCEPT='application/json', **headers
+        )
+
+    def test_get_query_is_cacheable(self):
+        response = self._get(self.query)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertNotIn('csrftoken', response.cookies)
+        self.assertEqual(response.json()['data']['allCountries'][0]['countryName'], "Colombia")
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self._get(self.query)['ETag']
+        response = self._get(self.query, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_changes_when_data_changes(self):
+        etag = self._get(self.query)['ETag']
+        Country.objects.create(country_code="PE", country_name="Perú")
+        response = self._get(self.query, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['data']['allCountries']), 2)
+
+    @override_settings(REFERENCE_DATA_CACHE={'VERSION_CHECK_INTERVAL': 0})
+    def test_etag_follows_invalidations_from_other_workers(self):
+        etag = self._get(self.query)['ETag']
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT nextval('{VERSION_SEQUENCE}')")
+        self.assertEqual(self._get(self.query, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Un proceso recién iniciado calcula el mismo ETag
+        etag = self._get(self.query)['ETag']
+        reference_cache._set_version(0)
+        self.assertEqual(self._get(self.query, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(REFERENCE_DATA_CACHE={'VERSION_CHECK_INTERVAL': 60})
+    def test_revalidation_does_not_read_the_version_within_the_interval(self):
+        etag = self._get(self.query)['ETag']
+        with self.assertNumQueries(0):
+            response = self._get(self.query, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_me_is_not_cached(self):
+        response = self._get('{ me { email } allCountries { id } }')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_mutations_are_not_cached(self):
+        response = self.client.post(
+            '/graphql/',
+            json.dumps({'query': 'mutation { createCountry(countryCode: "EC", countryName: "Ecuador") { success } }'}),
+            content_type='application/json',
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_mutations_are_rejected_over_get(self):
+        response = self._get('mutation { createCountry(countryCode: "EC", countryName: "Ecuador") { success } }')
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Country.objects.filter(country_code="EC").exists())
+
+
+class PersistedQueryTests(TestCase):
+    """Pruebas para las consultas persistidas (APQ y registro estático)"""
+
+    query = '{ allCountries { countryName } }'
+
+    def setUp(self):
+        reference_cache.clear()
+        registry.reload()
+        self.addCleanup(registry.reload)
+        Country.objects.create(country_code="CO", country_name="Colombia")
+
+    def _post(self, payload):
+        return self.client.post(
+            '/graphql/', json.dumps(payload),
+            content_type='application/json', HTTP_ACCEPT='application/json'
+        )
+
+    def _extensions(self, query):
+        return {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+
+    def test_unknown_hash_asks_for_full_query(self):
+        response = self._post({'extensions': self._extensions('{ allCountries { id } }')})
+        self.assertEqual(response.json()['errors'][0]['message'], 'PersistedQueryNotFound')
+
+    def test_hash_is_registered_and_reused(self):
+        extensions = self._extensions(self.query)
+        response = self._post({'query': self.query, 'extensions': extensions})
+        self.assertEqual(response.json()['data']['allCountries'][0]['countryName'], "Colombia")
+
+        response = self._post({'extensions': extensions})
+        self.assertEqual(response.json()['data']['allCountries'][0]['countryName'], "Colombia")
+
+    def test_hash_over_get_is_cacheable(self):
+        self._post({'query': self.query, 'extensions': self._extensions(self.query)})
+        response = self.client.get('/graphql/', {
+            'extensions': json.dumps(self._extensions(self.query))
+        }, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_hash_mismatch_is_rejected(self):
+        response = self._post({'query': self.query, 'extensions': self._extensions('{ me { id } }')})
+        self.assertEqual(
+            response.json()['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_HASH_MISMATCH'
+        )
+
+    def test_only_persisted_rejects_unregistered_queries(self):
+        registry._static = {query_hash(self.query): self.query}
+        with override_settings(GRAPHQL_PERSISTED_QUERIES={'ONLY_PERSISTED': True}):
+            response = self._post({'extensions': self._extensions(self.query)})
+            self.assertEqual(response.json()['data']['allCountries'][0]['countryName'], "Colombia")
+
+            response = self._post({'query': '{ allDocumentTypes { id } }'})
+            self.assertEqual(
+                response.json()['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_ALLOWED'
+            )
+
+    def test_parsed_documents_are_cached(self):
+        document_cache.clear()
+        with mock.patch('singularity.persisted_queries.parse', wraps=parse) as parse_spy:
+            self._post({'query': self.query})
+            self._post({'query': self.query})
+        self.assertEqual(parse_spy.call_count, 1)
+
+    def test_invalid_query_returns_validation_errors(self):
+        response = self._post({'query': '{ allCountries { unknownField } }'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('unknownField', response.json()['errors'][0]['message'])
+
+    @unittest.skipUnless(FRONTEND_SRC.is_dir(), 'requiere el código del frontend')
+    def test_registry_matches_apollo_documents(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'persisted.json')
+        call_command('build_persisted_queries', str(FRONTEND_SRC), output=path, stdout=StringIO())
+
+        with override_settings(GRAPHQL_PERSISTED_QUERIES={'REGISTRY_FILE': path, 'ONLY_PERSISTED': True}):
+            registry.reload()
+            response = self.client.get('/graphql/', {
+                'extensions': json.dumps({'persistedQuery': {'version': 1, 'sha256Hash': query_hash(APOLLO_INITIAL_DATA)}})
+            }, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['allCountries'][0]['__typename'], 'CountryType')
+        self.assertTrue(response.has_header('ETag'))
@@ -0,0 +1,78 @@
+import hashlib
+import secrets
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.mail import send_mail
+from .cache import user_cache
+from .jobs import enqueue, enqueue_many, task
+
+SEND_VERIFICATION_EMAIL = 'users.send_verification_email'
+TOKEN_SALT = 'users.verification'
+
+TOKEN_INVALID = 'El enlace de verificación no es válido'
+TOKEN_EXPIRED = 'El enlace de verificación expiró'
+
+
+def make_token():
+    # El token lleva su fecha de emisión firmada, así que vence sin guardar
+    # otra columna; en la base de datos solo queda su SHA-256
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(secrets.token_urlsafe(32))
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def enqueue_verification(user):
+    """Encola el correo de verificación; debe llamarse dentro de la transacción del registro."""
+    return enqueue(SEND_VERIFICATION_EMAIL, {'user_id': user.pk})
+
+
+def enqueue_verifications(users):
+    return enqueue_many(SEND_VERIFICATION_EMAIL, ({'user_id': user.pk} for user in users))
+
+
+@task(SEND_VERIFICATION_EMAIL)
+def send_verification_email(user_id):
+    """Genera el token de verificación del usuario y le envía el enlace por correo."""
+    User = get_user_model()
+    user = User.objects.filter(pk=user_id, email_verified=False).only('email', 'name').first()
+    if user is None:
+        # Eliminado o ya verificado
+        return
+    token = make_token()
+    User.objects.filter(pk=user_id).update(verification_token=token_digest(token))
+    link = settings.EMAIL_VERIFICATION['URL'].format(token=token)
+    send_mail(
+        'Verifica tu correo electrónico',
+        f'Hola {user.name},\n\nPara verificar tu correo electrónico abre este enlace:\n{link}\n',
+        None,
+        [user.email],
+    )
+
+
+def verify_email(token):
+    """
+    Marca como verificado el correo del usuario dueño de `token`. Devuelve
+    None si lo verificó o el mensaje de error.
+    """
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.EMAIL_VERIFICATION['MAX_AGE']
+        )
+    except signing.SignatureExpired:
+        return TOKEN_EXPIRED
+    except signing.BadSignature:
+        return TOKEN_INVALID
+
+    # Búsqueda por el índice parcial appuser_verification_idx
+    User = get_user_model()
+    digest = token_digest(token)
+    pk = User.objects.filter(verification_token=digest).values_list('pk', flat=True).first()
+    if pk is None or not User.objects.filter(pk=pk, verification_token=digest).update(
+        email_verified=True, verification_token=None
+    ):
+        return TOKEN_INVALID
+    user_cache.invalidate_on_commit(pk)
+    return None
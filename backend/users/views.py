@@ -1,3 +1,54 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.utils import get_http_authorization
+from .exporter import FORMATS, UserExport
 
-# Create your views here.
+
+def _request_user(request):
+    # Sesión del admin o, en su defecto, el JWT del encabezado Authorization
+    if request.user.is_authenticated or get_http_authorization(request) is None:
+        return request.user
+    try:
+        return authenticate(request=request)
+    except JSONWebTokenError:
+        return None
+
+
+async def _aiterate(iterator):
+    # Bajo ASGI, StreamingHttpResponse consumiría un iterador síncrono completo
+    # en memoria antes de enviarlo; aquí se lee bloque a bloque en el hilo de
+    # la solicitud, que es el dueño de la conexión y de su cursor
+    iterator = iter(iterator)
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(iterator, None)) is not None:
+        yield chunk
+
+
+def export_users(request):
+    """
+    Export completo de usuarios con su documento y su información de
+    contacto, solo para el personal (`is_staff`).
+
+    `?format=csv|ndjson` (por defecto csv) y `?gzip=0` para recibirlo sin
+    comprimir. La respuesta se genera mientras se lee la base de datos con un
+    cursor del servidor, así que la memoria no depende del número de usuarios.
+    """
+    user = _request_user(request)
+    if user is None or not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not user.is_staff:
+        return HttpResponse(status=403)
+
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATS:
+        return HttpResponseBadRequest(f'Formato no soportado: {format}')
+    export = UserExport(format, compress=request.GET.get('gzip', '1') not in ('0', 'false'))
+
+    content = _aiterate(export) if isinstance(request, ASGIRequest) else export
+    response = StreamingHttpResponse(content, content_type=export.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -1,6 +1,18 @@
 import { ApolloClient, InMemoryCache, ApolloProvider, createHttpLink } from '@apollo/client';
+import { createPersistedQueryLink } from '@apollo/client/link/persisted-queries';
 import RegistrationForm from './components/RegistrationForm';
 
+// Hex SHA-256 of the printed document, as the backend expects
+// (see `manage.py build_persisted_queries`).
+async function sha256(query) {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(query));
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// Sends only the hash; the backend asks for the full query when it does not
+// know it. Hashed queries go over GET so they can be cached with their ETag.
+const persistedQueryLink = createPersistedQueryLink({ sha256, useGETForHashedQueries: true });
+
 const httpLink = createHttpLink({
   uri: 'http://localhost:8000/graphql/',
   credentials: 'same-origin',
@@ -10,7 +22,7 @@ const httpLink = createHttpLink({
 });
 
 const client = new ApolloClient({
-  link: httpLink,
+  link: persistedQueryLink.concat(httpLink),
   cache: new InMemoryCache()
 });
 